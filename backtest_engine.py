@@ -0,0 +1,276 @@
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Tuple, Any, Optional
+from indicator_engine import build_panel
+from win_rate_engine import forward_max_returns
+from market_simulator import price_limit
+
+# 默认交易成本（A股）：双边佣金万2.5、卖出印花税万5、双边滑点5个基点
+DEFAULT_COMMISSION = 0.00025
+DEFAULT_STAMP_DUTY = 0.0005
+DEFAULT_SLIPPAGE = 0.0005
+
+# 年化使用的交易日数
+TRADING_DAYS_PER_YEAR = 252
+
+
+def align_dates(frames: Dict[str, pd.DataFrame], columns: Tuple[str, ...] = ('open', 'close')
+                ) -> Tuple[pd.DatetimeIndex, Dict[str, np.ndarray], np.ndarray]:
+    """将多只股票的行情数据按交易日对齐为 N×T 面板
+
+    与build_panel按K线位置对齐不同，各列对应同一日期，停牌或非交易日为NaN。
+
+    Args:
+        frames: 股票代码到行情数据DataFrame的字典
+        columns: 需要对齐的列
+
+    Returns:
+        (全部日期, 列名到N×T数组的字典, 各K线所在日期列的N×M位置数组（与build_panel右对齐一致，填充为-1）)
+    """
+    indexes = [df.index.values for df in frames.values() if len(df)]
+    dates = pd.DatetimeIndex(np.unique(np.concatenate(indexes))) if indexes else pd.DatetimeIndex([])
+    lengths = [len(df) for df in frames.values()]
+    n, t, m = len(frames), len(dates), max(lengths, default=0)
+
+    panel = {column: np.full((n, t), np.nan) for column in columns}
+    positions = np.full((n, m), -1, dtype=np.int64)
+    for i, df in enumerate(frames.values()):
+        if not len(df):
+            continue
+        position = dates.searchsorted(df.index)
+        positions[i, m - len(df):] = position
+        for column in columns:
+            panel[column][i, position] = df[column].to_numpy(dtype=np.float64)
+
+    return dates, panel, positions
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """沿时间轴向前填充NaN（首个有效值之前保持NaN）"""
+    valid = ~np.isnan(values)
+    index = np.where(valid, np.arange(values.shape[1]), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    filled = values[np.arange(values.shape[0])[:, None], index]
+    filled[~np.maximum.accumulate(valid, axis=1)] = np.nan
+    return filled
+
+
+def walk_forward_win_rates(frames: Dict[str, pd.DataFrame], positions: np.ndarray, n_days: int,
+                           target_return: float, train_window: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    """计算每个交易日收盘时可得的胜率（只使用当日及之前的数据）
+
+    以第j根K线为起点的样本要到第j+n_days根K线收盘后才能确定结果，因此计入该K线所在日期。
+
+    Args:
+        frames: 股票代码到行情数据DataFrame的字典
+        positions: align_dates返回的K线日期位置数组
+        n_days: 预测天数
+        target_return: 目标收益率
+        train_window: 只统计最近train_window个交易日内确定的样本，为None时使用全部历史
+
+    Returns:
+        (N×T胜率数组, N×T样本数数组)
+    """
+    panel, _ = build_panel(frames, ('close',))
+    with np.errstate(invalid='ignore'):
+        returns = forward_max_returns(panel['close'], n_days)
+    valid = ~np.isnan(returns)
+
+    # 每个起点的结果记在第j+n_days根K线的日期上（各股票日期位置严格递增，不会重复）
+    n, t = positions.shape[0], int(positions.max()) + 1 if positions.size else 0
+    known = positions[:, n_days:]
+    rows, columns = np.nonzero(valid)
+    wins = np.zeros((n, t))
+    samples = np.zeros((n, t))
+    wins[rows, known[rows, columns]] = returns[rows, columns] >= target_return
+    samples[rows, known[rows, columns]] = 1
+
+    wins = np.cumsum(wins, axis=1)
+    samples = np.cumsum(samples, axis=1)
+    if train_window is not None and train_window < t:
+        wins[:, train_window:] -= wins[:, :-train_window].copy()
+        samples[:, train_window:] -= samples[:, :-train_window].copy()
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates = np.where(samples > 0, wins / samples, np.nan)
+    return rates, samples
+
+
+class BacktestResult:
+    """走步回测结果"""
+
+    def __init__(self, nav: pd.Series, rebalances: pd.DataFrame, holdings: List[List[str]]):
+        """初始化回测结果
+
+        Args:
+            nav: 每日净值（初始为1）
+            rebalances: 各调仓日的换手率、交易成本、买入受限数和卖出受限数
+            holdings: 各调仓日调仓后的持仓股票列表
+        """
+        self.nav = nav
+        self.rebalances = rebalances
+        self.holdings = holdings
+
+    @property
+    def returns(self) -> pd.Series:
+        """每日收益率"""
+        return self.nav.pct_change().fillna(0.0)
+
+    @property
+    def drawdown(self) -> pd.Series:
+        """每日回撤（相对历史最高净值）"""
+        return self.nav / self.nav.cummax() - 1
+
+    def summary(self) -> Dict[str, float]:
+        """汇总回测指标
+
+        Returns:
+            总收益率、年化收益率、年化波动率、夏普比率、最大回撤、平均单边换手率、累计交易成本和调仓次数
+        """
+        returns = self.returns
+        years = max(len(self.nav) - 1, 1) / TRADING_DAYS_PER_YEAR
+        total_return = float(self.nav.iloc[-1] - 1) if len(self.nav) else 0.0
+        volatility = float(returns.std() * np.sqrt(TRADING_DAYS_PER_YEAR)) if len(returns) > 1 else 0.0
+        return {
+            'total_return': total_return,
+            'annual_return': float((1 + total_return) ** (1 / years) - 1),
+            'annual_volatility': volatility,
+            'sharpe': float(returns.mean() * TRADING_DAYS_PER_YEAR / volatility) if volatility > 0 else 0.0,
+            'max_drawdown': float(self.drawdown.min()) if len(self.nav) else 0.0,
+            'average_turnover': float(self.rebalances['turnover'].mean()) if len(self.rebalances) else 0.0,
+            'total_cost': float(self.rebalances['cost'].sum()) if len(self.rebalances) else 0.0,
+            'rebalance_count': len(self.rebalances)
+        }
+
+
+def walk_forward_backtest(frames: Dict[str, pd.DataFrame], top_n: int = 5, min_win_rate: float = 0.5,
+                          n_days: int = 5, target_return: float = 0.03, rebalance_every: int = 5,
+                          train_window: int = 252, min_samples: int = 20,
+                          commission: float = DEFAULT_COMMISSION, stamp_duty: float = DEFAULT_STAMP_DUTY,
+                          slippage: float = DEFAULT_SLIPPAGE) -> BacktestResult:
+    """按推荐逻辑进行走步回测
+
+    每个调仓日收盘时，按截至当日的胜率（与recommend_stocks相同：胜率不低于min_win_rate，按胜率取前top_n只）
+    选股，下一交易日开盘等权调仓。A股交易约束：停牌不能交易；开盘价位于涨停价不能买入、位于跌停价不能卖出，
+    受限的持仓保持不变；调仓间隔至少1个交易日，当日买入的股票最早在下一次调仓时卖出（T+1）。
+    买卖按开盘价加减滑点成交，买卖双方收取佣金，卖出另收印花税。
+
+    胜率、选股和涨跌停判断在整个面板上向量化计算，只按调仓期循环更新持仓。
+
+    Args:
+        frames: 股票代码到行情数据DataFrame的字典（需包含open和close列）
+        top_n: 持仓股票数量
+        min_win_rate: 最低胜率
+        n_days: 胜率的预测天数
+        target_return: 胜率的目标收益率
+        rebalance_every: 调仓间隔（交易日）
+        train_window: 计算胜率使用的最近交易日数，为None时使用全部历史
+        min_samples: 参与选股的最少样本数
+        commission: 佣金费率
+        stamp_duty: 卖出印花税率
+        slippage: 滑点（相对开盘价）
+
+    Returns:
+        回测结果
+    """
+    if rebalance_every < 1:
+        raise ValueError("调仓间隔至少为1个交易日（T+1）")
+
+    symbols = list(frames.keys())
+    dates, panel, positions = align_dates(frames, ('open', 'close'))
+    n, t = panel['close'].shape
+    open_price = panel['open']
+    close = forward_fill(panel['close'])
+    valued_close = np.nan_to_num(close)
+
+    # 截至每个交易日收盘的胜率及可选股票
+    rates, samples = walk_forward_win_rates(frames, positions, n_days, target_return, train_window)
+    eligible = (samples >= min_samples) & (rates >= min_win_rate) & ~np.isnan(panel['close'])
+
+    # 调仓信号日（次日开盘执行），在所有调仓日上一次性选股
+    first = max(train_window or 0, n_days + min_samples)
+    signal_days = np.arange(first, t - 1, rebalance_every)
+    scores = np.where(eligible[:, signal_days], rates[:, signal_days], -np.inf)
+    order = np.argsort(-scores, axis=0, kind='stable')[:top_n]
+    selected = np.zeros_like(scores, dtype=bool)
+    np.put_along_axis(selected, order, True, axis=0)
+    selected &= np.isfinite(scores)
+
+    # 执行日的交易约束：停牌不能交易，开盘涨停不能买入，开盘跌停不能卖出
+    execution_days = signal_days + 1
+    opens = open_price[:, execution_days]
+    prev_close = close[:, signal_days]
+    limits = np.array([price_limit(symbol) for symbol in symbols])[:, None]
+    limited = np.isfinite(limits)
+    upper = np.where(limited, np.round(prev_close * (1 + np.where(limited, limits, 0)), 2), np.inf)
+    lower = np.where(limited, np.round(prev_close * (1 - np.where(limited, limits, 0)), 2), -np.inf)
+    tradable = ~np.isnan(opens)
+    can_buy = tradable & (opens < upper - 1e-9)
+    can_sell = tradable & (opens > lower + 1e-9)
+    marks = np.where(tradable, opens, np.nan_to_num(prev_close))
+
+    nav = np.ones(t)
+    shares = np.zeros(n)
+    cash = 1.0
+    records, holdings = [], []
+    for k, day in enumerate(execution_days):
+        price = marks[:, k]
+        value = shares * price
+        total = cash + value.sum()
+
+        # 目标持仓：选中股票各占1/top_n（不足top_n只时剩余持有现金），其余清仓
+        target = np.where(selected[:, k], total / top_n, 0.0)
+        delta = target - value
+        sells = np.where((delta < 0) & can_sell[:, k], -delta, 0.0)
+        buys = np.where((delta > 0) & can_buy[:, k], delta, 0.0)
+
+        # 先卖后买，买入金额不超过可用现金
+        sell_value = sells.sum()
+        cost = sell_value * (slippage + commission + stamp_duty)
+        cash += sell_value - cost
+        needed = buys.sum() * (1 + slippage + commission)
+        if needed > cash:
+            buys *= cash / needed
+        buy_value = buys.sum()
+        buy_cost = buy_value * (slippage + commission)
+        cash -= buy_value + buy_cost
+        cost += buy_cost
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shares = shares + np.where(price > 0, (buys - sells) / price, 0.0)
+        shares[np.abs(shares * price) < 1e-12] = 0.0
+
+        # 调仓日到下一个调仓日之间按收盘价计算净值
+        end = execution_days[k + 1] if k + 1 < len(execution_days) else t
+        nav[day:end] = cash + shares @ valued_close[:, day:end]
+
+        held = np.flatnonzero(shares > 0)
+        holdings.append([symbols[i] for i in held])
+        records.append({
+            'date': dates[day],
+            'turnover': (sell_value + buy_value) / 2 / total if total > 0 else 0.0,
+            'cost': cost,
+            'blocked_buys': int(np.count_nonzero(selected[:, k] & ~can_buy[:, k] & (shares == 0))),
+            'blocked_sells': int(np.count_nonzero(~selected[:, k] & ~can_sell[:, k] & (shares > 0)))
+        })
+
+    start = execution_days[0] - 1 if len(execution_days) else 0
+    rebalances = pd.DataFrame(records, columns=['date', 'turnover', 'cost', 'blocked_buys', 'blocked_sells'])
+    return BacktestResult(pd.Series(nav[start:], index=dates[start:], name='nav'),
+                          rebalances.set_index('date'), holdings)
+
+
+if __name__ == "__main__":
+    import time
+    from market_simulator import MarketSimulator, make_symbols
+
+    symbols = make_symbols(5000)
+    start = time.time()
+    frames = MarketSimulator().generate(symbols, 2520)
+    print(f"生成 {len(symbols)} 只股票 × 2520 根K线的模拟行情耗时: {time.time() - start:.2f}秒")
+
+    start = time.time()
+    result = walk_forward_backtest(frames, top_n=20)
+    print(f"走步回测耗时: {time.time() - start:.2f}秒")
+    for name, value in result.summary().items():
+        print(f"  {name}: {value:.4f}" if isinstance(value, float) else f"  {name}: {value}")
@@ -0,0 +1,174 @@
+import threading
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Tuple, Any, Optional
+
+# 由日线数据本地合成的数据间隔
+RESAMPLED_INTERVALS = ('1wk', '1mo')
+
+# 界面时间周期选项对应的数据间隔
+TIME_FRAME_INTERVALS = {'日线': '1d', '周线': '1wk', '月线': '1mo'}
+
+# 1970-01-01为星期四，加3后按7整除即得到以星期一开始的周序号
+_EPOCH_WEEKDAY_OFFSET = 3
+
+
+def period_keys(index: pd.DatetimeIndex, interval: str) -> np.ndarray:
+    """计算每根日线所属的周/月序号
+
+    日线索引已是交易所当地日期，因此按自然周（星期一至星期日）分组即为交易所周。
+
+    Args:
+        index: 日线索引
+        interval: '1wk'或'1mo'
+
+    Returns:
+        int64周期序号数组
+    """
+    days = index.values.astype('datetime64[D]')
+    if interval == '1wk':
+        return (days.astype(np.int64) + _EPOCH_WEEKDAY_OFFSET) // 7
+    if interval == '1mo':
+        return days.astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f"不支持的合成周期: {interval}")
+
+
+def resample_bars(daily: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """将日线数据聚合为周线或月线
+
+    开盘价取周期内第一根K线，最高/最低价取极值，收盘价取最后一根K线，成交量求和。
+    每根K线以周期内最后一个交易日为索引（与常见行情软件一致，未完结的周期以最新交易日标记）。
+
+    Args:
+        daily: 以DatetimeIndex为索引、按时间排序的日线OHLCV数据
+        interval: '1wk'或'1mo'
+
+    Returns:
+        周线或月线OHLCV数据
+    """
+    if daily.empty:
+        return daily.copy()
+
+    keys = period_keys(daily.index, interval)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    ends = np.concatenate((starts[1:], [len(keys)])) - 1
+
+    high = daily['high'].to_numpy(dtype=np.float64)
+    low = daily['low'].to_numpy(dtype=np.float64)
+    volume = daily['volume'].to_numpy(dtype=np.float64)
+
+    return pd.DataFrame({
+        'open': daily['open'].to_numpy(dtype=np.float64)[starts],
+        'high': np.maximum.reduceat(high, starts),
+        'low': np.minimum.reduceat(low, starts),
+        'close': daily['close'].to_numpy(dtype=np.float64)[ends],
+        'volume': np.add.reduceat(volume, starts)
+    }, index=daily.index[ends])
+
+
+class BarResampler:
+    """基于已存储日线数据的周线/月线合成器
+
+    合成结果按(股票代码, 数据间隔)缓存。日线数据更新后，只重新聚合从被改写的第一根日线所在周期开始的部分，
+    之前的周期直接复用缓存。
+    """
+
+    def __init__(self, data_store):
+        """初始化合成器
+
+        Args:
+            data_store: 行情数据存储（MarketDataStore）
+        """
+        self.data_store = data_store
+        self._cache = {}  # (symbol, interval) -> (日线版本号, 合成结果)
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.hits = 0
+        self.incremental_updates = 0
+        self.full_builds = 0
+
+    def get(self, symbol: str, interval: str) -> Optional[pd.DataFrame]:
+        """获取周线或月线数据
+
+        Args:
+            symbol: 股票代码
+            interval: '1wk'或'1mo'
+
+        Returns:
+            合成的OHLCV数据，没有已存储的日线数据时返回None
+        """
+        daily = self.data_store.load(symbol, '1d')
+        if daily is None:
+            return None
+
+        meta = self.data_store.get_meta(symbol, '1d')
+        version = meta.get('version', 0)
+        key = (symbol, interval)
+
+        with self._lock:
+            cached = self._cache.get(key)
+
+        if cached is not None and cached[0] == version:
+            with self._lock:
+                self.hits += 1
+            return cached[1]
+
+        rewritten_from = meta.get('rewritten_from')
+        if cached is not None and cached[0] == version - 1 and rewritten_from is not None:
+            bars = self._update(cached[1], daily, interval, pd.Timestamp(rewritten_from))
+            with self._lock:
+                self.incremental_updates += 1
+        else:
+            bars = resample_bars(daily, interval)
+            with self._lock:
+                self.full_builds += 1
+
+        with self._lock:
+            self._cache[key] = (version, bars)
+        return bars
+
+    @staticmethod
+    def _update(bars: pd.DataFrame, daily: pd.DataFrame, interval: str, rewritten_from: pd.Timestamp) -> pd.DataFrame:
+        """从被改写的第一根日线所在周期开始重新聚合
+
+        Args:
+            bars: 上一版本的合成结果
+            daily: 更新后的完整日线数据
+            interval: '1wk'或'1mo'
+            rewritten_from: 本次更新改写的第一根日线时间
+
+        Returns:
+            更新后的合成结果
+        """
+        first_key = period_keys(pd.DatetimeIndex([rewritten_from]), interval)[0]
+        kept = bars[period_keys(bars.index, interval) < first_key]
+        daily_tail = daily[period_keys(daily.index, interval) >= first_key]
+        return pd.concat([kept, resample_bars(daily_tail, interval)])
+
+    def invalidate(self, symbol: str = None) -> None:
+        """清除缓存的合成结果
+
+        Args:
+            symbol: 股票代码，为None时清除全部
+        """
+        with self._lock:
+            if symbol is None:
+                self._cache.clear()
+            else:
+                for key in [key for key in self._cache if key[0] == symbol]:
+                    del self._cache[key]
+
+    def stats(self) -> Dict[str, int]:
+        """获取统计信息
+
+        Returns:
+            缓存条目数、命中、增量更新和完整合成次数
+        """
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'hits': self.hits,
+                'incremental_updates': self.incremental_updates,
+                'full_builds': self.full_builds
+            }
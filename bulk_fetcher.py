@@ -0,0 +1,241 @@
+import os
+import time
+import random
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Any, Optional, Callable
+from market_data_store import MarketDataStore, get_market_data_store
+
+# 进程内默认的API请求速率（次/秒），可通过环境变量按数据源的配额调整
+DEFAULT_REQUESTS_PER_SECOND = float(os.environ.get('MARKET_DATA_REQUESTS_PER_SECOND', '50'))
+
+
+class RateLimiter:
+    """令牌桶限流器，限制每秒发出的API请求数"""
+
+    def __init__(self, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND, burst: int = None):
+        """初始化限流器
+
+        Args:
+            requests_per_second: 每秒允许的请求数，小于等于0表示不限流
+            burst: 允许的突发请求数，默认与每秒请求数相同
+        """
+        self.requests_per_second = requests_per_second
+        self.capacity = burst or max(1, int(requests_per_second))
+        self._tokens = float(self.capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """获取一个令牌，令牌不足时阻塞等待"""
+        if self.requests_per_second <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.requests_per_second)
+                self._last_refill = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.requests_per_second
+
+            time.sleep(wait)
+
+
+class _ThrottledApiClient:
+    """为API客户端增加限流和失败重试"""
+
+    def __init__(self, api_client, rate_limiter: RateLimiter, max_retries: int, backoff: float):
+        self.api_client = api_client
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def call_api(self, api_name: str, query: Dict[str, Any] = None) -> Dict[str, Any]:
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                return self.api_client.call_api(api_name, query=query)
+            except Exception:
+                if attempt >= self.max_retries:
+                    raise
+                # 指数退避，并加入随机抖动避免同时重试
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+
+
+# 进程内共享的限流器，所有批量获取共用同一请求配额
+_default_rate_limiter = None
+_default_rate_limiter_lock = threading.Lock()
+
+
+def get_default_rate_limiter() -> RateLimiter:
+    """获取进程内共享的限流器
+
+    Returns:
+        默认的RateLimiter实例
+    """
+    global _default_rate_limiter
+    with _default_rate_limiter_lock:
+        if _default_rate_limiter is None:
+            _default_rate_limiter = RateLimiter()
+        return _default_rate_limiter
+
+
+def set_default_rate(requests_per_second: float, burst: int = None) -> None:
+    """调整进程内共享限流器的请求速率（已创建的BulkFetcher同时生效）
+
+    Args:
+        requests_per_second: 每秒允许的请求数，小于等于0表示不限流
+        burst: 允许的突发请求数，默认与每秒请求数相同
+    """
+    limiter = get_default_rate_limiter()
+    with limiter._lock:
+        limiter.requests_per_second = requests_per_second
+        limiter.capacity = burst or max(1, int(requests_per_second))
+        limiter._tokens = min(limiter._tokens, float(limiter.capacity))
+
+
+class BulkFetcher:
+    """并发、限流的批量行情获取器"""
+
+    def __init__(self, data_store: MarketDataStore = None, api_client=None, max_workers: int = 8,
+                 rate_limiter: RateLimiter = None, max_retries: int = 3, backoff: float = 0.5,
+                 client_provider: Callable[[], Any] = None):
+        """初始化批量获取器
+
+        Args:
+            data_store: 行情数据存储，为None时使用进程内共享的存储
+            api_client: YahooFinance API客户端，为None时使用模拟数据
+            max_workers: 最大并发线程数
+            rate_limiter: 限流器，为None时使用进程内共享的限流器
+            max_retries: 单个请求失败后的最大重试次数
+            backoff: 重试的基础等待时间（秒）
+            client_provider: 每次获取时调用、返回当前API客户端的函数（如所属系统的api_client属性），
+                指定时忽略api_client
+        """
+        self.data_store = data_store or get_market_data_store()
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter or get_default_rate_limiter()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.client_provider = client_provider or (lambda: api_client)
+
+    def _api_client(self) -> Optional[_ThrottledApiClient]:
+        """获取当前的API客户端（加上限流和重试），没有客户端时返回None"""
+        api_client = self.client_provider()
+        if api_client is None:
+            return None
+        return _ThrottledApiClient(api_client, self.rate_limiter, self.max_retries, self.backoff)
+
+    def fetch_one(self, symbol: str, period: str = '1y', interval: str = '1d') -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        """在当前线程中获取单只股票的数据（不创建线程池）
+
+        Args:
+            symbol: 股票代码
+            period: 数据周期
+            interval: 数据间隔
+
+        Returns:
+            行情数据DataFrame和错误信息，两者只有一个不为None
+        """
+        return self._fetch_one(symbol, period, interval, self._api_client())
+
+    def _fetch_one(self, symbol: str, period: str, interval: str,
+                   api_client: Optional[_ThrottledApiClient]) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        """获取单只股票的数据并捕获错误
+
+        Args:
+            symbol: 股票代码
+            period: 数据周期
+            interval: 数据间隔
+            api_client: 限流的API客户端
+
+        Returns:
+            行情数据DataFrame和错误信息，两者只有一个不为None
+        """
+        try:
+            df = self.data_store.fetch(symbol, period, interval, api_client)
+            if df is None:
+                return None, 'API返回数据不完整'
+            return df, None
+        except Exception as e:
+            return None, str(e)
+
+    def fetch_many(self, symbols: List[str], period: str = '1y', interval: str = '1d') -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+        """并发获取多只股票的数据
+
+        Args:
+            symbols: 股票代码列表
+            period: 数据周期
+            interval: 数据间隔
+
+        Returns:
+            成功获取的数据字典（按输入顺序）和失败股票的错误信息字典
+        """
+        symbols = list(dict.fromkeys(symbols))
+        results = {}
+        errors = {}
+
+        if not symbols:
+            return results, errors
+
+        api_client = self._api_client()
+        if len(symbols) == 1:
+            df, error = self._fetch_one(symbols[0], period, interval, api_client)
+            if error is None:
+                results[symbols[0]] = df
+            else:
+                errors[symbols[0]] = error
+            return results, errors
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols))) as executor:
+            futures = [executor.submit(self._fetch_one, symbol, period, interval, api_client) for symbol in symbols]
+
+            for symbol, future in zip(symbols, futures):
+                df, error = future.result()
+                if error is None:
+                    results[symbol] = df
+                else:
+                    errors[symbol] = error
+
+        return results, errors
+
+
+# 测试代码
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    from fake_api_client import FakeApiClient
+
+    symbols = [f'{600000 + i}.SS' for i in range(30)]
+    api_client = FakeApiClient(latency=0.2, jitter=0.05, failure_rate=0.05)
+
+    # 逐只获取
+    data_dir = tempfile.mkdtemp()
+    store = MarketDataStore(root_dir=data_dir)
+    start = time.time()
+    for symbol in symbols:
+        try:
+            store.fetch(symbol, '1y', '1d', api_client)
+        except Exception as e:
+            print(f"获取 {symbol} 数据时出错: {str(e)}")
+    sequential_time = time.time() - start
+    shutil.rmtree(data_dir)
+
+    # 批量并发获取
+    data_dir = tempfile.mkdtemp()
+    fetcher = BulkFetcher(MarketDataStore(root_dir=data_dir), api_client,
+                          max_workers=16, rate_limiter=RateLimiter(requests_per_second=50))
+    start = time.time()
+    results, errors = fetcher.fetch_many(symbols, '1y', '1d')
+    bulk_time = time.time() - start
+    shutil.rmtree(data_dir)
+
+    print(f"\n逐只获取耗时: {sequential_time:.2f}秒")
+    print(f"批量获取耗时: {bulk_time:.2f}秒，成功 {len(results)} 只，失败 {len(errors)} 只")
+    print(f"加速比: {sequential_time / bulk_time:.1f}x")
@@ -8,6 +8,12 @@ from sklearn.preprocessing import StandardScaler
 import json
 import datetime
 from typing import List, Dict, Tuple, Any, Optional
+from market_data_store import MarketDataStore, get_market_data_store
+from bulk_fetcher import BulkFetcher
+from lru_registry import LRURegistry, DEFAULT_MEMORY_BUDGET
+from indicator_engine import compute_indicators
+from result_cache import ResultCache, memoized_stage
+from kernel_backend import local_extrema
 import matplotlib.patches as patches
 from scipy.signal import argrelextrema
 from scipy import stats
@@ -24,17 +30,26 @@ except ImportError:
 class ChartAnalysisSystem:
     """图表分析标识功能"""
     
-    def __init__(self, api_client=None):
+    def __init__(self, api_client=None, data_store: MarketDataStore = None):
         """初始化图表分析系统
         
         Args:
             api_client: YahooFinance API客户端
+            data_store: 行情数据存储，为None时使用进程内共享的存储
         """
         self.api_client = api_client
-        self.stock_data = {}  # 存储股票历史数据
-        self.patterns = {}  # 存储识别的形态
-        self.support_resistance = {}  # 存储支撑位和阻力位
-        self.trend_lines = {}  # 存储趋势线
+        self.data_store = data_store or get_market_data_store()
+        # 每次获取时读取当前的api_client，替换客户端后立即生效
+        self.bulk_fetcher = BulkFetcher(self.data_store,
+                                        client_provider=lambda: self.api_client)
+        # 已获取的股票（直通模式：行情数据由共享存储的注册表统一按内存预算缓存，这里只记录键，访问时从存储读取）
+        self.stock_data = LRURegistry(0, loader=self._reload_stock_data, name='stock_data')
+        self.patterns = LRURegistry(DEFAULT_MEMORY_BUDGET // 8, name='patterns')  # 存储识别的形态
+        self.support_resistance = LRURegistry(DEFAULT_MEMORY_BUDGET // 8, name='support_resistance')  # 存储支撑位和阻力位
+        self.trend_lines = LRURegistry(DEFAULT_MEMORY_BUDGET // 8, name='trend_lines')  # 存储趋势线
+        self.result_cache = ResultCache(DEFAULT_MEMORY_BUDGET // 8, name='analysis_results',
+                                        data_key=self._data_key)  # 按数据指纹缓存各分析阶段的结果
+        self._data_params = {}  # 各股票数据的(周期, 间隔)，用于淘汰后重新加载
         
         # 创建数据目录
         os.makedirs('data/chart_analysis', exist_ok=True)
@@ -50,92 +65,60 @@ class ChartAnalysisSystem:
         Returns:
             股票数据DataFrame
         """
-        try:
-            # 检查是否有缓存数据
-            cache_file = f'data/chart_analysis/{symbol}_{period}_{interval}.csv'
-            if os.path.exists(cache_file):
-                # 检查缓存是否过期（超过1天）
-                if datetime.datetime.now().timestamp() - os.path.getmtime(cache_file) < 86400:
-                    df = pd.read_csv(cache_file, index_col=0, parse_dates=True)
-                    self.stock_data[symbol] = df
-                    print(f"从缓存加载 {symbol} 数据")
-                    return df
-            
-            if HAS_API_CLIENT and self.api_client:
-                # 使用YahooFinance API获取数据
-                data = self.api_client.call_api('YahooFinance/get_stock_chart', 
-                                               query={'symbol': symbol, 
-                                                     'interval': interval, 
-                                                     'range': period})
-                
-                if 'chart' in data and 'result' in data['chart'] and data['chart']['result']:
-                    chart_data = data['chart']['result'][0]
-                    
-                    # 提取时间戳和价格数据
-                    timestamps = chart_data.get('timestamp', [])
-                    quotes = chart_data.get('indicators', {}).get('quote', [{}])[0]
-                    
-                    if timestamps and 'close' in quotes:
-                        # 转换时间戳为日期
-                        dates = [datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d') for ts in timestamps]
-                        
-                        # 创建DataFrame
-                        df = pd.DataFrame({
-                            'open': quotes.get('open', [None] * len(timestamps)),
-                            'high': quotes.get('high', [None] * len(timestamps)),
-                            'low': quotes.get('low', [None] * len(timestamps)),
-                            'close': quotes.get('close', [None] * len(timestamps)),
-                            'volume': quotes.get('volume', [None] * len(timestamps))
-                        }, index=dates)
-                        
-                        # 处理缺失值
-                        df = df.dropna()
-                        
-                        # 保存到缓存
-                        df.to_csv(cache_file)
-                        
-                        self.stock_data[symbol] = df
-                        print(f"成功获取 {symbol} 数据")
-                        return df
-                    else:
-                        print(f"获取 {symbol} 数据失败：数据结构不完整")
-                else:
-                    print(f"获取 {symbol} 数据失败：API返回错误")
-            else:
-                # 生成模拟数据（仅用于测试）
-                print(f"使用模拟数据代替 {symbol}")
-                dates = pd.date_range(end=datetime.datetime.now(), periods=252, freq='B')
-                np.random.seed(hash(symbol) % 10000)
-                
-                # 生成随机价格走势
-                close = np.random.randn(len(dates)).cumsum() + 100
-                # 确保价格为正
-                close = np.maximum(close, 1)
-                
-                # 生成其他价格数据
-                high = close * (1 + 0.02 * np.random.rand(len(dates)))
-                low = close * (1 - 0.02 * np.random.rand(len(dates)))
-                open_price = low + np.random.rand(len(dates)) * (high - low)
-                volume = np.random.randint(100000, 10000000, size=len(dates))
-                
-                df = pd.DataFrame({
-                    'open': open_price,
-                    'high': high,
-                    'low': low,
-                    'close': close,
-                    'volume': volume
-                }, index=dates)
-                
-                # 保存到缓存
-                df.to_csv(cache_file)
-                
-                self.stock_data[symbol] = df
-                return df
-                
-        except Exception as e:
-            print(f"获取 {symbol} 数据时出错: {str(e)}")
+        df, error = self.bulk_fetcher.fetch_one(symbol, period, interval)
+        if error is not None:
+            print(f"获取 {symbol} 数据时出错: {error}")
             return pd.DataFrame()
+        
+        self.stock_data[symbol] = df
+        self._data_params[symbol] = (period, interval)
+        return df
     
+    def _data_key(self, symbol: str) -> Optional[str]:
+        """获取股票当前数据（按记录的周期和间隔）的版本标识，用作分析结果缓存的数据指纹
+
+        Args:
+            symbol: 股票代码
+
+        Returns:
+            版本标识，未获取过该股票时返回None
+        """
+        if symbol not in self._data_params:
+            return None
+        period, interval = self._data_params[symbol]
+        return self.data_store.data_key(symbol, interval, period)
+    
+    def _reload_stock_data(self, symbol: str) -> Optional[pd.DataFrame]:
+        """从行情数据存储读取股票数据（周线/月线由存储按日线合成）
+        
+        Args:
+            symbol: 股票代码
+            
+        Returns:
+            股票数据DataFrame，存储中不存在时返回None
+        """
+        period, interval = self._data_params.get(symbol, ('1y', '1d'))
+        df = self.data_store.load(symbol, interval)
+        if df is None:
+            return None
+        return self.data_store.slice_period(df, period)
+    
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """获取内存中分析结果的占用和淘汰统计
+        
+        Returns:
+            各注册表的统计信息
+        """
+        return {
+            'stock_data': self.stock_data.stats(),
+            'patterns': self.patterns.stats(),
+            'support_resistance': self.support_resistance.stats(),
+            'trend_lines': self.trend_lines.stats(),
+            'result_cache': self.result_cache.stats(),
+            'market_data': self.data_store.memory_stats()
+        }
+    
+    @memoized_stage('technical_indicators')
     def calculate_technical_indicators(self, symbol: str) -> Dict[str, np.ndarray]:
         """计算技术指标
         
@@ -151,55 +134,13 @@ class ChartAnalysisSystem:
             
         df = self.stock_data[symbol]
         
-        # 计算移动平均线
-        ma5 = df['close'].rolling(window=5).mean()
-        ma10 = df['close'].rolling(window=10).mean()
-        ma20 = df['close'].rolling(window=20).mean()
-        ma60 = df['close'].rolling(window=60).mean()
-        
-        # 计算MACD
-        ema12 = df['close'].ewm(span=12, adjust=False).mean()
-        ema26 = df['close'].ewm(span=26, adjust=False).mean()
-        macd = ema12 - ema26
-        signal = macd.ewm(span=9, adjust=False).mean()
-        histogram = macd - signal
-        
-        # 计算RSI
-        delta = df['close'].diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        avg_gain = gain.rolling(window=14).mean()
-        avg_loss = loss.rolling(window=14).mean()
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        # 计算布林带
-        ma20 = df['close'].rolling(window=20).mean()
-        std20 = df['close'].rolling(window=20).std()
-        upper_band = ma20 + 2 * std20
-        lower_band = ma20 - 2 * std20
-        
-        # 计算成交量变化
-        volume_ma5 = df['volume'].rolling(window=5).mean()
-        volume_change = df['volume'] / volume_ma5
-        
-        # 存储计算结果
-        indicators = {
-            'ma5': ma5,
-            'ma10': ma10,
-            'ma20': ma20,
-            'ma60': ma60,
-            'macd': macd,
-            'macd_signal': signal,
-            'macd_histogram': histogram,
-            'rsi': rsi,
-            'upper_band': upper_band,
-            'lower_band': lower_band,
-            'volume_change': volume_change
-        }
+        # 与股票推荐系统共用指标引擎，结果转换为以日期为索引的Series
+        values = compute_indicators({symbol: df})[symbol]
+        indicators = {name: pd.Series(series, index=df.index) for name, series in values.items()}
         
         return indicators
     
+    @memoized_stage('support_resistance')
     def identify_support_resistance(self, symbol: str, window: int = 20, threshold: float = 0.02) -> Dict[str, List[Tuple[int, float]]]:
         """识别支撑位和阻力位
         
@@ -218,20 +159,10 @@ class ChartAnalysisSystem:
         df = self.stock_data[symbol]
         prices = df['close'].values
         
-        supports = []
-        resistances = []
-        
-        # 使用局部最小值识别支撑位
-        for i in range(window, len(prices) - window):
-            if all(prices[i] <= prices[i-j] for j in range(1, window+1)) and \
-               all(prices[i] <= prices[i+j] for j in range(1, window+1)):
-                supports.append((i, prices[i]))
-        
-        # 使用局部最大值识别阻力位
-        for i in range(window, len(prices) - window):
-            if all(prices[i] >= prices[i-j] for j in range(1, window+1)) and \
-               all(prices[i] >= prices[i+j] for j in range(1, window+1)):
-                resistances.append((i, prices[i]))
+        # 使用局部最小值识别支撑位，局部最大值识别阻力位
+        minima, maxima = local_extrema(prices, window)
+        supports = [(int(i), prices[i]) for i in minima]
+        resistances = [(int(i), prices[i]) for i in maxima]
         
         # 合并相近的支撑位和阻力位
         supports = self._merge_levels(supports, threshold)
@@ -275,6 +206,7 @@ class ChartAnalysisSystem:
         
         return merged
     
+    @memoized_stage('head_and_shoulders')
     def identify_head_and_shoulders(self, symbol: str, window: int = 20) -> List[Dict[str, Any]]:
         """识别头肩顶/底形态
         
@@ -386,12 +318,11 @@ class ChartAnalysisSystem:
         patterns = top_patterns + bottom_patterns
         
         # 存储结果
-        if symbol not in self.patterns:
-            self.patterns[symbol] = []
-        self.patterns[symbol].extend(patterns)
+        self.patterns[symbol] = self.patterns.get(symbol, []) + patterns
         
         return patterns
     
+    @memoized_stage('double_top_bottom')
     def identify_double_top_bottom(self, symbol: str, window: int = 20, threshold: float = 0.03) -> List[Dict[str, Any]]:
         """识别双顶/双底形态
         
@@ -488,12 +419,11 @@ class ChartAnalysisSystem:
         patterns = double_top_patterns + double_bottom_patterns
         
         # 存储结果
-        if symbol not in self.patterns:
-            self.patterns[symbol] = []
-        self.patterns[symbol].extend(patterns)
+        self.patterns[symbol] = self.patterns.get(symbol, []) + patterns
         
         return patterns
     
+    @memoized_stage('triangles')
     def identify_triangles(self, symbol: str, window: int = 10, min_points: int = 5) -> List[Dict[str, Any]]:
         """识别三角形整理形态
         
@@ -608,12 +538,11 @@ class ChartAnalysisSystem:
                     triangle_patterns.append(pattern)
         
         # 存储结果
-        if symbol not in self.patterns:
-            self.patterns[symbol] = []
-        self.patterns[symbol].extend(triangle_patterns)
+        self.patterns[symbol] = self.patterns.get(symbol, []) + triangle_patterns
         
         return triangle_patterns
     
+    @memoized_stage('trendline')
     def draw_trendline(self, symbol: str, window: int = 20, is_support: bool = True) -> Dict[str, Any]:
         """自动绘制趋势线
         
@@ -672,12 +601,39 @@ class ChartAnalysisSystem:
             'is_support': is_support
         }
         
-        if symbol not in self.trend_lines:
-            self.trend_lines[symbol] = []
-        self.trend_lines[symbol].append(trendline)
+        self.trend_lines[symbol] = self.trend_lines.get(symbol, []) + [trendline]
         
         return trendline
     
+    def _run_analysis_stages(self, symbol: str) -> Dict[str, pd.Series]:
+        """运行全部分析阶段，并以本次结果更新形态、支撑/阻力位和趋势线
+        
+        各阶段按数据指纹缓存，绘图和生成报告对同一版本的数据只计算一次；
+        结果直接赋值而不是追加，重复调用不会产生重复的形态和趋势线。
+        
+        Args:
+            symbol: 股票代码
+            
+        Returns:
+            技术指标字典
+        """
+        # 计算技术指标
+        indicators = self.calculate_technical_indicators(symbol)
+        
+        # 识别支撑位和阻力位
+        self.support_resistance[symbol] = self.identify_support_resistance(symbol)
+        
+        # 识别形态
+        self.patterns[symbol] = (self.identify_head_and_shoulders(symbol) +
+                                 self.identify_double_top_bottom(symbol) +
+                                 self.identify_triangles(symbol))
+        
+        # 绘制趋势线
+        trend_lines = [self.draw_trendline(symbol, is_support=True), self.draw_trendline(symbol, is_support=False)]
+        self.trend_lines[symbol] = [trendline for trendline in trend_lines if trendline]
+        
+        return indicators
+    
     def plot_chart_with_analysis(self, symbol: str) -> str:
         """绘制带有分析标识的股票图表
         
@@ -694,19 +650,7 @@ class ChartAnalysisSystem:
         df = self.stock_data[symbol]
         
         # 计算技术指标
-        indicators = self.calculate_technical_indicators(symbol)
-        
-        # 识别支撑位和阻力位
-        self.identify_support_resistance(symbol)
-        
-        # 识别形态
-        self.identify_head_and_shoulders(symbol)
-        self.identify_double_top_bottom(symbol)
-        self.identify_triangles(symbol)
-        
-        # 绘制趋势线
-        self.draw_trendline(symbol, is_support=True)
-        self.draw_trendline(symbol, is_support=False)
+        indicators = self._run_analysis_stages(symbol)
         
         # 创建图表
         fig, axes = plt.subplots(2, 1, figsize=(12, 10), gridspec_kw={'height_ratios': [3, 1]})
@@ -929,13 +873,7 @@ class ChartAnalysisSystem:
         df = self.stock_data[symbol]
         
         # 确保已经进行了所有分析
-        indicators = self.calculate_technical_indicators(symbol)
-        self.identify_support_resistance(symbol)
-        self.identify_head_and_shoulders(symbol)
-        self.identify_double_top_bottom(symbol)
-        self.identify_triangles(symbol)
-        self.draw_trendline(symbol, is_support=True)
-        self.draw_trendline(symbol, is_support=False)
+        indicators = self._run_analysis_stages(symbol)
         
         # 获取最新价格和技术指标
         latest_price = df['close'].iloc[-1]
@@ -0,0 +1,119 @@
+import json
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Tuple, Any, Optional, Union
+from trading_calendar import EXCHANGE_SESSIONS, exchange_for_symbol
+
+# 优先使用更快的JSON解析器
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# 行情数据列
+QUOTE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# 日线及以上的数据间隔，索引取交易所当地日期
+DAILY_INTERVALS = {'1d', '5d', '1wk', '1mo', '3mo'}
+
+
+def loads(payload: Union[str, bytes]) -> Any:
+    """解析JSON文本，安装了orjson时使用orjson
+
+    Args:
+        payload: JSON文本
+
+    Returns:
+        解析后的对象
+    """
+    if HAS_ORJSON:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _local_times(timestamps: List[int], meta: Dict[str, Any]) -> pd.DatetimeIndex:
+    """将UTC秒级时间戳逐个转换为交易所当地时间（不含时区）
+
+    按时区名称转换，每个时间戳使用其所在日期的UTC偏移，跨越夏令时切换的区间两侧都正确；
+    meta中没有时区名称时使用gmtoffset（固定偏移），两者都没有时使用股票代码所属交易所的时区。
+
+    Args:
+        timestamps: UTC秒级时间戳
+        meta: chart.result[0].meta
+
+    Returns:
+        当地时间的DatetimeIndex
+    """
+    times = pd.to_datetime(np.asarray(timestamps, dtype=np.int64), unit='s', utc=True)
+    tz_name = meta.get('exchangeTimezoneName')
+    if not tz_name and meta.get('gmtoffset') is not None:
+        return (times + pd.Timedelta(seconds=int(meta['gmtoffset']))).tz_localize(None)
+    if not tz_name:
+        tz_name = EXCHANGE_SESSIONS[exchange_for_symbol(meta.get('symbol', ''))][0]
+    return times.tz_convert(tz_name).tz_localize(None)
+
+
+def decode_chart_result(chart_data: Dict[str, Any], interval: str = '1d') -> Optional[Dict[str, np.ndarray]]:
+    """将get_stock_chart返回的chart.result[0]一次性转换为类型化的NumPy数组
+
+    时间戳按交易所时区转换为datetime64[ns]（日线及以上取当地日期），价格和成交量转换为float64，
+    缺失值(null)转换为NaN，并去除OHLC任一为空的K线。
+
+    Args:
+        chart_data: chart.result[0]
+        interval: 数据间隔
+
+    Returns:
+        包含'index'及OHLCV各列数组的字典，数据结构不完整时返回None
+    """
+    timestamps = chart_data.get('timestamp')
+    quotes = chart_data.get('indicators', {}).get('quote', [{}])[0]
+
+    if not timestamps or 'close' not in quotes:
+        return None
+
+    n = len(timestamps)
+    local_times = _local_times(timestamps, chart_data.get('meta', {}))
+    if interval in DAILY_INTERVALS:
+        local_times = local_times.normalize()
+
+    columns = {}
+    for column in QUOTE_COLUMNS:
+        values = quotes.get(column)
+        # None在转换为float时会变成NaN
+        columns[column] = np.array(values, dtype=np.float64) if values is not None else np.full(n, np.nan)
+
+    # 去除价格或成交量缺失的K线
+    valid = np.ones(n, dtype=bool)
+    for column in QUOTE_COLUMNS:
+        valid &= ~np.isnan(columns[column])
+
+    result = {'index': local_times.as_unit('ns').to_numpy()[valid]}
+    for column in QUOTE_COLUMNS:
+        result[column] = columns[column][valid]
+
+    return result
+
+
+def decode_chart_payload(payload: Union[str, bytes, Dict[str, Any]], interval: str = '1d') -> Optional[pd.DataFrame]:
+    """将get_stock_chart的返回结果（JSON文本或已解析的字典）转换为行情数据DataFrame
+
+    Args:
+        payload: API返回的JSON文本或字典
+        interval: 数据间隔
+
+    Returns:
+        以DatetimeIndex为索引的行情数据DataFrame，数据结构不完整时返回None
+    """
+    data = loads(payload) if isinstance(payload, (str, bytes)) else payload
+
+    if not ('chart' in data and 'result' in data['chart'] and data['chart']['result']):
+        return None
+
+    arrays = decode_chart_result(data['chart']['result'][0], interval)
+    if arrays is None:
+        return None
+
+    index = pd.DatetimeIndex(arrays.pop('index'))
+    return pd.DataFrame(arrays, index=index)
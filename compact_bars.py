@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Tuple, Any, Optional
+from trading_calendar import exchange_for_symbol
+
+# 价格列
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+
+# 按最小报价单位存储为整数的交易所及其缩放倍数（A股最小报价单位0.01元）
+TICK_SCALES = {'SSE': 100}
+
+# 一天的纳秒数
+NS_PER_DAY = 86400 * 10 ** 9
+
+
+class CompactBars:
+    """紧凑表示的K线数据
+
+    价格保存为int32最小报价单位（A股）或float32，成交量保存为int64，日线索引保存为int64纪元日。
+    进入指标计算时通过to_frame()还原为float64的DataFrame。
+    """
+
+    __slots__ = ('index', 'index_unit', 'prices', 'price_scale', 'volume')
+
+    def __init__(self, index: np.ndarray, index_unit: str, prices: Dict[str, np.ndarray],
+                 price_scale: int, volume: np.ndarray):
+        """初始化紧凑K线数据
+
+        Args:
+            index: int64时间索引
+            index_unit: 索引单位，'D'为纪元日，'ns'为纪元纳秒
+            prices: 各价格列数组（int32最小报价单位或float32）
+            price_scale: 价格缩放倍数，0表示价格为浮点数
+            volume: 成交量数组（int64，非整数成交量保留float64）
+        """
+        self.index = index
+        self.index_unit = index_unit
+        self.prices = prices
+        self.price_scale = price_scale
+        self.volume = volume
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, symbol: str = '') -> 'CompactBars':
+        """从行情数据DataFrame创建紧凑表示
+
+        Args:
+            df: 以DatetimeIndex为索引的OHLCV数据
+            symbol: 股票代码，用于判断是否按最小报价单位存储
+
+        Returns:
+            紧凑K线数据
+        """
+        # 索引：全部为零点时按纪元日存储
+        index_ns = df.index.values.astype('datetime64[ns]').astype(np.int64)
+        if len(index_ns) and not np.any(index_ns % NS_PER_DAY):
+            index, index_unit = index_ns // NS_PER_DAY, 'D'
+        else:
+            index, index_unit = index_ns, 'ns'
+
+        # 价格：所有价格都在最小报价单位网格上时存储为int32，否则存储为float32
+        price_values = {column: df[column].to_numpy(dtype=np.float64) for column in PRICE_COLUMNS}
+        price_scale = TICK_SCALES.get(exchange_for_symbol(symbol), 0) if symbol else 0
+        if price_scale:
+            ticks = {column: np.round(values * price_scale) for column, values in price_values.items()}
+            on_grid = all(
+                np.all(np.abs(ticks[column] / price_scale - values) <= 1e-6 * np.maximum(1.0, np.abs(values)))
+                and np.all(np.abs(ticks[column]) < 2 ** 31)
+                for column, values in price_values.items()
+            )
+            if not on_grid:
+                price_scale = 0
+
+        if price_scale:
+            prices = {column: ticks[column].astype(np.int32) for column in PRICE_COLUMNS}
+        else:
+            prices = {column: values.astype(np.float32) for column, values in price_values.items()}
+
+        # 成交量：dropna后可能变为浮点数，全部为整数时还原为int64
+        volume = df['volume'].to_numpy(dtype=np.float64)
+        if np.all(np.isfinite(volume)) and np.all(volume == np.round(volume)):
+            volume = volume.astype(np.int64)
+
+        return cls(index, index_unit, prices, price_scale, volume)
+
+    def to_frame(self) -> pd.DataFrame:
+        """还原为float64的行情数据DataFrame（供指标计算使用）
+
+        Returns:
+            以DatetimeIndex为索引的OHLCV数据
+        """
+        index_ns = self.index * NS_PER_DAY if self.index_unit == 'D' else self.index
+        columns = {}
+        for column in PRICE_COLUMNS:
+            values = self.prices[column].astype(np.float64)
+            columns[column] = values / self.price_scale if self.price_scale else values
+        columns['volume'] = self.volume.astype(np.float64)
+
+        return pd.DataFrame(columns, index=pd.DatetimeIndex(index_ns.astype('datetime64[ns]')))
+
+    @property
+    def nbytes(self) -> int:
+        """占用的字节数"""
+        return int(self.index.nbytes + self.volume.nbytes + sum(values.nbytes for values in self.prices.values()))
+
+    def __len__(self) -> int:
+        return len(self.index)
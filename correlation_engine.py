@@ -0,0 +1,325 @@
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Tuple, Any, Optional, Union
+from backtest_engine import align_dates, forward_fill
+
+# 默认滚动窗口（交易日）
+DEFAULT_WINDOW = 60
+
+
+def return_panel(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """由行情数据构建按日期对齐的日收益率表
+
+    停牌、非交易日及上市前的收益率记为0（价格不变），保证各股票在同一日期序列上累计。
+
+    Args:
+        frames: 股票代码到行情数据DataFrame的字典
+
+    Returns:
+        日收益率DataFrame，行为日期，列为股票代码
+    """
+    dates, panel, _ = align_dates(frames, ('close',))
+    close = forward_fill(panel['close'])
+    returns = np.zeros_like(close)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns[:, 1:] = close[:, 1:] / close[:, :-1] - 1
+    returns[~np.isfinite(returns)] = 0.0
+    return pd.DataFrame(returns.T, index=dates, columns=list(frames.keys()))
+
+
+class CorrelationEngine:
+    """日收益率的滚动（或指数加权）协方差与相关系数矩阵
+
+    滚动窗口模式维护窗口内收益率之和及外积之和，每加入一天只做两次秩1更新（加入新的一天、移出最早的一天），
+    窗口每滚动一整轮按窗口数据精确重算一次，消除累计的舍入误差；指数加权模式按递推公式更新均值和协方差。
+    查询某一日期时从当前状态向前推进，不从头计算；滚动窗口模式向后查询时只用该日期所在窗口的数据重建。
+    """
+
+    def __init__(self, returns: pd.DataFrame, window: int = DEFAULT_WINDOW, halflife: float = None,
+                 shrinkage: Union[float, str] = 0.0, checkpoint_every: int = None):
+        """初始化相关性引擎
+
+        Args:
+            returns: 日收益率DataFrame（行为日期，列为股票代码），可由return_panel构建
+            window: 滚动窗口（交易日），指定halflife时不使用
+            halflife: 指数加权的半衰期（交易日），为None时使用滚动窗口
+            shrinkage: 向缩放单位阵收缩的强度(0-1)，或'ledoit_wolf'（按窗口数据估计最优强度，仅滚动窗口模式）
+            checkpoint_every: 指数加权模式每隔多少天保存一次状态，用于向后查询，为None时从头重放
+        """
+        if shrinkage == 'ledoit_wolf' and halflife is not None:
+            raise ValueError("Ledoit-Wolf收缩仅支持滚动窗口模式")
+        self.symbols = list(returns.columns)
+        self.dates = returns.index
+        self.values = np.ascontiguousarray(returns.to_numpy(dtype=np.float64))
+        self._buffer = self.values  # values是其前len(dates)行的视图，append按倍数扩容，避免每天复制全部历史
+        self.window = window
+        self.halflife = halflife
+        self.alpha = 1 - 0.5 ** (1 / halflife) if halflife is not None else None
+        self.shrinkage = shrinkage
+        self.checkpoint_every = checkpoint_every
+        self._columns = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._checkpoints = {}
+        self._reset()
+
+    def _reset(self) -> None:
+        """清空状态（尚未加入任何一天）"""
+        n = len(self.symbols)
+        self.position = -1  # 已加入的最后一天在收益率表中的位置
+        self.count = 0
+        self._sum = np.zeros(n)  # 滚动：窗口内收益率之和；指数加权：均值
+        self._products = np.zeros((n, n))  # 滚动：窗口内外积之和；指数加权：协方差
+
+    def append(self, date: pd.Timestamp, returns: Union[pd.Series, np.ndarray]) -> None:
+        """追加新一天的收益率并更新到该日期
+
+        Args:
+            date: 日期（须晚于已有日期）
+            returns: 各股票的收益率（Series按股票代码对齐，缺失记为0）
+        """
+        if len(self.dates) and date <= self.dates[-1]:
+            raise ValueError(f"追加的日期须晚于 {self.dates[-1]}")
+        if isinstance(returns, pd.Series):
+            returns = returns.reindex(self.symbols).to_numpy(dtype=np.float64)
+        row = np.nan_to_num(np.asarray(returns, dtype=np.float64))
+        size = len(self.values)
+        if size == len(self._buffer):
+            # 容量用尽时扩容为两倍（首次追加时复制，不修改传入的收益率表）
+            buffer = np.empty((max(2 * size, 1), len(self.symbols)))
+            buffer[:size] = self.values
+            self._buffer = buffer
+        self._buffer[size] = row
+        self.values = self._buffer[:size + 1]
+        self.dates = self.dates.append(pd.DatetimeIndex([date]))
+        self.seek(len(self.dates) - 1)
+
+    def seek(self, position: int) -> None:
+        """将状态移动到收益率表的第position天（含）
+
+        Args:
+            position: 日期位置
+        """
+        if position < self.position:
+            if self.halflife is None:
+                self._rebuild(position)
+                return
+            # 指数加权：从不晚于目标日期的最近检查点重放
+            start = max((p for p in self._checkpoints if p <= position), default=None)
+            if start is None:
+                self._reset()
+            else:
+                self.position, self.count, mean, covariance = self._checkpoints[start]
+                self._sum, self._products = mean.copy(), covariance.copy()
+        elif self.halflife is None and position - self.position > self.window:
+            # 跳过的天数超过窗口时，直接用目标窗口的数据重建
+            self._rebuild(position)
+            return
+
+        while self.position < position:
+            self._step()
+
+    def _rebuild(self, position: int) -> None:
+        """用截至position的窗口数据精确重建滚动状态"""
+        block = self.values[max(position - self.window + 1, 0):position + 1]
+        self._sum = block.sum(axis=0)
+        self._products = block.T @ block
+        self.count = len(block)
+        self.position = position
+
+    def _step(self) -> None:
+        """加入下一天的收益率"""
+        self.position += 1
+        x = self.values[self.position]
+
+        if self.halflife is not None:
+            # 指数加权（与pandas ewm(adjust=False)的递推一致）：C = (1 - a) * (C + a * d d^T)，d为相对旧均值的偏差
+            if self.count == 0:
+                self._sum = x.copy()
+            else:
+                delta = x - self._sum
+                self._sum += self.alpha * delta
+                self._products += self.alpha * np.outer(delta, delta)
+                self._products *= 1 - self.alpha
+            self.count += 1
+            if self.checkpoint_every and self.position % self.checkpoint_every == 0:
+                self._checkpoints[self.position] = (self.position, self.count, self._sum.copy(), self._products.copy())
+            return
+
+        if self.count == self.window:
+            if self.position % self.window == 0:
+                # 窗口滚动一整轮后精确重算，消除秩1更新累计的舍入误差
+                self._rebuild(self.position)
+                return
+            y = self.values[self.position - self.window]
+            self._sum -= y
+            self._products -= np.outer(y, y)
+        else:
+            self.count += 1
+        self._sum += x
+        self._products += np.outer(x, x)
+
+    def _locate(self, date: pd.Timestamp = None) -> None:
+        """移动到指定日期（不晚于该日期的最后一个交易日），为None时移动到最新日期"""
+        if date is None:
+            position = len(self.dates) - 1
+        else:
+            position = int(self.dates.searchsorted(pd.Timestamp(date), side='right')) - 1
+            if position < 0:
+                raise KeyError(f"{date} 早于收益率表的第一个日期")
+        self.seek(position)
+
+    def covariance(self, date: pd.Timestamp = None, symbols: List[str] = None) -> pd.DataFrame:
+        """查询协方差矩阵
+
+        Args:
+            date: 日期，为None时使用最新日期
+            symbols: 股票代码列表，为None时返回全部股票
+
+        Returns:
+            协方差DataFrame
+        """
+        self._locate(date)
+        columns = self._select(symbols)
+        return pd.DataFrame(self._covariance(columns), index=[self.symbols[i] for i in columns],
+                            columns=[self.symbols[i] for i in columns])
+
+    def correlation(self, date: pd.Timestamp = None, symbols: List[str] = None) -> pd.DataFrame:
+        """查询相关系数矩阵（由收缩后的协方差矩阵换算，方差为0的股票相关系数为0）
+
+        Args:
+            date: 日期，为None时使用最新日期
+            symbols: 股票代码列表，为None时返回全部股票
+
+        Returns:
+            相关系数DataFrame
+        """
+        self._locate(date)
+        columns = self._select(symbols)
+        covariance = self._covariance(columns)
+        std = np.sqrt(np.diag(covariance))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = covariance / np.outer(std, std)
+        correlation[~np.isfinite(correlation)] = 0.0
+        np.fill_diagonal(correlation, np.where(std > 0, 1.0, 0.0))
+        labels = [self.symbols[i] for i in columns]
+        return pd.DataFrame(correlation, index=labels, columns=labels)
+
+    def most_correlated(self, symbol: str, k: int = 5, date: pd.Timestamp = None) -> List[Tuple[str, float]]:
+        """查询与指定股票收益率相关性最高的k只股票
+
+        Args:
+            symbol: 股票代码
+            k: 返回的股票数量
+            date: 日期，为None时使用最新日期
+
+        Returns:
+            (股票代码, 相关系数)列表，按相关系数降序
+        """
+        self._locate(date)
+        row = self._columns[symbol]
+        covariance = self._covariance(np.arange(len(self.symbols)), rows=np.array([row]))[0]
+        variances = self._variances()
+        intensity = self.shrinkage_intensity()
+        variances = (1 - intensity) * variances + intensity * np.mean(variances)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = covariance / np.sqrt(variances * variances[row])
+        correlation[~np.isfinite(correlation)] = -np.inf
+        correlation[row] = -np.inf
+        k = min(k, len(self.symbols) - 1)
+        top = np.argsort(-correlation, kind='stable')[:k]
+        return [(self.symbols[i], float(correlation[i])) for i in top if np.isfinite(correlation[i])]
+
+    def _select(self, symbols: List[str] = None) -> np.ndarray:
+        if symbols is None:
+            return np.arange(len(self.symbols))
+        return np.array([self._columns[symbol] for symbol in symbols], dtype=np.int64)
+
+    def _raw_covariance(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        """未收缩的样本协方差（滚动窗口为无偏估计，指数加权为递推协方差）"""
+        products = self._products[np.ix_(rows, columns)]
+        if self.halflife is not None:
+            return products.copy()
+        if self.count < 2:
+            return np.full((len(rows), len(columns)), np.nan)
+        return (products - np.outer(self._sum[rows], self._sum[columns]) / self.count) / (self.count - 1)
+
+    def _variances(self) -> np.ndarray:
+        """全部股票未收缩的方差"""
+        if self.halflife is not None:
+            variances = np.diag(self._products).copy()
+        elif self.count < 2:
+            return np.full(len(self.symbols), np.nan)
+        else:
+            variances = (np.diag(self._products) - self._sum ** 2 / self.count) / (self.count - 1)
+        return variances
+
+    def _covariance(self, columns: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """收缩后的协方差：(1 - δ) S + δ μ I，μ为全部股票方差的均值"""
+        rows = columns if rows is None else rows
+        covariance = self._raw_covariance(rows, columns)
+        intensity = self.shrinkage_intensity()
+        if intensity > 0:
+            target = np.mean(self._variances())
+            covariance = (1 - intensity) * covariance
+            covariance[rows[:, None] == columns[None, :]] += intensity * target
+        return covariance
+
+    def shrinkage_intensity(self) -> float:
+        """当前日期使用的收缩强度
+
+        'ledoit_wolf'时按窗口内（去均值后的）收益率估计：通过窗口的 W×W Gram 矩阵计算，代价为O(W²N)。
+
+        Returns:
+            收缩强度(0-1)
+        """
+        if self.shrinkage != 'ledoit_wolf':
+            return float(self.shrinkage)
+        block = self.values[self.position - self.count + 1:self.position + 1]
+        if len(block) < 2:
+            return 0.0
+        centered = block - block.mean(axis=0)
+        n, p = centered.shape
+        gram = centered @ centered.T
+        gram_norm = np.sum(gram ** 2)
+        mu = np.trace(gram) / n / p
+        # d² = ||S - μI||²，b̄² = Σ_t ||y_t y_t^T - S||² / n²（S = Y^T Y / n）
+        distance = gram_norm / n ** 2 - mu ** 2 * p
+        spread = (np.sum(np.diag(gram) ** 2) - gram_norm / n) / n ** 2
+        if distance <= 0:
+            return 1.0
+        return float(min(spread, distance) / distance)
+
+
+if __name__ == "__main__":
+    import time
+    from market_simulator import MarketSimulator, make_symbols
+
+    frames = MarketSimulator().generate(make_symbols(1000), 500)
+    returns = return_panel(frames)
+
+    engine = CorrelationEngine(returns, window=60)
+    engine.seek(59)
+    start = time.time()
+    for position in range(60, len(returns)):
+        engine.seek(position)
+    elapsed = time.time() - start
+    print(f"{returns.shape[1]} 只股票逐日滚动更新: 每天 {elapsed / (len(returns) - 60) * 1000:.1f}毫秒")
+
+    # 与pandas按窗口直接计算的结果对比
+    date = returns.index[-1]
+    window = returns.iloc[-60:]
+    error = np.abs(engine.correlation(date).values - window.corr().fillna(0).values).max()
+    print(f"最新日期相关系数最大误差: {error:.2e}")
+    past = returns.index[300]
+    error = np.abs(engine.covariance(past).values - returns.loc[:past].iloc[-60:].cov().values).max()
+    print(f"向后查询协方差最大误差: {error:.2e}")
+
+    ewm = CorrelationEngine(returns.iloc[:, :50], halflife=20)
+    expected = returns.iloc[:, :50].ewm(halflife=20, adjust=False).cov(bias=True).loc[date].values
+    print(f"指数加权协方差最大误差: {np.abs(ewm.covariance().values - expected).max():.2e}")
+
+    from sklearn.covariance import ledoit_wolf
+    shrunk = CorrelationEngine(returns, window=60, shrinkage='ledoit_wolf')
+    shrunk.seek(len(returns) - 1)
+    _, expected_intensity = ledoit_wolf(window.values)
+    print(f"Ledoit-Wolf收缩强度: {shrunk.shrinkage_intensity():.4f}（sklearn: {expected_intensity:.4f}）")
+    print(f"{returns.columns[0]} 相关性最高的股票: {engine.most_correlated(returns.columns[0], 3)}")
@@ -0,0 +1,118 @@
+import time
+import random
+import threading
+import zlib
+import functools
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Tuple, Any, Optional, Callable
+
+
+class FakeApiClient:
+    """本地模拟的YahooFinance API客户端
+
+    接口与data_api.ApiClient一致，返回结构与YahooFinance/get_stock_chart相同的数据，
+    并可配置请求延迟和失败率，用于在离线环境下测试和评估批量获取的性能。
+    """
+
+    # 数据周期对应的交易日数
+    RANGE_BARS = {
+        '1d': 1, '5d': 5, '1mo': 21, '3mo': 63, '6mo': 126,
+        '1y': 252, '2y': 504, '5y': 1260, '10y': 2520, 'ytd': 252, 'max': 5000
+    }
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        """初始化模拟客户端
+
+        Args:
+            latency: 每次请求的基础延迟（秒）
+            jitter: 延迟的随机波动范围（秒）
+            failure_rate: 请求失败（抛出异常）的概率
+            seed: 随机种子
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        # 请求统计
+        self.call_count = 0
+        self.calls = []
+
+    def factory(self) -> Callable[[], 'FakeApiClient']:
+        """获取创建同样配置的客户端的可序列化函数（用于在工作进程中创建客户端）
+
+        Returns:
+            无参数的创建函数
+        """
+        return functools.partial(FakeApiClient, latency=self.latency, jitter=self.jitter,
+                                 failure_rate=self.failure_rate, seed=self.seed)
+
+    def call_api(self, api_name: str, query: Dict[str, Any] = None) -> Dict[str, Any]:
+        """模拟调用API
+
+        Args:
+            api_name: API名称，仅支持'YahooFinance/get_stock_chart'
+            query: 查询参数
+
+        Returns:
+            API返回的JSON数据
+        """
+        query = query or {}
+
+        with self._lock:
+            self.call_count += 1
+            self.calls.append((api_name, dict(query)))
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.failure_rate
+
+        time.sleep(delay)
+
+        if failed:
+            raise ConnectionError(f"模拟请求失败: {query.get('symbol')}")
+
+        if api_name != 'YahooFinance/get_stock_chart':
+            return {}
+
+        return self._build_chart_response(query.get('symbol', ''), query.get('range', '1y'))
+
+    def _build_chart_response(self, symbol: str, period: str) -> Dict[str, Any]:
+        """生成与get_stock_chart结构一致的返回数据
+
+        Args:
+            symbol: 股票代码
+            period: 数据周期
+
+        Returns:
+            图表数据
+        """
+        n_bars = self.RANGE_BARS.get(period, 252)
+        dates = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=n_bars)
+        rng = np.random.RandomState((zlib.crc32(symbol.encode('utf-8')) + self.seed) % (2 ** 32))
+
+        close = np.maximum(rng.randn(n_bars).cumsum() + 100, 1)
+        high = close * (1 + 0.02 * rng.rand(n_bars))
+        low = close * (1 - 0.02 * rng.rand(n_bars))
+        open_price = low + rng.rand(n_bars) * (high - low)
+        volume = rng.randint(100000, 10000000, size=n_bars)
+
+        return {
+            'chart': {
+                'result': [{
+                    'meta': {'symbol': symbol, 'range': period},
+                    'timestamp': [int(ts) for ts in dates.as_unit('s').asi8],
+                    'indicators': {
+                        'quote': [{
+                            'open': open_price.tolist(),
+                            'high': high.tolist(),
+                            'low': low.tolist(),
+                            'close': close.tolist(),
+                            'volume': volume.tolist()
+                        }]
+                    }
+                }],
+                'error': None
+            }
+        }
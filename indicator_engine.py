@@ -0,0 +1,560 @@
+import math
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Tuple, Any, Optional
+from kernel_backend import recursive_smooth
+
+# 默认计算的指标名称
+INDICATOR_NAMES = [
+    'ma5', 'ma10', 'ma20', 'ma60', 'macd', 'macd_signal', 'macd_histogram',
+    'rsi', 'upper_band', 'lower_band', 'volume_change'
+]
+
+# 扩展指标：KDJ(9, 3, 3)、ATR(14)、OBV、DMI/ADX(14)、CCI(20)、VWAP（按交易日锚定）和20日滚动VWAP
+EXTENDED_INDICATOR_NAMES = [
+    'kdj_k', 'kdj_d', 'kdj_j', 'atr', 'obv', 'plus_di', 'minus_di', 'adx', 'cci', 'vwap', 'vwap20'
+]
+
+ALL_INDICATOR_NAMES = INDICATOR_NAMES + EXTENDED_INDICATOR_NAMES
+
+# 各指标需要的行情列
+INDICATOR_COLUMNS = {
+    'volume_change': ('volume',),
+    'kdj_k': ('high', 'low'), 'kdj_d': ('high', 'low'), 'kdj_j': ('high', 'low'),
+    'atr': ('high', 'low'), 'plus_di': ('high', 'low'), 'minus_di': ('high', 'low'), 'adx': ('high', 'low'),
+    'obv': ('volume',), 'cci': ('high', 'low'),
+    'vwap': ('high', 'low', 'volume', 'session'), 'vwap20': ('high', 'low', 'volume')
+}
+
+# 截断历史时EMA初值的残余权重上限：EMA的预热长度取残余权重降到该值以下所需的K线数
+EMA_WARMUP_TOLERANCE = 1e-6
+
+
+def _ema_warmup(span: int) -> int:
+    """EMA初值的权重衰减到EMA_WARMUP_TOLERANCE以下所需的K线数"""
+    return _smoothing_warmup(2.0 / (span + 1))
+
+
+def _smoothing_warmup(alpha: float) -> int:
+    """平滑系数为alpha的递推初值权重衰减到EMA_WARMUP_TOLERANCE以下所需的K线数"""
+    return math.ceil(math.log(EMA_WARMUP_TOLERANCE) / math.log(1 - alpha))
+
+
+# 计算最后一根K线的指标所需的预热K线数（不含该K线本身）
+# 滚动窗口类指标的结果与完整历史完全一致，EMA类指标的误差不超过EMA_WARMUP_TOLERANCE（相对价格波动）；
+# None表示依赖完整历史（累计量），指定lookback时仍使用全部K线
+INDICATOR_WARMUP = {
+    'ma5': 4,
+    'ma10': 9,
+    'ma20': 19,
+    'ma60': 59,
+    'macd': _ema_warmup(26),
+    'macd_signal': _ema_warmup(26) + _ema_warmup(9),
+    'macd_histogram': _ema_warmup(26) + _ema_warmup(9),
+    'rsi': 14,
+    'upper_band': 19,
+    'lower_band': 19,
+    'volume_change': 4,
+    'kdj_k': 8 + _smoothing_warmup(1 / 3),
+    'kdj_d': 8 + 2 * _smoothing_warmup(1 / 3),
+    'kdj_j': 8 + 2 * _smoothing_warmup(1 / 3),
+    'atr': 1 + _smoothing_warmup(1 / 14),
+    'plus_di': 1 + _smoothing_warmup(1 / 14),
+    'minus_di': 1 + _smoothing_warmup(1 / 14),
+    'adx': 1 + 2 * _smoothing_warmup(1 / 14),
+    'obv': None,
+    'cci': 19,
+    'vwap': None,
+    'vwap20': 19
+}
+
+
+def warmup_bars(names: List[str]) -> int:
+    """计算一组指标所需的最大预热K线数
+
+    Args:
+        names: 指标名称列表
+
+    Returns:
+        预热K线数，需要完整历史时返回None
+    """
+    warmups = [INDICATOR_WARMUP[name] for name in names]
+    if any(warmup is None for warmup in warmups):
+        return None
+    return max(warmups, default=0)
+
+
+def build_panel(frames: Dict[str, pd.DataFrame], columns: Tuple[str, ...] = ('close', 'volume'),
+                tail: int = None) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """将多只股票的行情数据对齐为 N×M 面板
+
+    各股票按K线位置右对齐（最后一根K线位于最后一列），不足M根的左侧以NaN填充。
+    同一交易所的股票最后交易日相同，各列即对应相同的交易日；按位置对齐也保证了每只股票的滚动窗口
+    与单独计算时完全一致（停牌日不会在窗口中形成空洞）。
+
+    Args:
+        frames: 股票代码到行情数据DataFrame的字典
+        columns: 需要对齐的列，'session'表示K线所属交易日（纪元日）
+        tail: 每只股票只取最后tail根K线，为None时取全部
+
+    Returns:
+        (列名到N×M数组的字典, 各股票K线数量数组)
+    """
+    lengths = np.array([len(df) for df in frames.values()], dtype=np.int64)
+    if tail is not None:
+        lengths = np.minimum(lengths, tail)
+    n, m = len(frames), int(lengths.max()) if len(lengths) else 0
+
+    panel = {column: np.full((n, m), np.nan) for column in columns}
+    for i, df in enumerate(frames.values()):
+        length = lengths[i]
+        if not length:
+            continue
+        for column in columns:
+            if column == 'session':
+                values = df.index.values[-length:].astype('datetime64[D]').astype(np.float64)
+            else:
+                values = df[column].to_numpy(dtype=np.float64)[-length:]
+            panel[column][i, m - length:] = values
+
+    return panel, lengths
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """沿时间轴（axis=1）计算滚动均值，窗口内有NaN时结果为NaN
+
+    Args:
+        values: N×M数组（每行有效值连续，仅左侧为NaN）
+        window: 窗口长度
+
+    Returns:
+        N×M滚动均值
+    """
+    sums = _window_sums(values, window)
+    sums /= window
+    return sums
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """沿时间轴计算滚动样本标准差（ddof=1）
+
+    先减去每行的首个有效值再累加平方和，降低大数相减带来的精度损失。
+
+    Args:
+        values: N×M数组（每行有效值连续，仅左侧为NaN）
+        window: 窗口长度
+
+    Returns:
+        N×M滚动标准差
+    """
+    centered = values - _first_valid(values)[:, None]
+    sums = _window_sums(centered, window)
+    variance = _window_sums(centered * centered, window)
+    variance -= sums * sums / window
+    variance /= window - 1
+    return np.sqrt(np.maximum(variance, 0.0, where=~np.isnan(variance), out=variance))
+
+
+def ewm_mean(values: np.ndarray, span: int) -> np.ndarray:
+    """沿时间轴计算指数移动平均（与pandas ewm(span, adjust=False)一致）
+
+    左侧填充的NaN先以首个有效值填充，使递推在首个有效值处从该值开始，计算后再恢复为NaN。
+
+    Args:
+        values: N×M数组（每行有效值连续，仅左侧为NaN）
+        span: 跨度
+
+    Returns:
+        N×M指数移动平均
+    """
+    return smooth(values, 2.0 / (span + 1))
+
+
+def smooth(values: np.ndarray, alpha: float, initial: float = None) -> np.ndarray:
+    """沿时间轴计算递推平滑 y_t = (1 - alpha) * y_{t-1} + alpha * x_t
+
+    initial为None时以首个有效值为初值（即ewm(alpha, adjust=False)，Wilder平滑取alpha=1/n）；
+    否则以initial为首个有效值之前的值（如KDJ的K、D初值50）。
+
+    Args:
+        values: N×M数组（每行有效值连续，仅左侧为NaN）
+        alpha: 平滑系数
+        initial: 递推初值
+
+    Returns:
+        N×M平滑结果
+    """
+    missing = np.isnan(values)
+    if initial is None:
+        fill = _first_valid(values)[:, None]
+    else:
+        fill = np.full((values.shape[0], 1), float(initial))
+    # 左侧以初值填充，递推在首个有效值之前保持初值不变
+    filled = np.where(missing, fill, values)
+
+    result = recursive_smooth(filled, alpha, fill[:, 0])
+    result[missing] = np.nan
+    return result
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """沿时间轴计算滚动最大值，窗口内有NaN时结果为NaN"""
+    return _rolling_reduce(values, window, np.max)
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """沿时间轴计算滚动最小值，窗口内有NaN时结果为NaN"""
+    return _rolling_reduce(values, window, np.min)
+
+
+def rolling_mean_deviation(values: np.ndarray, window: int) -> np.ndarray:
+    """沿时间轴计算滚动平均绝对偏差（相对窗口均值），用于CCI"""
+    def mean_deviation(windows, axis):
+        return np.abs(windows - windows.mean(axis=axis, keepdims=True)).mean(axis=axis)
+    return _rolling_reduce(values, window, mean_deviation)
+
+
+def _rolling_reduce(values: np.ndarray, window: int, reduce, block_rows: int = 512) -> np.ndarray:
+    """对滑动窗口视图按行分块归约，限制临时数组的大小"""
+    n, m = values.shape
+    result = np.full((n, m), np.nan)
+    if m < window:
+        return result
+    for start in range(0, n, block_rows):
+        windows = np.lib.stride_tricks.sliding_window_view(values[start:start + block_rows], window, axis=1)
+        result[start:start + block_rows, window - 1:] = reduce(windows, axis=-1)
+    return result
+
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """基于累加和计算滑动窗口内的和，窗口未被有效值填满的位置为NaN
+
+    左侧NaN按0累加，再根据每行首个有效值的位置屏蔽不完整的窗口。
+    """
+    n, m = values.shape
+    padded = np.zeros((n, m + 1))
+    np.cumsum(np.nan_to_num(values, nan=0.0), axis=1, out=padded[:, 1:])
+
+    sums = np.full(values.shape, np.nan)
+    if m >= window:
+        np.subtract(padded[:, window:], padded[:, :-window], out=sums[:, window - 1:])
+        start = np.isnan(values).sum(axis=1)
+        sums[np.arange(m)[None, :] < (start + window - 1)[:, None]] = np.nan
+    return sums
+
+
+def _first_valid(values: np.ndarray) -> np.ndarray:
+    """每行首个有效值（整行为NaN时为0）"""
+    valid = ~np.isnan(values)
+    first_index = valid.argmax(axis=1)
+    first = values[np.arange(values.shape[0]), first_index]
+    return np.where(valid.any(axis=1), first, 0.0)
+
+
+class IndicatorPanel:
+    """全市场技术指标面板
+
+    以 N×M 数组保存各项指标，可按股票代码取出该股票的指标字典（各数组为面板的视图，不复制数据）。
+    """
+
+    def __init__(self, symbols: List[str], values: Dict[str, np.ndarray], lengths: np.ndarray):
+        """初始化指标面板
+
+        Args:
+            symbols: 股票代码列表（与面板行对应）
+            values: 指标名称到N×M数组的字典
+            lengths: 各股票K线数量
+        """
+        self.symbols = list(symbols)
+        self.values = values
+        self.lengths = lengths
+        self._rows = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def __getitem__(self, symbol: str) -> Dict[str, np.ndarray]:
+        row = self._rows[symbol]
+        return {name: values[row, values.shape[1] - self.lengths[row]:] for name, values in self.values.items()}
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._rows
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def to_dict(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """转换为股票代码到指标字典的字典
+
+        Returns:
+            各股票的指标字典
+        """
+        return {symbol: self[symbol] for symbol in self.symbols}
+
+    def latest(self, name: str) -> np.ndarray:
+        """获取所有股票某项指标的最新值
+
+        Args:
+            name: 指标名称
+
+        Returns:
+            长度为N的数组
+        """
+        return self.values[name][:, -1]
+
+
+class _Kernels:
+    """在同一面板上计算指标，共用的中间结果（前收盘价、真实波幅、典型价格、滚动高低点等）只计算一次"""
+
+    def __init__(self, panel: Dict[str, np.ndarray]):
+        self.panel = panel
+        self.close = panel['close']
+        self._cache = {}
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def prev_close(self) -> np.ndarray:
+        """前一根K线的收盘价（首根K线为NaN）"""
+        return self._cached('prev_close', lambda: np.concatenate(
+            (np.full((self.close.shape[0], 1), np.nan), self.close[:, :-1]), axis=1))
+
+    def delta(self) -> np.ndarray:
+        """收盘价变化，首根有效K线记为0"""
+        def compute():
+            delta = self.close - self.prev_close()
+            delta[np.isnan(delta) & ~np.isnan(self.close)] = 0.0
+            return delta
+        return self._cached('delta', compute)
+
+    def ma(self, window: int) -> np.ndarray:
+        return self._cached(('ma', window), lambda: rolling_mean(self.close, window))
+
+    def std20(self) -> np.ndarray:
+        return self._cached('std20', lambda: rolling_std(self.close, 20))
+
+    def macd(self) -> Tuple[np.ndarray, np.ndarray]:
+        def compute():
+            macd = ewm_mean(self.close, 12) - ewm_mean(self.close, 26)
+            return macd, ewm_mean(macd, 9)
+        return self._cached('macd', compute)
+
+    def rsi(self) -> np.ndarray:
+        def compute():
+            delta = self.delta()
+            gain = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+            loss = np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                rs = rolling_mean(gain, 14) / rolling_mean(loss, 14)
+                return 100 - 100 / (1 + rs)
+        return self._cached('rsi', compute)
+
+    def kdj(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """KDJ(9, 3, 3)：RSV = (C - LLV9) / (HHV9 - LLV9) * 100，K、D以1/3平滑、初值50，J = 3K - 2D"""
+        def compute():
+            highest = rolling_max(self.panel['high'], 9)
+            lowest = rolling_min(self.panel['low'], 9)
+            spread = highest - lowest
+            with np.errstate(invalid='ignore', divide='ignore'):
+                # 窗口内最高价等于最低价时RSV取中值50
+                rsv = np.where(spread > 0, (self.close - lowest) / spread * 100, 50.0)
+            rsv[np.isnan(spread)] = np.nan
+            k = smooth(rsv, 1 / 3, initial=50.0)
+            d = smooth(k, 1 / 3, initial=50.0)
+            return k, d, 3 * k - 2 * d
+        return self._cached('kdj', compute)
+
+    def true_range(self) -> np.ndarray:
+        """真实波幅，首根K线为最高价与最低价之差"""
+        def compute():
+            high, low, prev_close = self.panel['high'], self.panel['low'], self.prev_close()
+            true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+            true_range[np.isnan(self.close)] = np.nan
+            return true_range
+        return self._cached('true_range', compute)
+
+    def atr(self) -> np.ndarray:
+        """ATR(14)：真实波幅的Wilder平滑"""
+        return self._cached('atr', lambda: smooth(self.true_range(), 1 / 14))
+
+    def dmi(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """DMI(14)：+DI、-DI与ADX，与ATR共用真实波幅"""
+        def compute():
+            high, low = self.panel['high'], self.panel['low']
+            up = np.diff(high, axis=1, prepend=np.nan)
+            down = -np.diff(low, axis=1, prepend=np.nan)
+            valid = ~np.isnan(self.close)
+            # 首根K线没有前值，方向变动记为0
+            plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+            minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+            plus_dm[~valid] = np.nan
+            minus_dm[~valid] = np.nan
+
+            atr = self.atr()
+            with np.errstate(invalid='ignore', divide='ignore'):
+                plus_di = 100 * smooth(plus_dm, 1 / 14) / atr
+                minus_di = 100 * smooth(minus_dm, 1 / 14) / atr
+                di_sum = plus_di + minus_di
+                dx = np.where(di_sum > 0, 100 * np.abs(plus_di - minus_di) / di_sum, 0.0)
+            dx[np.isnan(di_sum)] = np.nan
+            return plus_di, minus_di, smooth(dx, 1 / 14)
+        return self._cached('dmi', compute)
+
+    def obv(self) -> np.ndarray:
+        """OBV：按收盘价涨跌方向累计成交量，首根K线为0"""
+        signed = np.sign(self.delta()) * self.panel['volume']
+        obv = np.cumsum(np.nan_to_num(signed, nan=0.0), axis=1)
+        obv[np.isnan(self.close)] = np.nan
+        return obv
+
+    def typical_price(self) -> np.ndarray:
+        return self._cached('typical_price', lambda: (self.panel['high'] + self.panel['low'] + self.close) / 3)
+
+    def cci(self) -> np.ndarray:
+        """CCI(20) = (TP - MA20(TP)) / (0.015 * 平均绝对偏差)"""
+        typical = self.typical_price()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (typical - rolling_mean(typical, 20)) / (0.015 * rolling_mean_deviation(typical, 20))
+
+    def vwap(self) -> np.ndarray:
+        """按交易日锚定的VWAP：当日开盘以来典型价格的成交量加权均值（日线即为当日典型价格）"""
+        typical, volume, session = self.typical_price(), self.panel['volume'], self.panel['session']
+        weighted = np.cumsum(np.nan_to_num(typical * volume, nan=0.0), axis=1)
+        cumulative_volume = np.cumsum(np.nan_to_num(volume, nan=0.0), axis=1)
+
+        # 每根K线所属交易日的首根K线位置
+        n, m = session.shape
+        positions = np.broadcast_to(np.arange(m), (n, m))
+        starts = np.where(np.diff(session, axis=1, prepend=np.nan) != 0, positions, 0)
+        starts = np.maximum.accumulate(starts, axis=1)
+
+        rows = np.arange(n)[:, None]
+        before = starts - 1
+        weighted_before = np.where(before >= 0, weighted[rows, np.maximum(before, 0)], 0.0)
+        volume_before = np.where(before >= 0, cumulative_volume[rows, np.maximum(before, 0)], 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vwap = (weighted - weighted_before) / (cumulative_volume - volume_before)
+        vwap[np.isnan(self.close)] = np.nan
+        return vwap
+
+    def vwap20(self) -> np.ndarray:
+        """20根K线滚动VWAP"""
+        typical, volume = self.typical_price(), self.panel['volume']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return rolling_mean(typical * volume, 20) / rolling_mean(volume, 20)
+
+    def compute(self, name: str) -> np.ndarray:
+        """计算单项指标"""
+        if name.startswith('ma') and name[2:].isdigit():
+            return self.ma(int(name[2:]))
+        if name in ('macd', 'macd_signal', 'macd_histogram'):
+            macd, signal = self.macd()
+            return {'macd': macd, 'macd_signal': signal, 'macd_histogram': macd - signal}[name]
+        if name == 'rsi':
+            return self.rsi()
+        if name == 'upper_band':
+            return self.ma(20) + 2 * self.std20()
+        if name == 'lower_band':
+            return self.ma(20) - 2 * self.std20()
+        if name == 'volume_change':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return self.panel['volume'] / rolling_mean(self.panel['volume'], 5)
+        if name in ('kdj_k', 'kdj_d', 'kdj_j'):
+            return self.kdj()[('kdj_k', 'kdj_d', 'kdj_j').index(name)]
+        if name == 'atr':
+            return self.atr()
+        if name in ('plus_di', 'minus_di', 'adx'):
+            return self.dmi()[('plus_di', 'minus_di', 'adx').index(name)]
+        if name == 'obv':
+            return self.obv()
+        if name == 'cci':
+            return self.cci()
+        if name == 'vwap':
+            return self.vwap()
+        return self.vwap20()
+
+
+def compute_indicators(frames: Dict[str, pd.DataFrame], names: List[str] = None,
+                       lookback: int = None) -> IndicatorPanel:
+    """一次性计算多只股票的技术指标
+
+    可计算均线(MA5/10/20/60)、MACD(12, 26, 9)、RSI(14)、布林带(20, 2)和成交量变化（相对5日均量），
+    与逐只股票使用pandas rolling/ewm的结果一致；以及EXTENDED_INDICATOR_NAMES中的扩展指标。
+    只计算names中的指标，相关指标共用中间结果（如真实波幅同时用于ATR和ADX）；指定lookback时，
+    每只股票只截取最后lookback根K线加上所需的预热K线进行计算，结果只包含最后lookback根K线。
+
+    Args:
+        frames: 股票代码到行情数据DataFrame的字典
+        names: 需要的指标名称列表，为None时计算INDICATOR_NAMES中的指标
+        lookback: 需要的K线数（如1表示只需最新值），为None时计算完整历史
+
+    Returns:
+        技术指标面板
+    """
+    names = list(INDICATOR_NAMES if names is None else names)
+    unknown = set(names) - set(ALL_INDICATOR_NAMES)
+    if unknown:
+        raise ValueError(f"未知的技术指标: {', '.join(sorted(unknown))}")
+
+    symbols = list(frames.keys())
+    columns = ['close']
+    for name in names:
+        columns += [column for column in INDICATOR_COLUMNS.get(name, ()) if column not in columns]
+    warmup = warmup_bars(names)
+    tail = lookback + warmup if lookback is not None and warmup is not None else None
+    panel, lengths = build_panel(frames, tuple(columns), tail)
+
+    kernels = _Kernels(panel)
+    values = {name: kernels.compute(name) for name in names}
+
+    if lookback is not None and panel['close'].shape[1] > lookback:
+        values = {name: array[:, -lookback:] for name, array in values.items()}
+        lengths = np.minimum(lengths, lookback)
+
+    return IndicatorPanel(symbols, values, lengths)
+
+
+if __name__ == "__main__":
+    import time
+    from market_simulator import MarketSimulator, make_symbols
+
+    symbols = make_symbols(5000)
+    frames = MarketSimulator().generate(symbols, 1260)
+
+    start = time.time()
+    indicators = compute_indicators(frames)
+    print(f"计算 {len(symbols)} 只股票 × 1260 根K线的技术指标耗时: {time.time() - start:.2f}秒")
+
+    start = time.time()
+    extended = compute_indicators(frames, EXTENDED_INDICATOR_NAMES)
+    print(f"计算扩展指标耗时: {time.time() - start:.2f}秒")
+
+    # 与逐只股票的pandas实现对比
+    start = time.time()
+    max_error = 0.0
+    for symbol in symbols[:200]:
+        close = frames[symbol]['close']
+        delta = close.diff()
+        rs = delta.where(delta > 0, 0).rolling(14).mean() / (-delta.where(delta < 0, 0)).rolling(14).mean()
+        ema12 = close.ewm(span=12, adjust=False).mean()
+        ema26 = close.ewm(span=26, adjust=False).mean()
+        expected = {
+            'ma60': close.rolling(60).mean(),
+            'macd_signal': (ema12 - ema26).ewm(span=9, adjust=False).mean(),
+            'rsi': 100 - 100 / (1 + rs),
+            'upper_band': close.rolling(20).mean() + 2 * close.rolling(20).std()
+        }
+        high, low, prev_close = frames[symbol]['high'], frames[symbol]['low'], close.shift()
+        true_range = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+        typical = (high + low + close) / 3
+        volume = frames[symbol]['volume']
+        expected_extended = {
+            'atr': true_range.ewm(alpha=1 / 14, adjust=False).mean(),
+            'obv': (np.sign(close.diff()).fillna(0) * volume).cumsum(),
+            'vwap20': (typical * volume).rolling(20).sum() / volume.rolling(20).sum()
+        }
+        for panel, reference in ((indicators, expected), (extended, expected_extended)):
+            for name, series in reference.items():
+                error = np.nanmax(np.abs(panel[symbol][name] - series.values) / np.maximum(1.0, np.abs(series.values)))
+                max_error = max(max_error, error)
+    pandas_time = (time.time() - start) * len(symbols) / 200
+    print(f"逐只股票pandas计算预计耗时: {pandas_time:.2f}秒，最大相对误差: {max_error:.2e}")
@@ -0,0 +1,207 @@
+import numpy as np
+from scipy.signal import lfilter
+from typing import List, Dict, Tuple, Any, Optional
+
+try:
+    import numba
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# 可用的计算后端：numpy（向量化实现，始终可用）和numba（JIT编译的顺序循环，需安装numba）
+BACKEND_NAMES = ('numpy', 'numba')
+
+
+def _numpy_recursive_smooth(filled: np.ndarray, alpha: float, initial: np.ndarray) -> np.ndarray:
+    """逐行计算 y_t = (1 - alpha) * y_{t-1} + alpha * x_t，y_{-1}为各行的initial"""
+    result, _ = lfilter([alpha], [1, alpha - 1], filled, axis=1, zi=((1 - alpha) * initial[:, None]))
+    return result
+
+
+def _numpy_forward_max(prices: np.ndarray, n_days: int) -> np.ndarray:
+    """第i个元素为prices[..., i+1:i+n_days+1]的最大值，共M-n_days个"""
+    return np.lib.stride_tricks.sliding_window_view(prices[..., 1:], n_days, axis=-1).max(axis=-1)
+
+
+def _numpy_local_extrema(prices: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """前后window根K线内的局部最小值和最大值位置（与前后各点比较，含相等）"""
+    if len(prices) < 2 * window + 1:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    windows = np.lib.stride_tricks.sliding_window_view(prices, 2 * window + 1)
+    center = prices[window:len(prices) - window]
+    # 窗口内有NaN时最值为NaN，比较结果为False（与逐点比较一致）
+    minima = np.flatnonzero(center <= windows.min(axis=1)) + window
+    maxima = np.flatnonzero(center >= windows.max(axis=1)) + window
+    return minima, maxima
+
+
+if HAS_NUMBA:
+    @numba.njit(cache=True)
+    def _jit_recursive_smooth(filled, alpha, initial):
+        n, m = filled.shape
+        result = np.empty((n, m))
+        for i in range(n):
+            value = initial[i]
+            for j in range(m):
+                value = (1 - alpha) * value + alpha * filled[i, j]
+                result[i, j] = value
+        return result
+
+    @numba.njit(cache=True)
+    def _jit_forward_max_1d(prices, n_days, out):
+        for i in range(len(out)):
+            best = prices[i + 1]
+            for j in range(i + 2, i + n_days + 1):
+                value = prices[j]
+                if value != value or best != best:
+                    best = np.nan
+                    break
+                if value > best:
+                    best = value
+            out[i] = best
+
+    @numba.njit(cache=True)
+    def _jit_local_extrema(prices, window):
+        n = len(prices)
+        minima = np.empty(max(n, 0), dtype=np.int64)
+        maxima = np.empty(max(n, 0), dtype=np.int64)
+        n_min = n_max = 0
+        for i in range(window, n - window):
+            price = prices[i]
+            is_min = True
+            is_max = True
+            for j in range(i - window, i + window + 1):
+                if not price <= prices[j]:
+                    is_min = False
+                if not price >= prices[j]:
+                    is_max = False
+                if not is_min and not is_max:
+                    break
+            if is_min:
+                minima[n_min] = i
+                n_min += 1
+            if is_max:
+                maxima[n_max] = i
+                n_max += 1
+        return minima[:n_min], maxima[:n_max]
+
+    def _jit_forward_max(prices: np.ndarray, n_days: int) -> np.ndarray:
+        rows = np.ascontiguousarray(prices, dtype=np.float64).reshape(-1, prices.shape[-1])
+        out = np.empty((rows.shape[0], max(rows.shape[1] - n_days, 0)))
+        for i in range(rows.shape[0]):
+            _jit_forward_max_1d(rows[i], n_days, out[i])
+        return out.reshape(prices.shape[:-1] + (out.shape[1],))
+
+
+_KERNELS = {
+    'numpy': {
+        'recursive_smooth': _numpy_recursive_smooth,
+        'forward_max': _numpy_forward_max,
+        'local_extrema': _numpy_local_extrema
+    }
+}
+if HAS_NUMBA:
+    _KERNELS['numba'] = {
+        'recursive_smooth': lambda filled, alpha, initial: _jit_recursive_smooth(
+            np.ascontiguousarray(filled, dtype=np.float64), float(alpha), np.ascontiguousarray(initial, dtype=np.float64)),
+        'forward_max': _jit_forward_max,
+        'local_extrema': lambda prices, window: _jit_local_extrema(np.ascontiguousarray(prices, dtype=np.float64), int(window))
+    }
+
+# 当前后端：安装了numba时默认使用JIT实现
+_backend = 'numba' if HAS_NUMBA else 'numpy'
+
+
+def get_backend() -> str:
+    """获取当前计算后端名称"""
+    return _backend
+
+
+def set_backend(name: str) -> None:
+    """切换计算后端
+
+    Args:
+        name: 后端名称（'numpy'或'numba'）
+    """
+    global _backend
+    if name not in BACKEND_NAMES:
+        raise ValueError(f"未知的计算后端: {name}")
+    if name not in _KERNELS:
+        raise ValueError(f"计算后端 {name} 不可用，请先安装numba")
+    _backend = name
+
+
+def recursive_smooth(filled: np.ndarray, alpha: float, initial: np.ndarray) -> np.ndarray:
+    """逐行计算递推平滑 y_t = (1 - alpha) * y_{t-1} + alpha * x_t
+
+    Args:
+        filled: N×M数组（不含NaN）
+        alpha: 平滑系数
+        initial: 各行首个值之前的递推值（长度N）
+
+    Returns:
+        N×M平滑结果
+    """
+    return _KERNELS[_backend]['recursive_smooth'](filled, alpha, initial)
+
+
+def forward_max(prices: np.ndarray, n_days: int) -> np.ndarray:
+    """计算之后n_days根K线内的最高价
+
+    Args:
+        prices: 价格数组（最后一维为时间轴）
+        n_days: 向前查看的K线数
+
+    Returns:
+        最后一维长度为M-n_days的数组，第i个元素为prices[..., i+1:i+n_days+1]的最大值
+    """
+    return _KERNELS[_backend]['forward_max'](prices, n_days)
+
+
+def local_extrema(prices: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """查找局部极值：不高于（不低于）前后各window根K线的位置
+
+    Args:
+        prices: 一维价格数组
+        window: 局部极值窗口大小
+
+    Returns:
+        (局部最小值位置数组, 局部最大值位置数组)
+    """
+    return _KERNELS[_backend]['local_extrema'](prices, window)
+
+
+def _reference_forward_max(prices: np.ndarray, n_days: int) -> np.ndarray:
+    """逐点循环的参考实现"""
+    return np.array([max(prices[i + 1:i + n_days + 1]) for i in range(len(prices) - n_days)])
+
+
+def _reference_local_extrema(prices: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """逐点循环的参考实现"""
+    minima, maxima = [], []
+    for i in range(window, len(prices) - window):
+        if all(prices[i] <= prices[i - j] for j in range(1, window + 1)) and \
+           all(prices[i] <= prices[i + j] for j in range(1, window + 1)):
+            minima.append(i)
+        if all(prices[i] >= prices[i - j] for j in range(1, window + 1)) and \
+           all(prices[i] >= prices[i + j] for j in range(1, window + 1)):
+            maxima.append(i)
+    return np.array(minima, dtype=np.int64), np.array(maxima, dtype=np.int64)
+
+
+if __name__ == "__main__":
+    import time
+
+    # 各后端与参考实现的一致性校验见tests/test_kernel_backend.py
+    rng = np.random.default_rng(0)
+    panel = rng.normal(size=(5000, 1260)).cumsum(axis=1) + 1000
+    for backend in [name for name in BACKEND_NAMES if name in _KERNELS]:
+        set_backend(backend)
+        forward_max(panel[:2], 5)
+        start = time.time()
+        forward_max(panel, 5)
+        recursive_smooth(panel, 1 / 14, panel[:, 0])
+        print(f"{backend}: 5000×1260 面板耗时 {time.time() - start:.2f}秒")
+
+    if not HAS_NUMBA:
+        print("未安装numba，仅测试numpy后端")
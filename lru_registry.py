@@ -0,0 +1,241 @@
+import os
+import sys
+import threading
+import pandas as pd
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import List, Dict, Tuple, Any, Optional, Callable
+
+# 默认内存预算（MB），可通过环境变量调整
+DEFAULT_MEMORY_BUDGET = int(os.environ.get('MARKET_DATA_MEMORY_BUDGET_MB', '512')) * 1024 * 1024
+
+
+def estimate_size(value: Any) -> int:
+    """估算对象占用的内存字节数
+
+    Args:
+        value: DataFrame、Series、ndarray（或其他提供nbytes的对象）或由它们组成的字典/列表
+
+    Returns:
+        估算的字节数
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=False))
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRURegistry(MutableMapping):
+    """按内存预算淘汰的LRU注册表
+
+    超出字节预算时按最近最少使用的顺序淘汰条目，固定(pin)的条目不会被淘汰。
+    提供loader时，被淘汰的条目在再次访问时通过loader重新加载（如从磁盘存储读取），
+    此时in、迭代和len包含已淘汰的键；批量处理应使用resident_keys/peek，避免把全部已淘汰的条目重新加载回内存。
+
+    预算为0且提供loader时为直通模式：不保存值，只记录可加载的键，每次访问都通过loader读取，
+    用于下层已有按预算缓存的情况（如行情数据由共享存储的注册表缓存），避免同一份数据在两层分别计入预算。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_BUDGET, loader: Callable[[Any], Any] = None, name: str = ''):
+        """初始化LRU注册表
+
+        Args:
+            max_bytes: 内存预算（字节），为0且提供loader时为直通模式
+            loader: 条目被淘汰后重新加载的函数，接收键，返回值或None
+            name: 注册表名称（用于统计信息）
+        """
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.name = name
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._pinned = set()
+        self._evicted = set()  # 已淘汰、可通过loader重新加载的键
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    def __getitem__(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+
+            self.misses += 1
+            if self.loader is None or key not in self._evicted:
+                raise KeyError(key)
+
+        # 在锁外加载，避免阻塞其他键的访问
+        value = self.loader(key)
+        if value is None:
+            raise KeyError(key)
+
+        with self._lock:
+            self.reloads += 1
+            if not self._passthrough(key):
+                self[key] = value
+            return value
+
+    def _passthrough(self, key) -> bool:
+        """是否为直通模式下不保存值的键（固定的键仍然保存）"""
+        return self.max_bytes <= 0 and self.loader is not None and key not in self._pinned
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            if self._passthrough(key):
+                if key in self._data:
+                    del self._data[key]
+                    self._total_bytes -= self._sizes.pop(key)
+                self._evicted.add(key)
+                return
+
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._data:
+                self._total_bytes -= self._sizes[key]
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._sizes[key] = size
+            self._total_bytes += size
+            self._evicted.discard(key)
+            self._evict()
+
+    def __delitem__(self, key):
+        with self._lock:
+            if key in self._data:
+                del self._data[key]
+                self._total_bytes -= self._sizes.pop(key)
+            elif key in self._evicted:
+                self._evicted.discard(key)
+            else:
+                raise KeyError(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data or (self.loader is not None and key in self._evicted)
+
+    def __iter__(self):
+        with self._lock:
+            keys = list(self._data.keys())
+            if self.loader is not None:
+                keys += [key for key in self._evicted if key not in self._data]
+        return iter(keys)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data) + (len(self._evicted) if self.loader is not None else 0)
+
+    def clear(self) -> None:
+        """清空所有条目（包括已淘汰的键记录），固定设置保留"""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._evicted.clear()
+            self._total_bytes = 0
+
+    def _evict(self) -> None:
+        """淘汰条目直到占用不超过预算"""
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        for key in list(self._data.keys()):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if key in self._pinned:
+                continue
+
+            del self._data[key]
+            size = self._sizes.pop(key)
+            self._total_bytes -= size
+            self._evicted.add(key)
+            self.evictions += 1
+            self.evicted_bytes += size
+
+    def resident_keys(self) -> List[Any]:
+        """获取当前在内存中的键（不包括已淘汰、可重新加载的键）
+
+        Returns:
+            键列表，按最近使用时间从旧到新
+        """
+        with self._lock:
+            return list(self._data.keys())
+
+    def peek(self, key, default=None) -> Any:
+        """读取内存中的条目，不触发加载，也不改变淘汰顺序
+
+        Args:
+            key: 键
+            default: 条目不在内存中时返回的值
+
+        Returns:
+            条目的值或default
+        """
+        with self._lock:
+            return self._data.get(key, default)
+
+    def mark_loadable(self, keys) -> None:
+        """记录可通过loader按需加载的键（不立即加载，如由其他进程写入存储的数据）
+
+        Args:
+            keys: 单个键或键列表/集合
+        """
+        if self.loader is None:
+            raise ValueError("未设置loader的注册表无法按需加载")
+        with self._lock:
+            self._evicted.update(key for key in (keys if isinstance(keys, (list, set)) else [keys])
+                                 if key not in self._data)
+
+    def pin(self, keys) -> None:
+        """固定条目，使其不会被淘汰（键可以尚未加载）
+
+        Args:
+            keys: 单个键或键列表/集合
+        """
+        with self._lock:
+            self._pinned.update(keys if isinstance(keys, (list, set)) else [keys])
+
+    def unpin(self, keys) -> None:
+        """取消固定条目
+
+        Args:
+            keys: 单个键或键列表/集合
+        """
+        with self._lock:
+            self._pinned.difference_update(keys if isinstance(keys, (list, set)) else [keys])
+            self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取统计信息
+
+        Returns:
+            包含条目数、占用字节、命中/未命中、淘汰等信息的字典
+        """
+        with self._lock:
+            return {
+                'name': self.name,
+                'entries': len(self._data),
+                'evicted_entries': len(self._evicted),
+                'pinned': len(self._pinned),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'evictions': self.evictions,
+                'evicted_bytes': self.evicted_bytes,
+                'hit_rate': self.hits / max(1, self.hits + self.misses)
+            }
@@ -0,0 +1,788 @@
+import os
+import json
+import datetime
+import threading
+import tempfile
+import numpy as np
+import pandas as pd
+from concurrent.futures import Future
+from typing import List, Dict, Tuple, Any, Optional
+from trading_calendar import FreshnessPolicy
+from chart_decoder import decode_chart_payload
+from lru_registry import LRURegistry, DEFAULT_MEMORY_BUDGET
+from compact_bars import CompactBars
+from bar_resampler import BarResampler, RESAMPLED_INTERVALS
+from market_simulator import MarketSimulator
+
+# 跨进程文件锁
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    import msvcrt
+    HAS_FCNTL = False
+
+# 行情数据列
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# 数据周期对应的自然日数，用于判断已存储数据能否覆盖请求的周期
+PERIOD_DAYS = {
+    '1d': 1,
+    '5d': 5,
+    '1mo': 31,
+    '3mo': 92,
+    '6mo': 183,
+    '1y': 366,
+    '2y': 731,
+    '5y': 1827,
+    '10y': 3653,
+    'ytd': 366,
+    'max': 36500
+}
+
+# 增量更新时可请求的数据周期，按覆盖范围从小到大排列
+DELTA_RANGES = ['5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y']
+
+
+class FileLock:
+    """基于锁文件的排他锁，用于多个工作进程之间同步分区读写"""
+
+    def __init__(self, path: str):
+        """初始化文件锁
+
+        Args:
+            path: 锁文件路径
+        """
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, 'a+')
+        if HAS_FCNTL:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if HAS_FCNTL:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class SingleFlight:
+    """合并并发的相同请求：同一个键同一时刻只执行一次，其余调用方等待并共享结果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # 进行中的请求，键为请求键，值为Future
+        self.coalesced = 0  # 被合并的请求数
+
+    def do(self, key: Any, fn, *args, **kwargs) -> Any:
+        """执行请求，若相同键的请求正在进行则等待其结果
+
+        Args:
+            key: 请求键
+            fn: 实际执行的函数
+
+        Returns:
+            函数返回值
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+def _atomic_write(path: str, write_fn) -> None:
+    """先写入同目录下的临时文件再重命名，保证读取方不会看到写了一半的文件
+
+    Args:
+        path: 目标文件路径
+        write_fn: 接收文件对象并写入内容的函数
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_fn(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class MarketDataStore:
+    """统一的列式行情数据存储
+
+    每个(股票代码, 数据间隔)对应一个分区目录，日期索引和OHLCV各列分别保存为.npy文件，
+    加载时直接读取二进制数组，无需解析CSV和日期字符串。进程内注册表保证同一分区只加载一次，
+    股票推荐、图表分析和市场复盘三个系统共享同一份数据。
+    """
+
+    def __init__(self, root_dir: str = 'data/market_data', freshness_policy: FreshnessPolicy = None,
+                 memory_budget: int = DEFAULT_MEMORY_BUDGET, compact: bool = False):
+        """初始化行情数据存储
+
+        Args:
+            root_dir: 数据根目录
+            freshness_policy: 缓存新鲜度策略，为None时使用基于交易日历的默认策略
+            memory_budget: 进程内注册表的内存预算（字节），超出后淘汰最近最少使用的分区
+            compact: 是否在内存中以紧凑类型（int32最小报价单位/float32价格、int64成交量和纪元日索引）保存数据，
+                预算中的1/8用于缓存最近访问的还原后DataFrame，避免每次访问都重新转换
+        """
+        self.root_dir = root_dir
+        self.freshness_policy = freshness_policy or FreshnessPolicy()
+        self.compact = compact
+        self.resampler = BarResampler(self)
+        frame_budget = memory_budget // 8 if compact else 0
+        self._registry = LRURegistry(memory_budget - frame_budget, name='market_data')  # 进程内注册表，键为(股票代码, 数据间隔)，值为DataFrame或CompactBars
+        self._frames = LRURegistry(frame_budget, name='market_data_frames') if compact else None  # 紧凑模式下最近访问的DataFrame
+        self._meta = {}  # 分区元数据，键同上
+        self._lock = threading.RLock()
+        self._single_flight = SingleFlight()
+
+        # 创建数据目录
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _partition_dir(self, symbol: str, interval: str) -> str:
+        """获取分区目录
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+
+        Returns:
+            分区目录路径
+        """
+        return os.path.join(self.root_dir, interval, symbol)
+
+    def _partition_lock(self, symbol: str, interval: str) -> FileLock:
+        """获取分区的文件锁
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+
+        Returns:
+            文件锁
+        """
+        return FileLock(os.path.join(self.root_dir, interval, f'{symbol}.lock'))
+
+    def _read_partition(self, symbol: str, interval: str) -> Tuple[Optional[pd.DataFrame], Dict[str, Any]]:
+        """从磁盘读取分区
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+
+        Returns:
+            行情数据DataFrame（不存在时为None）和元数据
+        """
+        partition_dir = self._partition_dir(symbol, interval)
+        meta_file = os.path.join(partition_dir, 'meta.json')
+        if not os.path.exists(meta_file):
+            return None, {}
+
+        # 持有分区锁读取，保证各列文件来自同一次写入
+        with self._partition_lock(symbol, interval):
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+
+            index = np.load(os.path.join(partition_dir, 'index.npy'))
+            columns = {column: np.load(os.path.join(partition_dir, f'{column}.npy')) for column in OHLCV_COLUMNS}
+        df = pd.DataFrame(columns, index=pd.DatetimeIndex(index.astype('datetime64[ns]')))
+
+        return df, meta
+
+    def _write_partition(self, symbol: str, interval: str, df: pd.DataFrame, meta: Dict[str, Any]) -> None:
+        """将分区写入磁盘
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+            df: 行情数据DataFrame
+            meta: 元数据
+        """
+        partition_dir = self._partition_dir(symbol, interval)
+        os.makedirs(partition_dir, exist_ok=True)
+
+        arrays = {'index': df.index.values.astype('datetime64[ns]').astype(np.int64)}
+        for column in OHLCV_COLUMNS:
+            arrays[column] = df[column].to_numpy()
+
+        # 每个文件原子替换，整个分区在文件锁内写入，元数据最后写入
+        with self._partition_lock(symbol, interval):
+            for name, values in arrays.items():
+                _atomic_write(os.path.join(partition_dir, f'{name}.npy'), lambda f, values=values: np.save(f, values))
+
+            meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+            _atomic_write(os.path.join(partition_dir, 'meta.json'), lambda f: f.write(meta_bytes))
+
+    def write_sidecar(self, symbol: str, interval: str, name: str, payload: Dict[str, Any]) -> None:
+        """在分区目录中原子写入附属JSON文件（如指标状态快照）
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+            name: 文件名（不含扩展名）
+            payload: 可JSON序列化的数据
+        """
+        partition_dir = self._partition_dir(symbol, interval)
+        os.makedirs(partition_dir, exist_ok=True)
+
+        payload_bytes = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        with self._partition_lock(symbol, interval):
+            _atomic_write(os.path.join(partition_dir, f'{name}.json'), lambda f: f.write(payload_bytes))
+
+    def read_sidecar(self, symbol: str, interval: str, name: str) -> Optional[Dict[str, Any]]:
+        """读取分区目录中的附属JSON文件
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+            name: 文件名（不含扩展名）
+
+        Returns:
+            文件内容，不存在时返回None
+        """
+        path = os.path.join(self._partition_dir(symbol, interval), f'{name}.json')
+        if not os.path.exists(path):
+            return None
+
+        with self._partition_lock(symbol, interval):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+    def load(self, symbol: str, interval: str = '1d', cache: bool = True) -> Optional[pd.DataFrame]:
+        """加载分区数据（优先使用进程内注册表）
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔，周线和月线由日线合成
+            cache: 是否把从磁盘读取的数据放入注册表；批量扫描全部股票时为False，
+                不在内存中的分区直接从磁盘流式读取，不淘汰常用的数据
+
+        Returns:
+            完整的行情数据DataFrame，不存在时返回None
+        """
+        if interval in RESAMPLED_INTERVALS:
+            return self.resampler.get(symbol, interval)
+
+        key = (symbol, interval)
+        with self._lock:
+            if key in self._registry:
+                return self._frame(key, self._registry[key], cache)
+
+        df, meta = self._read_partition(symbol, interval)
+        if df is not None and cache:
+            value = self._to_registry(symbol, df)
+            with self._lock:
+                self._registry[key] = value
+                self._meta[key] = meta
+            # 紧凑模式下返回与注册表中一致（经过紧凑类型转换）的数据
+            return self._frame(key, value, cache)
+        return df
+
+    def load_compact(self, symbol: str, interval: str = '1d') -> Optional[CompactBars]:
+        """以紧凑表示加载分区数据
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+
+        Returns:
+            紧凑K线数据，不存在时返回None
+        """
+        value = self._registry.peek((symbol, interval))
+        if isinstance(value, CompactBars):
+            return value
+
+        df = self.load(symbol, interval)
+        if df is None:
+            return None
+        value = self._registry.peek((symbol, interval))
+        return value if isinstance(value, CompactBars) else CompactBars.from_frame(df, symbol)
+
+    def _to_registry(self, symbol: str, df: pd.DataFrame) -> Any:
+        """转换为注册表中保存的表示
+
+        Args:
+            symbol: 股票代码
+            df: 行情数据DataFrame
+
+        Returns:
+            紧凑模式下为CompactBars，否则为DataFrame本身
+        """
+        return CompactBars.from_frame(df, symbol) if self.compact else df
+
+    def _frame(self, key: Tuple[str, str], value: Any, cache: bool = True) -> pd.DataFrame:
+        """将注册表中保存的表示还原为DataFrame（紧凑模式下优先使用已还原的缓存）
+
+        Args:
+            key: (股票代码, 数据间隔)
+            value: CompactBars或DataFrame
+            cache: 是否缓存还原后的DataFrame
+
+        Returns:
+            行情数据DataFrame
+        """
+        if not isinstance(value, CompactBars):
+            return value
+
+        frame = self._frames.get(key) if cache else self._frames.peek(key)
+        if frame is None:
+            frame = value.to_frame()
+            if cache:
+                self._frames[key] = frame
+        return frame
+
+    def save(self, symbol: str, interval: str, df: pd.DataFrame, period: str,
+             rewritten_from: pd.Timestamp = None) -> pd.DataFrame:
+        """保存行情数据到注册表和磁盘
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+            df: 行情数据DataFrame，索引为日期
+            period: 数据覆盖的周期
+            rewritten_from: 与上一版本相比被改写的第一根K线时间，为None时视为全部改写
+
+        Returns:
+            规范化后的DataFrame
+        """
+        df = df[OHLCV_COLUMNS].copy()
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.index)).as_unit('ns')
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+
+        if rewritten_from is None and len(df):
+            rewritten_from = df.index[0]
+
+        meta = {
+            'symbol': symbol,
+            'interval': interval,
+            'period': period,
+            'rows': len(df),
+            'last_bar': df.index[-1].value if len(df) else None,
+            'fetched_at': datetime.datetime.now().timestamp(),
+            # 版本号和改写起点供派生数据（如周线/月线）增量更新
+            'version': self.get_meta(symbol, interval).get('version', 0) + 1,
+            'rewritten_from': pd.Timestamp(rewritten_from).value if rewritten_from is not None else None
+        }
+
+        key = (symbol, interval)
+        self._write_partition(symbol, interval, df, meta)
+        value = self._to_registry(symbol, df)
+        with self._lock:
+            self._registry[key] = value
+            self._meta[key] = meta
+            if self._frames is not None:
+                self._frames.pop(key, None)
+
+        return self._frame(key, value)
+
+    def merge(self, symbol: str, interval: str, tail: pd.DataFrame) -> pd.DataFrame:
+        """将新获取的尾部数据合并到已存储的序列
+
+        与已有数据重叠的K线以新数据为准（用于修正盘中获取的最后一根K线），其余追加到末尾。
+        改写起点记录为第一根实际发生变化的K线（重叠部分不变时为第一根新K线），
+        没有任何变化时只更新获取时间，版本不变，派生数据（周线/月线、增量指标）无需更新。
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+            tail: 新获取的行情数据DataFrame
+
+        Returns:
+            合并后的完整DataFrame
+        """
+        stored = self.load(symbol, interval)
+        period = self.get_meta(symbol, interval).get('period', 'max')
+        if stored is None or stored.empty:
+            return self.save(symbol, interval, tail, period)
+
+        tail = tail[OHLCV_COLUMNS].copy()
+        tail.index = pd.DatetimeIndex(pd.to_datetime(tail.index)).as_unit('ns')
+        tail = tail[~tail.index.duplicated(keep='last')].sort_index()
+        if not len(tail):
+            return stored
+        cut = int(stored.index.searchsorted(tail.index[0]))
+        rewritten_from = self._first_change(symbol, stored.iloc[cut:], tail)
+        if rewritten_from is None:
+            self._touch(symbol, interval)
+            return stored
+        merged = pd.concat([stored.iloc[:cut], tail])
+        return self.save(symbol, interval, merged, period, rewritten_from=rewritten_from)
+
+    def _first_change(self, symbol: str, old: pd.DataFrame, new: pd.DataFrame) -> Optional[pd.Timestamp]:
+        """比较被替换的已存储K线与新数据，找出第一根发生变化（改动、新增或删除）的K线
+
+        Args:
+            symbol: 股票代码
+            old: 将被替换的已存储K线
+            new: 新数据（已排序去重）
+
+        Returns:
+            第一根变化的K线时间，完全相同时返回None
+        """
+        if self.compact:
+            # 已存储的数据经过紧凑类型转换，新数据按相同精度比较
+            new = CompactBars.from_frame(new, symbol).to_frame()
+        n = min(len(old), len(new))
+        same = old.index[:n] == new.index[:n]
+        for column in OHLCV_COLUMNS:
+            a = old[column].to_numpy(dtype=np.float64)[:n]
+            b = new[column].to_numpy(dtype=np.float64)[:n]
+            same &= (a == b) | (np.isnan(a) & np.isnan(b))
+        changed = np.flatnonzero(~same)
+        if len(changed):
+            i = changed[0]
+            return min(old.index[i], new.index[i])
+        if len(new) > n:
+            return new.index[n]
+        if len(old) > n:
+            return old.index[n]
+        return None
+
+    def _touch(self, symbol: str, interval: str) -> None:
+        """数据没有变化时只更新元数据中的获取时间（版本号不变）
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+        """
+        key = (symbol, interval)
+        meta = dict(self.get_meta(symbol, interval), fetched_at=datetime.datetime.now().timestamp())
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        with self._partition_lock(symbol, interval):
+            _atomic_write(os.path.join(self._partition_dir(symbol, interval), 'meta.json'),
+                          lambda f: f.write(meta_bytes))
+        with self._lock:
+            if key in self._meta:
+                self._meta[key] = meta
+
+    @staticmethod
+    def delta_range(last_bar: pd.Timestamp, now: datetime.datetime = None) -> str:
+        """计算补齐缺失尾部数据所需的最小请求周期
+
+        Args:
+            last_bar: 已存储的最后一根K线时间
+            now: 当前时间，默认为系统时间
+
+        Returns:
+            数据周期，如'5d'、'1mo'
+        """
+        now = now or datetime.datetime.now()
+        # 多请求一天，保证最后一根K线能被重新获取并修正
+        gap_days = (pd.Timestamp(now) - last_bar).days + 1
+        for period in DELTA_RANGES:
+            if PERIOD_DAYS[period] >= gap_days:
+                return period
+        return 'max'
+
+    def get_meta(self, symbol: str, interval: str = '1d') -> Dict[str, Any]:
+        """获取分区元数据
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+
+        Returns:
+            元数据字典，分区不存在时为空字典
+        """
+        key = (symbol, interval)
+        with self._lock:
+            # 分区在内存中时使用与内存数据一致的元数据，否则只读取元数据文件，不加载数据
+            if key in self._registry and key in self._meta:
+                return self._meta[key]
+
+        meta_file = os.path.join(self._partition_dir(symbol, interval), 'meta.json')
+        if not os.path.exists(meta_file):
+            return {}
+        with self._partition_lock(symbol, interval):
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+    def data_key(self, symbol: str, interval: str = '1d', period: str = 'max') -> Optional[str]:
+        """获取某只股票某一周期数据的版本标识，用作分析结果缓存的数据指纹（只读取元数据，不加载数据）
+
+        周线和月线由日线合成，使用日线分区的版本。
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+            period: 数据周期
+
+        Returns:
+            版本标识，分区不存在或没有版本信息时返回None
+        """
+        meta = self.get_meta(symbol, '1d' if interval in RESAMPLED_INTERVALS else interval)
+        if meta.get('version') is None:
+            return None
+        # K线数量和最后一根K线时间区分分区被删除后重新创建时重复的版本号（只更新获取时间时标识不变）
+        return f"{symbol}|{interval}|{period}|{meta['version']}|{meta.get('rows')}|{meta.get('last_bar')}"
+
+    def is_fresh(self, symbol: str, period: str, interval: str = '1d') -> bool:
+        """判断已存储的数据是否未过期且覆盖请求的周期
+
+        Args:
+            symbol: 股票代码
+            period: 数据周期
+            interval: 数据间隔
+
+        Returns:
+            是否可以直接使用已存储的数据
+        """
+        meta = self.get_meta(symbol, interval)
+        if not meta:
+            return False
+
+        if PERIOD_DAYS.get(meta.get('period'), 0) < PERIOD_DAYS.get(period, 0):
+            return False
+
+        return self.freshness_policy.is_fresh(symbol, interval, meta.get('fetched_at', 0))
+
+    @staticmethod
+    def slice_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
+        """截取指定周期的数据
+
+        Args:
+            df: 完整的行情数据DataFrame
+            period: 数据周期
+
+        Returns:
+            截取后的DataFrame
+        """
+        if df.empty or period == 'max':
+            return df
+
+        if period == 'ytd':
+            start = pd.Timestamp(year=df.index[-1].year, month=1, day=1)
+        else:
+            start = df.index[-1] - pd.Timedelta(days=PERIOD_DAYS.get(period, 36500))
+
+        if df.index[0] >= start:
+            return df
+        return df[df.index >= start]
+
+    @staticmethod
+    def parse_chart_response(data: Dict[str, Any], interval: str = '1d') -> Optional[pd.DataFrame]:
+        """解析YahooFinance/get_stock_chart的返回结果
+
+        Args:
+            data: API返回的JSON数据（字典或JSON文本）
+            interval: 数据间隔
+
+        Returns:
+            行情数据DataFrame，数据结构不完整时返回None
+        """
+        return decode_chart_payload(data, interval)
+
+    @staticmethod
+    def generate_simulated_data(symbol: str, period: str = '1y') -> pd.DataFrame:
+        """生成模拟行情数据（仅用于测试）
+
+        Args:
+            symbol: 股票代码
+            period: 数据周期
+
+        Returns:
+            模拟行情数据DataFrame
+        """
+        n_bars = max(int(PERIOD_DAYS.get(period, 366) * 252 / 366), 2)
+        # 种子由股票代码稳定派生，不同进程生成的数据一致
+        return MarketSimulator().generate([symbol], n_bars)[symbol]
+
+    def fetch(self, symbol: str, period: str = '1y', interval: str = '1d', api_client=None) -> Optional[pd.DataFrame]:
+        """获取行情数据，依次尝试注册表/磁盘、YahooFinance API和模拟数据
+
+        同一(股票代码, 数据周期, 数据间隔)的并发请求会被合并，只执行一次获取和解析。
+        周线和月线由已存储的日线数据在本地合成，不单独请求API。
+
+        Args:
+            symbol: 股票代码
+            period: 数据周期
+            interval: 数据间隔
+            api_client: YahooFinance API客户端，为None时使用模拟数据
+
+        Returns:
+            行情数据DataFrame，获取失败时返回None
+        """
+        if interval in RESAMPLED_INTERVALS:
+            if self.fetch(symbol, period, '1d', api_client) is None:
+                return None
+            return self.slice_period(self.resampler.get(symbol, interval), period)
+
+        return self._single_flight.do((symbol, period, interval), self._fetch, symbol, period, interval, api_client)
+
+    def _fetch(self, symbol: str, period: str, interval: str, api_client) -> Optional[pd.DataFrame]:
+        """获取行情数据的实际实现，参数同fetch"""
+        # 检查是否有未过期的存储数据
+        if self.is_fresh(symbol, period, interval):
+            print(f"从缓存加载 {symbol} 数据")
+            return self.slice_period(self.load(symbol, interval), period)
+
+        if api_client is not None:
+            # 已存储数据覆盖请求周期时，只请求缺失的尾部数据
+            delta_range = self._delta_range_for(symbol, period, interval)
+            if delta_range is not None:
+                data = api_client.call_api('YahooFinance/get_stock_chart',
+                                           query={'symbol': symbol,
+                                                  'interval': interval,
+                                                  'range': delta_range})
+
+                tail = self.parse_chart_response(data, interval)
+                if tail is not None:
+                    print(f"增量更新 {symbol} 数据（{delta_range}）")
+                    return self.slice_period(self.merge(symbol, interval, tail), period)
+                print(f"增量更新 {symbol} 数据失败，重新获取完整数据")
+
+            # 使用YahooFinance API获取数据
+            data = api_client.call_api('YahooFinance/get_stock_chart',
+                                       query={'symbol': symbol,
+                                              'interval': interval,
+                                              'range': period})
+
+            df = self.parse_chart_response(data, interval)
+            if df is None:
+                print(f"获取 {symbol} 数据失败：API返回数据不完整")
+                return None
+
+            print(f"成功获取 {symbol} 数据")
+            return self._save_refetched(symbol, interval, df, period)
+
+        # 生成模拟数据（仅用于测试），覆盖已存储的较长周期，避免缩短历史
+        print(f"使用模拟数据代替 {symbol}")
+        period = self._longer_period(self.get_meta(symbol, interval).get('period'), period)
+        return self.save(symbol, interval, self.generate_simulated_data(symbol, period), period)
+
+    @staticmethod
+    def _longer_period(stored: Optional[str], requested: str) -> str:
+        """已存储的周期与请求的周期中覆盖范围较长的一个"""
+        return stored if PERIOD_DAYS.get(stored, 0) > PERIOD_DAYS.get(requested, 0) else requested
+
+    def _save_refetched(self, symbol: str, interval: str, df: pd.DataFrame, period: str) -> pd.DataFrame:
+        """保存完整重新获取的数据
+
+        已存储的历史比请求的周期更长且与新数据衔接时，将新数据合并到已存储的序列并保留较长的周期，
+        避免较短周期的请求删除已存储的较早历史；否则以新数据替换。
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+            df: 重新获取的行情数据
+            period: 请求的数据周期
+
+        Returns:
+            保存后的完整DataFrame
+        """
+        meta = self.get_meta(symbol, interval)
+        if meta.get('last_bar') is None or self._longer_period(meta.get('period'), period) == period:
+            return self.save(symbol, interval, df, period)
+
+        if len(df) and pd.Timestamp(pd.to_datetime(df.index).min()) > pd.Timestamp(meta['last_bar']):
+            print(f"警告: {symbol} 重新获取的数据与已存储的历史不衔接，以新数据替换")
+            return self.save(symbol, interval, df, period)
+
+        # merge沿用已存储的（较长的）周期
+        return self.merge(symbol, interval, df)
+
+    def _delta_range_for(self, symbol: str, period: str, interval: str) -> Optional[str]:
+        """判断是否可以增量更新，并返回需要请求的周期
+
+        Args:
+            symbol: 股票代码
+            period: 请求的数据周期
+            interval: 数据间隔
+
+        Returns:
+            增量请求的数据周期，需要完整获取时返回None
+        """
+        meta = self.get_meta(symbol, interval)
+        if not meta or meta.get('last_bar') is None:
+            return None
+
+        # 已存储的数据不足以覆盖请求周期时，需要完整获取
+        if PERIOD_DAYS.get(meta.get('period'), 0) < PERIOD_DAYS.get(period, 0):
+            return None
+
+        # 缺失的尾部比请求周期更长时仍只请求到已存储的最后一根K线，保留已存储的较早历史
+        return self.delta_range(pd.Timestamp(meta['last_bar']))
+
+    def pin(self, symbols: List[str], interval: str = '1d') -> None:
+        """固定分区，使其常驻内存不被淘汰
+
+        Args:
+            symbols: 股票代码列表
+            interval: 数据间隔
+        """
+        self._registry.pin([(symbol, interval) for symbol in symbols])
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """获取进程内注册表的内存和淘汰统计
+
+        Returns:
+            统计信息字典（紧凑模式下frames为还原后DataFrame缓存的统计）
+        """
+        stats = self._registry.stats()
+        if self._frames is not None:
+            stats['frames'] = self._frames.stats()
+        return stats
+
+    def clear(self) -> None:
+        """清空进程内注册表（磁盘数据保留）"""
+        with self._lock:
+            self._registry.clear()
+            self._meta.clear()
+            if self._frames is not None:
+                self._frames.clear()
+        self.resampler.invalidate()
+
+
+# 进程内共享的默认存储实例
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_market_data_store() -> MarketDataStore:
+    """获取进程内共享的行情数据存储
+
+    Returns:
+        默认的MarketDataStore实例
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = MarketDataStore()
+        return _default_store
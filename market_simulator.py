@@ -0,0 +1,333 @@
+import time
+import zlib
+import datetime
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+from typing import List, Dict, Tuple, Any, Optional
+from trading_calendar import TradingCalendar, EXCHANGE_SESSIONS, INTRADAY_INTERVALS, exchange_for_symbol
+
+
+def price_limit(symbol: str) -> float:
+    """获取股票的涨跌停幅度
+
+    Args:
+        symbol: 股票代码
+
+    Returns:
+        涨跌停幅度，创业板(300/301)和科创板(688/689)为20%，其他A股为10%，非A股不设限(inf)
+    """
+    if exchange_for_symbol(symbol) != 'SSE':
+        return np.inf
+    code = symbol.split('.')[0]
+    if code.startswith(('300', '301', '688', '689')):
+        return 0.2
+    return 0.1
+
+
+def symbol_seed(symbol: str, seed: int = 0) -> int:
+    """计算股票代码的稳定随机种子（不受Python字符串哈希随机化影响）
+
+    Args:
+        symbol: 股票代码
+        seed: 全局随机种子
+
+    Returns:
+        随机种子
+    """
+    return (zlib.crc32(symbol.encode('utf-8')) + seed) % (2 ** 32)
+
+
+def make_symbols(n: int, seed: int = 0) -> List[str]:
+    """生成模拟股票池的股票代码（A股主板、创业板、科创板、港股和美股混合）
+
+    Args:
+        n: 股票数量
+        seed: 随机种子
+
+    Returns:
+        股票代码列表
+    """
+    templates = [('60{:04d}.SS', 0.35), ('00{:04d}.SZ', 0.25), ('30{:04d}.SZ', 0.15),
+                 ('68{:04d}.SS', 0.1), ('0{:03d}.HK', 0.05), ('SIM{:04d}', 0.1)]
+    counts = np.random.RandomState(seed).multinomial(n, [weight for _, weight in templates])
+
+    symbols = []
+    for (template, _), count in zip(templates, counts):
+        symbols.extend(template.format(i) for i in range(count))
+    return symbols
+
+
+class MarketSimulator:
+    """向量化的模拟行情生成器
+
+    对同一交易所的全部股票一次性生成 N×M 的K线面板：
+    对数波动率服从AR(1)过程以产生波动聚集，A股按涨跌停幅度限制相对前一交易日收盘价的涨跌，
+    并随机插入停牌区间（停牌期间价格不变、不产生K线）。
+    每只股票的随机数由股票代码派生的稳定种子生成，与所在股票池的组成和进程无关。
+    """
+
+    def __init__(self, seed: int = 0, volatility: float = 0.02, vol_persistence: float = 0.97,
+                 vol_of_vol: float = 0.15, suspension_rate: float = 0.02):
+        """初始化模拟器
+
+        Args:
+            seed: 全局随机种子
+            volatility: 平均日波动率
+            vol_persistence: 对数波动率的自相关系数，越接近1波动聚集越明显
+            vol_of_vol: 对数波动率每日扰动的标准差
+            suspension_rate: 每只A股在生成区间内出现停牌的概率
+        """
+        self.seed = seed
+        self.volatility = volatility
+        self.vol_persistence = vol_persistence
+        self.vol_of_vol = vol_of_vol
+        self.suspension_rate = suspension_rate
+
+    def generate(self, symbols: List[str], n_bars: int, interval: str = '1d',
+                 end: datetime.date = None) -> Dict[str, pd.DataFrame]:
+        """生成多只股票的模拟行情
+
+        Args:
+            symbols: 股票代码列表
+            n_bars: 每只股票的K线数量（含停牌，停牌K线会被去除）
+            interval: 数据间隔，'1d'或日内间隔如'5m'
+            end: 最后一个交易日，默认为今天
+
+        Returns:
+            股票代码到行情数据DataFrame的字典
+        """
+        results = {}
+        for exchange, group in self._group_by_exchange(symbols).items():
+            panel = self.generate_panel(group, n_bars, interval, end, exchange)
+            for i, symbol in enumerate(group):
+                traded = panel['traded'][i]
+                results[symbol] = pd.DataFrame(
+                    {column: panel[column][i, traded] for column in ('open', 'high', 'low', 'close', 'volume')},
+                    index=panel['index'][traded]
+                )
+        return {symbol: results[symbol] for symbol in symbols}
+
+    def generate_panel(self, symbols: List[str], n_bars: int, interval: str = '1d',
+                       end: datetime.date = None, exchange: str = None) -> Dict[str, Any]:
+        """为同一交易所的股票生成 N×M 的行情面板
+
+        Args:
+            symbols: 股票代码列表（须属于同一交易所）
+            n_bars: 每只股票的K线数量
+            interval: 数据间隔
+            end: 最后一个交易日，默认为今天
+            exchange: 交易所代码，默认由第一只股票推断
+
+        Returns:
+            包含'index'（DatetimeIndex）、OHLCV各列(N×M数组)和'traded'（N×M布尔数组，停牌为False）的字典
+        """
+        exchange = exchange or exchange_for_symbol(symbols[0])
+        bars_per_day = self._bars_per_day(exchange, interval)
+        n_days = -(-n_bars // bars_per_day)
+        days = self._trading_days(exchange, n_days, end)
+        index = self._bar_index(exchange, days, interval)
+
+        n = len(symbols)
+        noise = self._noise(symbols, 4 * n_days * bars_per_day + n_days + 2)
+        z_base_price, z_base_volume = noise[:, 0], noise[:, 1]
+        z_vol = noise[:, 2:n_days + 2]
+        z_ret, z_open, z_range, z_volume = noise[:, n_days + 2:].reshape(n, 4, n_days, bars_per_day).transpose(1, 0, 2, 3)
+
+        # 对数波动率AR(1)：h_t = phi * h_{t-1} + eta_t，按日产生波动聚集
+        phi = self.vol_persistence
+        log_vol = lfilter([self.vol_of_vol * np.sqrt(1 - phi ** 2)], [1, -phi], z_vol, axis=1) - self.vol_of_vol ** 2 / 2
+        bar_vol = (self.volatility * np.exp(log_vol) / np.sqrt(bars_per_day))[:, :, None]
+        returns = bar_vol * z_ret
+
+        # 停牌：整日价格不变、无成交
+        suspended = self._suspensions(symbols, n_days)
+        returns[suspended] = 0.0
+
+        # 相对前一交易日收盘价的日内累计涨跌幅，限制在涨跌停范围内
+        limits = np.array([price_limit(symbol) for symbol in symbols])[:, None, None]
+        factor = np.clip(np.cumprod(1 + returns, axis=2), 1 - np.minimum(limits, 0.99), 1 + limits)
+        base = np.exp(np.log(30) + 0.8 * z_base_price)
+        day_close = base[:, None] * np.cumprod(factor[:, :, -1], axis=1)
+        prev_close = np.concatenate((base[:, None], day_close[:, :-1]), axis=1)[:, :, None]
+        close = prev_close * factor
+
+        # 开盘价取前一根K线收盘价附近，最高/最低价在开盘和收盘之外随机延伸
+        prev_bar_close = np.concatenate((prev_close, close[:, :, :-1]), axis=2)
+        open_price = prev_bar_close * (1 + 0.25 * bar_vol * z_open)
+        high = np.maximum(open_price, close) * (1 + 0.5 * bar_vol * np.abs(z_range))
+        low = np.minimum(open_price, close) * (1 - 0.5 * bar_vol * np.abs(z_range[:, :, ::-1]))
+
+        # A股价格按0.01元最小报价单位取整，并限制在由前一交易日收盘价计算的涨跌停价之间
+        is_a_share = np.isfinite(limits[:, 0, 0])
+        prices = {'open': open_price, 'high': high, 'low': low, 'close': close}
+        if is_a_share.any():
+            rounded_prev = np.round(prev_close[is_a_share], 2)
+            upper = np.round(rounded_prev * (1 + limits[is_a_share]), 2)
+            lower = np.round(rounded_prev * (1 - limits[is_a_share]), 2)
+            for column, values in prices.items():
+                values[is_a_share] = np.clip(np.round(values[is_a_share], 2), lower, upper)
+        low = np.maximum(prices['low'], 0.01)
+
+        # 成交量：与波动幅度正相关
+        base_volume = np.exp(np.log(2e6) + z_base_volume)
+        intensity = 1 + np.abs(returns) / bar_vol
+        volume = np.round(base_volume[:, None, None] / bars_per_day * intensity * np.exp(0.3 * z_volume))
+        volume[suspended] = 0
+
+        traded = np.broadcast_to(~suspended[:, :, None], factor.shape)
+        panel = {
+            'open': prices['open'], 'high': prices['high'], 'low': low,
+            'close': prices['close'], 'volume': volume, 'traded': traded
+        }
+        # 整日生成后只保留最后n_bars根K线
+        for column in panel:
+            panel[column] = panel[column].reshape(n, -1)[:, -n_bars:]
+        panel['index'] = index[-n_bars:]
+        return panel
+
+    def populate(self, data_store, symbols: List[str], period: str = '1y', interval: str = '1d') -> int:
+        """生成模拟行情并直接写入行情数据存储
+
+        Args:
+            data_store: 行情数据存储（MarketDataStore）
+            symbols: 股票代码列表
+            period: 数据周期
+            interval: 数据间隔
+
+        Returns:
+            写入的股票数量
+        """
+        from market_data_store import PERIOD_DAYS
+
+        n_bars = max(int(PERIOD_DAYS.get(period, 366) * 252 / 366), 2)
+        if interval in INTRADAY_INTERVALS:
+            n_bars = min(n_bars, 60) * self._bars_per_day(exchange_for_symbol(symbols[0]), interval)
+
+        for symbol, df in self.generate(symbols, n_bars, interval).items():
+            data_store.save(symbol, interval, df, period)
+        return len(symbols)
+
+    def _noise(self, symbols: List[str], size: int) -> np.ndarray:
+        """按股票代码的稳定种子生成标准正态随机数
+
+        Args:
+            symbols: 股票代码列表
+            size: 每只股票的随机数个数
+
+        Returns:
+            N×size数组
+        """
+        noise = np.empty((len(symbols), size))
+        for i, symbol in enumerate(symbols):
+            noise[i] = np.random.default_rng(symbol_seed(symbol, self.seed)).standard_normal(size)
+        return noise
+
+    def _suspensions(self, symbols: List[str], n_days: int) -> np.ndarray:
+        """随机生成A股停牌区间
+
+        Args:
+            symbols: 股票代码列表
+            n_days: 交易日数
+
+        Returns:
+            N×n_days布尔数组，停牌为True
+        """
+        suspended = np.zeros((len(symbols), n_days), dtype=bool)
+        for i, symbol in enumerate(symbols):
+            if not np.isfinite(price_limit(symbol)):
+                continue
+            rng = np.random.default_rng([symbol_seed(symbol, self.seed), 1])
+            if rng.random() < self.suspension_rate and n_days > 2:
+                # 首日保留交易，保证序列有起始价格
+                start = rng.integers(1, n_days)
+                suspended[i, start:start + rng.integers(1, 21)] = True
+        return suspended
+
+    @staticmethod
+    def _group_by_exchange(symbols: List[str]) -> Dict[str, List[str]]:
+        """按交易所分组（同一交易所的股票共享交易日和K线时间）"""
+        groups = {}
+        for symbol in dict.fromkeys(symbols):
+            groups.setdefault(exchange_for_symbol(symbol), []).append(symbol)
+        return groups
+
+    @staticmethod
+    def _bars_per_day(exchange: str, interval: str) -> int:
+        """每个交易日的K线数量"""
+        if interval not in INTRADAY_INTERVALS:
+            return 1
+        _, sessions = EXCHANGE_SESSIONS[exchange]
+        seconds = INTRADAY_INTERVALS[interval]
+        return sum(-(-_session_seconds(start, end) // seconds) for start, end in sessions)
+
+    @staticmethod
+    def _trading_days(exchange: str, n_days: int, end: datetime.date = None) -> pd.DatetimeIndex:
+        """获取截至end（含）的最近n_days个交易日"""
+        calendar = TradingCalendar(exchange)
+        end = pd.Timestamp(end or datetime.date.today())
+        candidates = pd.bdate_range(end=end, periods=int(n_days * 1.1) + 30)
+        # 逐年获取休市日，休市日表没有覆盖的年份按规则计算
+        holidays = set()
+        for year in range(candidates[0].year, candidates[-1].year + 1):
+            holidays |= calendar.holidays_for(year)
+        holidays = pd.DatetimeIndex(sorted(holidays))
+        return candidates[~candidates.isin(holidays)][-n_days:]
+
+    @staticmethod
+    def _bar_index(exchange: str, days: pd.DatetimeIndex, interval: str) -> pd.DatetimeIndex:
+        """生成K线时间索引（交易所当地时间，日内K线以开始时间标记）"""
+        if interval not in INTRADAY_INTERVALS:
+            return days.as_unit('ns')
+
+        _, sessions = EXCHANGE_SESSIONS[exchange]
+        seconds = INTRADAY_INTERVALS[interval]
+        offsets = np.concatenate([
+            np.arange(_parse_seconds(start), _parse_seconds(start) + _session_seconds(start, end), seconds)
+            for start, end in sessions
+        ])
+        stamps = days.as_unit('ns').asi8[:, None] + offsets[None, :] * 10 ** 9
+        return pd.DatetimeIndex(stamps.ravel().astype('datetime64[ns]'))
+
+
+def _parse_seconds(clock: str) -> int:
+    """将'HH:MM'转换为当天的秒数"""
+    hours, minutes = clock.split(':')
+    return int(hours) * 3600 + int(minutes) * 60
+
+
+def _session_seconds(start: str, end: str) -> int:
+    """交易时段的秒数"""
+    return _parse_seconds(end) - _parse_seconds(start)
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    from market_data_store import MarketDataStore
+
+    simulator = MarketSimulator()
+    symbols = make_symbols(5000)
+
+    start = time.time()
+    frames = simulator.generate(symbols, 252)
+    print(f"生成 {len(symbols)} 只股票 × 252 根日线耗时: {time.time() - start:.2f}秒")
+
+    start = time.time()
+    intraday = simulator.generate(symbols[:500], 48 * 20, '5m')
+    print(f"生成 500 只股票 × 20 个交易日5分钟线耗时: {time.time() - start:.2f}秒")
+
+    # 检查A股涨跌停约束
+    violations = 0
+    for symbol, df in frames.items():
+        limit = price_limit(symbol)
+        if np.isfinite(limit):
+            prev_close = df['close'].shift(1).round(2)
+            violations += int((df['close'] > (prev_close * (1 + limit)).round(2) + 1e-9).sum())
+    print(f"涨跌停约束违反次数: {violations}")
+
+    data_dir = tempfile.mkdtemp()
+    start = time.time()
+    simulator.populate(MarketDataStore(root_dir=data_dir), symbols[:1000], '1y')
+    print(f"写入 1000 只股票到行情数据存储耗时: {time.time() - start:.2f}秒")
+    shutil.rmtree(data_dir)
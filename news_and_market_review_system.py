@@ -7,6 +7,8 @@ import json
 import datetime
 import requests
 from typing import List, Dict, Tuple, Any, Optional
+from market_data_store import MarketDataStore, get_market_data_store
+from bulk_fetcher import BulkFetcher
 from bs4 import BeautifulSoup
 import re
 import jieba
@@ -27,13 +29,18 @@ except ImportError:
 class NewsAndMarketReviewSystem:
     """热点资讯和今日复盘功能"""
     
-    def __init__(self, api_client=None):
+    def __init__(self, api_client=None, data_store: MarketDataStore = None):
         """初始化热点资讯和今日复盘系统
         
         Args:
             api_client: YahooFinance API客户端
+            data_store: 行情数据存储，为None时使用进程内共享的存储
         """
         self.api_client = api_client
+        self.data_store = data_store or get_market_data_store()
+        # 每次获取时读取当前的api_client，替换客户端后立即生效
+        self.bulk_fetcher = BulkFetcher(self.data_store,
+                                        client_provider=lambda: self.api_client if HAS_API_CLIENT else None)
         self.news_data = []  # 存储新闻数据
         self.market_review = {}  # 存储市场复盘数据
         self.hot_topics = []  # 存储热点话题
@@ -525,90 +532,10 @@ class NewsAndMarketReviewSystem:
                 '688981.SS'   # 中芯国际
             ]
         
-        market_data = {}
-        
-        for symbol in symbols:
-            try:
-                # 检查是否有缓存数据
-                cache_file = f'data/market_review/{symbol}_daily.csv'
-                if os.path.exists(cache_file):
-                    # 检查缓存是否过期（超过1天）
-                    if datetime.datetime.now().timestamp() - os.path.getmtime(cache_file) < 86400:
-                        df = pd.read_csv(cache_file, index_col=0, parse_dates=True)
-                        market_data[symbol] = df
-                        print(f"从缓存加载 {symbol} 数据")
-                        continue
-                
-                if HAS_API_CLIENT and self.api_client:
-                    # 使用YahooFinance API获取数据
-                    data = self.api_client.call_api('YahooFinance/get_stock_chart', 
-                                                   query={'symbol': symbol, 
-                                                         'interval': '1d', 
-                                                         'range': '1mo'})
-                    
-                    if 'chart' in data and 'result' in data['chart'] and data['chart']['result']:
-                        chart_data = data['chart']['result'][0]
-                        
-                        # 提取时间戳和价格数据
-                        timestamps = chart_data.get('timestamp', [])
-                        quotes = chart_data.get('indicators', {}).get('quote', [{}])[0]
-                        
-                        if timestamps and 'close' in quotes:
-                            # 转换时间戳为日期
-                            dates = [datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d') for ts in timestamps]
-                            
-                            # 创建DataFrame
-                            df = pd.DataFrame({
-                                'open': quotes.get('open', [None] * len(timestamps)),
-                                'high': quotes.get('high', [None] * len(timestamps)),
-                                'low': quotes.get('low', [None] * len(timestamps)),
-                                'close': quotes.get('close', [None] * len(timestamps)),
-                                'volume': quotes.get('volume', [None] * len(timestamps))
-                            }, index=dates)
-                            
-                            # 处理缺失值
-                            df = df.dropna()
-                            
-                            # 保存到缓存
-                            df.to_csv(cache_file)
-                            
-                            market_data[symbol] = df
-                            print(f"成功获取 {symbol} 数据")
-                        else:
-                            print(f"获取 {symbol} 数据失败：数据结构不完整")
-                    else:
-                        print(f"获取 {symbol} 数据失败：API返回错误")
-                else:
-                    # 生成模拟数据（仅用于测试）
-                    print(f"使用模拟数据代替 {symbol}")
-                    dates = pd.date_range(end=datetime.datetime.now(), periods=30, freq='B')
-                    np.random.seed(hash(symbol) % 10000)
-                    
-                    # 生成随机价格走势
-                    close = np.random.randn(len(dates)).cumsum() + 100
-                    # 确保价格为正
-                    close = np.maximum(close, 1)
-                    
-                    # 生成其他价格数据
-                    high = close * (1 + 0.02 * np.random.rand(len(dates)))
-                    low = close * (1 - 0.02 * np.random.rand(len(dates)))
-                    open_price = low + np.random.rand(len(dates)) * (high - low)
-                    volume = np.random.randint(100000, 10000000, size=len(dates))
-                    
-                    df = pd.DataFrame({
-                        'open': open_price,
-                        'high': high,
-                        'low': low,
-                        'close': close,
-                        'volume': volume
-                    }, index=dates)
-                    
-                    # 保存到缓存
-                    df.to_csv(cache_file)
-                    
-                    market_data[symbol] = df
-            except Exception as e:
-                print(f"获取 {symbol} 数据时出错: {str(e)}")
+        # 并发获取所有指数和股票的数据
+        market_data, errors = self.bulk_fetcher.fetch_many(symbols, '1mo', '1d')
+        for symbol, error in errors.items():
+            print(f"获取 {symbol} 数据时出错: {error}")
         
         return market_data
     
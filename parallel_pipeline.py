@@ -0,0 +1,247 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Dict, Tuple, Any, Optional, Callable
+from market_data_store import MarketDataStore
+from bulk_fetcher import BulkFetcher, RateLimiter, get_default_rate_limiter
+from indicator_engine import compute_indicators, build_panel
+from win_rate_engine import compute_win_rates
+
+# 每个分片的股票数量：分片过大时负载不均衡，过小时调度开销增加
+DEFAULT_SHARD_SIZE = 200
+
+
+class SharedArrays:
+    """一组共享内存数组：父进程创建，工作进程按名称挂载后直接写入结果，避免序列化DataFrame"""
+
+    def __init__(self, specs: Dict[str, Tuple[Tuple[int, ...], str]], names: Dict[str, str] = None):
+        """创建或挂载共享内存数组
+
+        Args:
+            specs: 数组名称到(形状, 数据类型)的字典
+            names: 数组名称到共享内存块名称的字典，为None时创建新的共享内存块
+        """
+        self.specs = specs
+        self._blocks = {}
+        self.arrays = {}
+        for key, (shape, dtype) in specs.items():
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            if names is None:
+                block = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                block = shared_memory.SharedMemory(name=names[key])
+            self._blocks[key] = block
+            self.arrays[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.arrays[key]
+
+    def handle(self) -> Tuple[Dict[str, Tuple[Tuple[int, ...], str]], Dict[str, str]]:
+        """获取可传给工作进程的挂载信息"""
+        return self.specs, {key: block.name for key, block in self._blocks.items()}
+
+    @classmethod
+    def attach(cls, handle: Tuple[Dict[str, Tuple[Tuple[int, ...], str]], Dict[str, str]]) -> 'SharedArrays':
+        """按挂载信息挂载已创建的共享内存数组"""
+        specs, names = handle
+        return cls(specs, names)
+
+    def close(self) -> None:
+        """释放本进程对共享内存的映射"""
+        self.arrays.clear()
+        for block in self._blocks.values():
+            block.close()
+
+    def unlink(self) -> None:
+        """释放共享内存块（由创建者在所有进程使用完毕后调用）"""
+        for block in self._blocks.values():
+            block.unlink()
+
+
+# 工作进程内的行情获取器（由_init_worker创建）
+_worker_fetcher = None
+
+
+def client_factory(api_client) -> Optional[Callable[[], Any]]:
+    """由父进程中的API客户端得到在工作进程中创建同样配置的客户端的函数
+
+    客户端对象本身通常无法跨进程传递（持有锁或网络连接），因此传递可序列化的创建函数：
+    客户端提供factory()时使用其返回值（如FakeApiClient保留延迟和失败率配置），否则使用客户端的类。
+
+    Args:
+        api_client: API客户端，为None时不使用API
+
+    Returns:
+        无参数的创建函数，api_client为None时返回None
+    """
+    if api_client is None:
+        return None
+    factory = getattr(api_client, 'factory', None)
+    return factory() if callable(factory) else type(api_client)
+
+
+def _init_worker(root_dir: str, api_client_factory: Optional[Callable[[], Any]], requests_per_second: float) -> None:
+    """初始化工作进程：创建进程内的行情数据存储和限流的获取器
+
+    Args:
+        root_dir: 行情数据根目录（与父进程相同，分区读写由文件锁保护）
+        api_client_factory: 创建API客户端的函数，为None时使用模拟数据
+        requests_per_second: 本进程的API请求速率
+    """
+    global _worker_fetcher
+    api_client = api_client_factory() if api_client_factory is not None else None
+    _worker_fetcher = BulkFetcher(MarketDataStore(root_dir), api_client,
+                                  rate_limiter=RateLimiter(requests_per_second))
+
+
+def _run_shard(handle, start: int, symbols: List[str], period: str, interval: str, names: List[str],
+               lookback: int, n_days: int, target_return: float) -> Dict[str, str]:
+    """在工作进程中处理一个分片：获取数据、计算技术指标和胜率，结果写入共享内存
+
+    Args:
+        handle: 共享内存数组的挂载信息
+        start: 分片在股票列表中的起始行
+        symbols: 分片的股票代码列表
+        period: 数据周期
+        interval: 数据间隔
+        names: 技术指标名称列表
+        lookback: 技术指标保留的K线数
+        n_days: 胜率的预测天数
+        target_return: 胜率的目标收益率
+
+    Returns:
+        获取失败的股票的错误信息字典
+    """
+    arrays = SharedArrays.attach(handle)
+    try:
+        frames, errors = _worker_fetcher.fetch_many(symbols, period, interval)
+        if not frames:
+            return errors
+
+        rows = np.array([start + i for i, symbol in enumerate(symbols) if symbol in frames])
+        indicators = compute_indicators(frames, names, lookback)
+        arrays['lengths'][rows] = indicators.lengths
+        for k, name in enumerate(names):
+            values = indicators.values[name]
+            arrays['indicators'][rows, k, lookback - values.shape[1]:] = values
+
+        closes, _ = build_panel(frames, ('close',), lookback + 1)
+        arrays['closes'][rows, lookback + 1 - closes['close'].shape[1]:] = closes['close']
+        arrays['volumes'][rows] = [frames[symbol]['volume'].iloc[-1] for symbol in frames]
+
+        win_rates = compute_win_rates(frames, n_days, target_return)
+        arrays['win_rates'][rows] = [win_rates[symbol] for symbol in frames]
+        arrays['fetched'][rows] = True
+        return errors
+    finally:
+        arrays.close()
+
+
+def run_sharded_screening(symbols: List[str], names: List[str], lookback: int, n_days: int = 5,
+                          target_return: float = 0.03, period: str = '1y', interval: str = '1d',
+                          processes: int = None, shard_size: int = DEFAULT_SHARD_SIZE,
+                          root_dir: str = 'data/market_data', api_client_factory: Callable[[], Any] = None,
+                          requests_per_second: float = None) -> Dict[str, Any]:
+    """将股票池分片到进程池中并行获取数据、计算技术指标和胜率
+
+    各工作进程把数据写入共享的行情数据存储，把紧凑的结果（最近lookback根K线的指标、最近lookback+1个
+    收盘价、最新成交量和胜率）写入共享内存数组，父进程只接收错误信息，不传输DataFrame。
+
+    Args:
+        symbols: 股票代码列表
+        names: 技术指标名称列表
+        lookback: 技术指标保留的K线数
+        n_days: 胜率的预测天数
+        target_return: 胜率的目标收益率
+        period: 数据周期
+        interval: 数据间隔
+        processes: 进程数，为None时使用全部CPU核心
+        shard_size: 每个分片的股票数量
+        root_dir: 行情数据根目录
+        api_client_factory: 在工作进程中创建API客户端的可序列化函数（可由client_factory得到），为None时使用模拟数据
+        requests_per_second: 全部进程合计的API请求速率（按实际工作进程数平分），
+            为None时使用进程内共享限流器的当前速率（受bulk_fetcher.set_default_rate影响）
+
+    Returns:
+        包含'symbols'（成功获取的股票代码）、'indicators'（股票代码到指标字典）、'closes'（股票代码到最近收盘价）、
+        'volumes'（最新成交量字典）、'win_rates'（胜率字典）和'errors'（错误信息字典）的字典
+    """
+    symbols = list(dict.fromkeys(symbols))
+    processes = processes or os.cpu_count() or 1
+    if requests_per_second is None:
+        requests_per_second = get_default_rate_limiter().requests_per_second
+    n = len(symbols)
+    arrays = SharedArrays({
+        'indicators': ((n, len(names), lookback), 'float64'),
+        'lengths': ((n,), 'int64'),
+        'closes': ((n, lookback + 1), 'float64'),
+        'volumes': ((n,), 'float64'),
+        'win_rates': ((n,), 'float64'),
+        'fetched': ((n,), 'bool')
+    })
+    try:
+        arrays['indicators'][:] = np.nan
+        arrays['closes'][:] = np.nan
+        arrays['volumes'][:] = np.nan
+        arrays['lengths'][:] = 0
+        arrays['win_rates'][:] = 0.0
+        arrays['fetched'][:] = False
+
+        errors = {}
+        shards = [(start, symbols[start:start + shard_size]) for start in range(0, n, shard_size)]
+        if shards:
+            workers = min(processes, len(shards))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(root_dir, api_client_factory, requests_per_second / workers)) as executor:
+                futures = [executor.submit(_run_shard, arrays.handle(), start, shard, period, interval, names,
+                                           lookback, n_days, target_return) for start, shard in shards]
+                for future in futures:
+                    errors.update(future.result())
+
+        # 复制出结果后释放共享内存
+        fetched = np.flatnonzero(arrays['fetched'])
+        result = {'symbols': [symbols[i] for i in fetched], 'indicators': {}, 'closes': {}, 'volumes': {},
+                  'win_rates': {}, 'errors': errors}
+        for i in fetched:
+            length = int(arrays['lengths'][i])
+            result['indicators'][symbols[i]] = {name: arrays['indicators'][i, k, lookback - length:].copy()
+                                                for k, name in enumerate(names)}
+            closes = arrays['closes'][i]
+            result['closes'][symbols[i]] = closes[~np.isnan(closes)].copy()
+            result['volumes'][symbols[i]] = float(arrays['volumes'][i])
+            result['win_rates'][symbols[i]] = float(arrays['win_rates'][i])
+        return result
+    finally:
+        arrays.close()
+        arrays.unlink()
+
+
+if __name__ == "__main__":
+    import time
+    import tempfile
+    from market_simulator import MarketSimulator, make_symbols
+
+    symbols = make_symbols(2000)
+    names = ['ma5', 'ma20', 'rsi', 'macd', 'macd_signal', 'volume_change']
+    with tempfile.TemporaryDirectory() as root_dir:
+        MarketSimulator().populate(MarketDataStore(root_dir), symbols)
+
+        timings = {}
+        for processes in (1, max(os.cpu_count() or 1, 4)):
+            start = time.time()
+            result = run_sharded_screening(symbols, names, 20, processes=processes, root_dir=root_dir)
+            timings[processes] = time.time() - start
+            print(f"{processes} 个进程处理 {len(result['symbols'])} 只股票耗时: {timings[processes]:.2f}秒")
+
+        # 与单进程直接计算的结果对比
+        store = MarketDataStore(root_dir)
+        frames = {symbol: store.fetch(symbol) for symbol in symbols[:100]}
+        expected = compute_win_rates(frames)
+        assert all(result['win_rates'][symbol] == expected[symbol] for symbol in frames)
+        indicators = compute_indicators(frames, names, 20)
+        for symbol in frames:
+            for name in names:
+                assert np.array_equal(result['indicators'][symbol][name], indicators[symbol][name], equal_nan=True)
+            assert np.array_equal(result['closes'][symbol], frames[symbol]['close'].values[-21:])
+        print("技术指标和胜率与单进程计算结果一致")
@@ -0,0 +1,270 @@
+import os
+import json
+import shutil
+import datetime
+import threading
+import numpy as np
+from typing import List, Dict, Tuple, Any, Optional
+from market_data_store import _atomic_write
+
+# 快照根目录：每个版本一个不可变的子目录，CURRENT文件记录当前版本
+DEFAULT_SNAPSHOT_DIR = 'data/recommendations/snapshots'
+
+# 发布新版本后保留的历史版本数量
+DEFAULT_KEEP_VERSIONS = 5
+
+# 技术信号按位编码：第i位为1表示SIGNAL_TEXTS[i]成立
+SIGNAL_TEXTS = [
+    "MA5上穿MA20，短期趋势向上",
+    "MA5下穿MA20，短期趋势向下",
+    "RSI低于30，可能超卖",
+    "RSI高于70，可能超买",
+    "MACD金叉，买入信号",
+    "MACD死叉，卖出信号"
+]
+
+# 快照必须包含的列（列式存储，每列一个.npy文件，读取时内存映射）
+_COLUMNS = ('symbols', 'win_rate', 'latest_price', 'change_percent', 'signals', 'neighbors')
+
+
+def signal_flags(ma5, ma20, rsi, macd, macd_signal) -> np.ndarray:
+    """由最新的技术指标计算技术信号的位编码（支持标量或数组，NaN不产生信号）
+
+    Args:
+        ma5: 5日均线
+        ma20: 20日均线
+        rsi: RSI
+        macd: MACD
+        macd_signal: MACD信号线
+
+    Returns:
+        uint8位编码
+    """
+    conditions = [
+        np.greater(ma5, ma20), np.less(ma5, ma20),
+        np.less(rsi, 30), np.greater(rsi, 70),
+        np.greater(macd, macd_signal), np.less(macd, macd_signal)
+    ]
+    flags = np.zeros(np.shape(ma5), dtype=np.uint8)
+    for bit, condition in enumerate(conditions):
+        flags |= (condition.astype(np.uint8) << bit)
+    return flags
+
+
+def decode_signals(flags: int) -> List[str]:
+    """将技术信号的位编码解码为文字
+
+    Args:
+        flags: 位编码
+
+    Returns:
+        技术信号文字列表
+    """
+    return [text for bit, text in enumerate(SIGNAL_TEXTS) if int(flags) >> bit & 1]
+
+
+def publish_snapshot(table: Dict[str, np.ndarray], meta: Dict[str, Any], root_dir: str = DEFAULT_SNAPSHOT_DIR,
+                     keep: int = DEFAULT_KEEP_VERSIONS, categories: Dict[str, List[str]] = None) -> str:
+    """发布新的推荐快照版本
+
+    先把各列写入临时目录再整体重命名为版本目录，最后原子替换CURRENT文件，读取方要么看到旧版本，
+    要么看到完整的新版本。已发布的版本目录不再修改。
+
+    Args:
+        table: 各列数组，按排名排序；必须包含symbols、win_rate、latest_price、change_percent、signals、neighbors，
+            可附加其他列（如选股器使用的市场、行业、成交量和技术指标）
+        meta: 快照参数等元信息（可JSON序列化）
+        root_dir: 快照根目录
+        keep: 保留的版本数量
+        categories: 分类列的列名到类别列表的字典（分类列保存类别代码）
+
+    Returns:
+        新版本号
+    """
+    missing = [name for name in _COLUMNS if name not in table]
+    if missing:
+        raise ValueError(f"快照缺少必需的列: {missing}")
+    os.makedirs(root_dir, exist_ok=True)
+    now = datetime.datetime.now()
+    version = f"{now.strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}"
+    tmp_dir = os.path.join(root_dir, f'.{version}.tmp')
+    os.makedirs(tmp_dir)
+    try:
+        for name, values in table.items():
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(values))
+        meta = dict(meta, version=version, created_at=now.isoformat(), count=len(table['symbols']),
+                    columns=list(table), categories=categories or {})
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.rename(tmp_dir, os.path.join(root_dir, version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _atomic_write(os.path.join(root_dir, 'CURRENT'), lambda f: f.write(version.encode('utf-8')))
+
+    # 清理旧版本（已打开旧版本的读取方持有内存映射，删除失败时保留）
+    versions = sorted(name for name in os.listdir(root_dir)
+                      if not name.startswith('.') and os.path.isdir(os.path.join(root_dir, name)))
+    for name in versions[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(root_dir, name), ignore_errors=True)
+    return version
+
+
+class RecommendationSnapshot:
+    """只读的推荐快照版本：各列以内存映射方式打开，按排名读取前n条无需重新计算"""
+
+    def __init__(self, path: str):
+        """打开快照版本目录
+
+        Args:
+            path: 版本目录路径
+        """
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.version = self.meta['version']
+        self.columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                        for name in self.meta.get('columns', _COLUMNS)}
+        self._rows = None
+
+    def __len__(self) -> int:
+        return len(self.columns['symbols'])
+
+    def _record(self, i: int) -> Dict[str, Any]:
+        """第i行转换为推荐信息字典（包含recommend_stocks的字段和附加列，分类列转换为类别名称）"""
+        columns = self.columns
+        record = {name: self._value(name, i) for name in columns if name not in _COLUMNS}
+        return {
+            **record,
+            'rank': i + 1,
+            'symbol': str(columns['symbols'][i]),
+            'win_rate': float(columns['win_rate'][i]),
+            'latest_price': float(columns['latest_price'][i]),
+            'change_percent': float(columns['change_percent'][i]),
+            'signals': decode_signals(columns['signals'][i]),
+            'similar_stocks': [str(symbol) for symbol in columns['neighbors'][i] if symbol],
+            'recommendation_date': self.meta['created_at'][:10]
+        }
+
+    def _value(self, name: str, i: int) -> Any:
+        """附加列第i行的值"""
+        value = self.columns[name][i]
+        categories = self.meta.get('categories', {}).get(name)
+        if categories is not None:
+            return categories[int(value)]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def records(self, rows) -> List[Dict[str, Any]]:
+        """按行号获取推荐信息（如选股器返回的行号）
+
+        Args:
+            rows: 行号序列
+
+        Returns:
+            推荐股票列表
+        """
+        return [self._record(int(i)) for i in rows]
+
+    def top(self, n: int = 5, min_win_rate: float = 0.0) -> List[Dict[str, Any]]:
+        """获取排名前n的推荐（胜率降序，胜率达到要求的股票为排名的前缀）
+
+        Args:
+            n: 数量
+            min_win_rate: 最小胜率要求
+
+        Returns:
+            推荐股票列表
+        """
+        # 胜率降序排列，达到要求的股票是前缀，只需检查前n行
+        qualified = int(np.count_nonzero(self.columns['win_rate'][:n] >= min_win_rate))
+        return [self._record(i) for i in range(qualified)]
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """按股票代码查询推荐信息
+
+        Args:
+            symbol: 股票代码
+
+        Returns:
+            推荐信息字典，不在快照中时返回None
+        """
+        if self._rows is None:
+            self._rows = {str(s): i for i, s in enumerate(self.columns['symbols'])}
+        i = self._rows.get(symbol)
+        return None if i is None else self._record(i)
+
+
+# 进程内已打开的快照（按根目录），版本未变化时直接复用
+_open_snapshots = {}
+_open_lock = threading.Lock()
+
+
+def current_version(root_dir: str = DEFAULT_SNAPSHOT_DIR) -> Optional[str]:
+    """读取当前版本号
+
+    Args:
+        root_dir: 快照根目录
+
+    Returns:
+        版本号，尚未发布时返回None
+    """
+    try:
+        with open(os.path.join(root_dir, 'CURRENT'), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_latest(root_dir: str = DEFAULT_SNAPSHOT_DIR) -> Optional[RecommendationSnapshot]:
+    """获取当前版本的快照：只读取CURRENT文件判断版本，版本变化时才重新打开
+
+    Args:
+        root_dir: 快照根目录
+
+    Returns:
+        推荐快照，尚未发布时返回None
+    """
+    version = current_version(root_dir)
+    if version is None:
+        return None
+    with _open_lock:
+        snapshot = _open_snapshots.get(root_dir)
+        if snapshot is None or snapshot.version != version:
+            snapshot = RecommendationSnapshot(os.path.join(root_dir, version))
+            _open_snapshots[root_dir] = snapshot
+        return snapshot
+
+
+if __name__ == "__main__":
+    import time
+    import tempfile
+
+    rng = np.random.default_rng(0)
+    n = 5000
+    win_rate = np.sort(rng.random(n))[::-1]
+    table = {
+        'symbols': np.array([f'SIM{i:04d}' for i in range(n)]),
+        'win_rate': win_rate,
+        'latest_price': rng.uniform(5, 200, n),
+        'change_percent': rng.normal(0, 2, n),
+        'signals': signal_flags(rng.random(n), rng.random(n), rng.uniform(0, 100, n), rng.random(n), rng.random(n)),
+        'neighbors': np.array([[f'SIM{j:04d}' for j in rng.integers(0, n, 3)] for _ in range(n)])
+    }
+    with tempfile.TemporaryDirectory() as root_dir:
+        first = publish_snapshot(table, {'n_days': 5}, root_dir)
+        start = time.time()
+        snapshot = load_latest(root_dir)
+        print(f"首次打开耗时: {(time.time() - start) * 1000:.2f}毫秒")
+        start = time.time()
+        for _ in range(100):
+            top = load_latest(root_dir).top(5, min_win_rate=0.5)
+        print(f"读取前5条推荐平均耗时: {(time.time() - start) * 10:.3f}毫秒")
+        assert [r['symbol'] for r in top] == list(table['symbols'][:5])
+        assert len(snapshot.top(n, min_win_rate=0.5)) == int((win_rate >= 0.5).sum())
+
+        second = publish_snapshot(dict(table, win_rate=win_rate * 0.5), {'n_days': 5}, root_dir)
+        assert load_latest(root_dir).version == second != first
+        assert snapshot.top(1)[0]['win_rate'] == win_rate[0]  # 已打开的旧版本不受影响
+        print(f"版本切换: {first} -> {second}")
+        print(top[0])
@@ -0,0 +1,201 @@
+import hashlib
+import inspect
+import functools
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Tuple, Any, Optional, Callable
+from lru_registry import LRURegistry, DEFAULT_MEMORY_BUDGET
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """计算行情数据的内容指纹（索引和各列的字节哈希）
+
+    Args:
+        df: 行情数据DataFrame
+
+    Returns:
+        十六进制指纹
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(df.index.values).tobytes())
+    for column in df.columns:
+        digest.update(str(column).encode('utf-8'))
+        digest.update(np.ascontiguousarray(df[column].to_numpy()).tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """以(阶段, 股票代码, 数据指纹, 参数)为键的分析结果缓存
+
+    同一版本的数据和参数只计算一次；数据更新后指纹变化，旧结果按LRU被淘汰。
+    提供data_key时，数据指纹取行情数据存储的版本标识（只读取元数据），
+    无法确定版本时才对数据内容计算哈希。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_BUDGET // 8, name: str = 'results',
+                 data_key: Callable[[str], Optional[str]] = None):
+        """初始化结果缓存
+
+        Args:
+            max_bytes: 内存预算（字节）
+            name: 缓存名称（用于统计信息）
+            data_key: 由股票代码获取数据版本标识的函数（如MarketDataStore.data_key），返回None时按内容计算指纹
+        """
+        self._results = LRURegistry(max_bytes, name=name)
+        self.data_key = data_key
+        self._fingerprints = {}  # id(DataFrame) -> (DataFrame的弱引用, 指纹)，避免同一对象重复哈希，不延长对象的生命周期
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.stage_stats = {}
+
+    def data_fingerprint(self, symbol: str) -> Optional[str]:
+        """按数据版本获取股票的数据指纹（不读取数据）
+
+        Args:
+            symbol: 股票代码
+
+        Returns:
+            数据指纹，未提供data_key或无法确定版本时返回None
+        """
+        return self.data_key(symbol) if self.data_key is not None else None
+
+    def fingerprint(self, df: pd.DataFrame, symbol: str = None) -> str:
+        """获取数据指纹：优先使用股票的数据版本，否则按内容计算（同一DataFrame对象只计算一次）
+
+        Args:
+            df: 行情数据DataFrame
+            symbol: 股票代码
+
+        Returns:
+            数据指纹
+        """
+        if symbol is not None:
+            fingerprint = self.data_fingerprint(symbol)
+            if fingerprint is not None:
+                return fingerprint
+
+        key = id(df)
+        with self._lock:
+            cached = self._fingerprints.get(key)
+            if cached is not None and cached[0]() is df:
+                return cached[1]
+
+        fingerprint = frame_fingerprint(df)
+        with self._lock:
+            # 对象被回收时删除对应的条目
+            ref = weakref.ref(df, lambda _, key=key: self._fingerprints.pop(key, None))
+            self._fingerprints[key] = (ref, fingerprint)
+        return fingerprint
+
+    def panel_fingerprint(self, frames: Dict[str, pd.DataFrame]) -> str:
+        """获取多只股票数据的组合指纹（股票代码及各自的数据指纹）
+
+        Args:
+            frames: 股票代码到行情数据DataFrame的字典
+
+        Returns:
+            组合指纹
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for symbol, df in frames.items():
+            digest.update(str(symbol).encode('utf-8'))
+            digest.update(self.fingerprint(df, symbol).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get_or_compute(self, stage: str, symbol: str, fingerprint: str, params: Tuple, compute: Callable[[], Any]) -> Any:
+        """获取缓存的结果，不存在时计算并缓存
+
+        Args:
+            stage: 分析阶段名称
+            symbol: 股票代码
+            fingerprint: 数据指纹
+            params: 参数元组（须可哈希）
+            compute: 计算结果的函数
+
+        Returns:
+            分析结果
+        """
+        key = (stage, symbol, fingerprint, params)
+        try:
+            result = self._results[key]
+        except KeyError:
+            pass
+        else:
+            self._count(stage, hit=True)
+            return result
+
+        self._count(stage, hit=False)
+        result = compute()
+        self._results[key] = result
+        return result
+
+    def _count(self, stage: str, hit: bool) -> None:
+        """更新命中/未命中计数"""
+        with self._lock:
+            stats = self.stage_stats.setdefault(stage, {'hits': 0, 'misses': 0})
+            if hit:
+                self.hits += 1
+                stats['hits'] += 1
+            else:
+                self.misses += 1
+                stats['misses'] += 1
+
+    def clear(self) -> None:
+        """清空缓存的结果"""
+        self._results.clear()
+        with self._lock:
+            self._fingerprints.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取统计信息
+
+        Returns:
+            总体和各阶段的命中/未命中次数及内存占用
+        """
+        with self._lock:
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / max(1, self.hits + self.misses),
+                'stages': {stage: dict(counts) for stage, counts in self.stage_stats.items()}
+            }
+        stats['memory'] = self._results.stats()
+        return stats
+
+
+def memoized_stage(stage: str) -> Callable:
+    """将分析方法包装为按数据指纹缓存的阶段
+
+    被装饰方法的第一个参数须为股票代码，实例须提供stock_data（股票代码到DataFrame的映射）和
+    result_cache（ResultCache）。数据指纹优先取数据版本，此时命中缓存不读取数据。
+    未命中时执行原方法（包括其对实例状态的更新），命中时直接返回缓存结果。
+
+    Args:
+        stage: 阶段名称
+
+    Returns:
+        装饰器
+    """
+    def decorator(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, symbol, *args, **kwargs):
+            if symbol not in self.stock_data:
+                return method(self, symbol, *args, **kwargs)
+
+            bound = signature.bind(self, symbol, *args, **kwargs)
+            bound.apply_defaults()
+            params = tuple((name, value) for name, value in bound.arguments.items() if name not in ('self', 'symbol'))
+
+            fingerprint = self.result_cache.data_fingerprint(symbol)
+            if fingerprint is None:
+                fingerprint = self.result_cache.fingerprint(self.stock_data[symbol])
+            return self.result_cache.get_or_compute(stage, symbol, fingerprint, params,
+                                                    lambda: method(self, symbol, *args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,314 @@
+import os
+import datetime
+import numpy as np
+from typing import List, Dict, Tuple, Any, Optional
+from market_data_store import _atomic_write
+
+# 每只股票保存的最相似股票数量
+DEFAULT_TOP_K = 10
+
+# 分块计算相似度时每块的行数：每块的临时矩阵为 block_rows×N
+DEFAULT_BLOCK_ROWS = 512
+
+# 定期全量重建：增量更新沿用上次重建时的标准化参数，更新的股票比例或距上次重建的时间超过阈值时全量重建
+REBUILD_CHANGED_FRACTION = 0.2
+REBUILD_INTERVAL = datetime.timedelta(days=1)
+
+
+class SimilarityIndex:
+    """股票相似度的前k近邻索引
+
+    特征按列标准化（与StandardScaler相同）后单位化，余弦相似度即为向量内积。按行分块与全部向量相乘，
+    每块只保留前k个最相似的股票，内存占用为O(block_rows×N)而不是O(N²)。
+
+    部分股票的特征变化时，update只重新计算这些股票的近邻列表，并把它们合并到其他股票的近邻列表中，
+    代价为O(变化数×N)；标准化参数在两次全量重建（fit）之间保持不变。
+    """
+
+    def __init__(self, k: int = DEFAULT_TOP_K, block_rows: int = DEFAULT_BLOCK_ROWS):
+        """初始化相似度索引
+
+        Args:
+            k: 每只股票保存的最相似股票数量
+            block_rows: 分块计算的行数
+        """
+        self.k = k
+        self.block_rows = block_rows
+        self.symbols = []
+        self.features = np.empty((0, 0))  # 原始特征（全量重建时使用）
+        self.mean = np.empty(0)  # 标准化参数（上次全量重建时计算）
+        self.scale = np.empty(0)
+        self.vectors = np.empty((0, 0))  # 标准化并单位化后的特征向量
+        self.neighbors = np.empty((0, 0), dtype=np.int64)  # 各股票前k个最相似股票的行号（按相似度降序）
+        self.scores = np.empty((0, 0))  # 对应的余弦相似度
+        self.built_at = None
+        self.changed_since_build = set()  # 上次全量重建后增量更新过的股票
+        self._rows = {}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._rows
+
+    def normalize(self, features: np.ndarray) -> np.ndarray:
+        """按当前标准化参数标准化后将每行单位化（全零行保持为0）
+
+        Args:
+            features: N×D特征矩阵
+
+        Returns:
+            N×D单位向量矩阵
+        """
+        scaled = (np.asarray(features, dtype=np.float64) - self.mean) / self.scale
+        norms = np.linalg.norm(scaled, axis=1, keepdims=True)
+        return scaled / np.where(norms > 0, norms, 1.0)
+
+    def fit(self, features: np.ndarray, symbols: List[str]) -> 'SimilarityIndex':
+        """由特征矩阵构建索引
+
+        Args:
+            features: N×D特征矩阵
+            symbols: 与特征矩阵各行对应的股票代码
+
+        Returns:
+            索引本身
+        """
+        self.symbols = list(symbols)
+        self._rows = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.features = np.asarray(features, dtype=np.float64).reshape(len(self.symbols), -1)
+        # 按列标准化参数（与StandardScaler相同，方差为0的列不缩放）
+        self.mean = self.features.mean(axis=0) if len(self.symbols) else np.zeros(self.features.shape[1])
+        self.scale = self.features.std(axis=0) if len(self.symbols) else np.ones(self.features.shape[1])
+        self.scale[self.scale == 0] = 1.0
+        self.vectors = self.normalize(self.features)
+        self.neighbors, self.scores = self._top_k(np.arange(len(self.symbols)))
+        self.built_at = datetime.datetime.now().isoformat()
+        self.changed_since_build = set()
+        return self
+
+    def update(self, features: Dict[str, np.ndarray]) -> None:
+        """增量更新部分股票的特征（新股票追加到索引中）
+
+        变化股票的近邻列表重新计算；其他股票的近邻列表与变化股票的新相似度合并，只有列表中某只变化股票的
+        相似度降到原第k名以下（列表外的股票可能进入前k）时才重新计算该行。
+
+        Args:
+            features: 股票代码到新特征向量的字典
+        """
+        if not features:
+            return
+        if not len(self.symbols):
+            self.fit(np.array(list(features.values())), list(features.keys()))
+            return
+
+        old_count = len(self.symbols)
+        for symbol in features:
+            if symbol not in self._rows:
+                self._rows[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+        changed = np.array([self._rows[symbol] for symbol in features])
+        new_rows = len(self.symbols) - old_count
+        if new_rows:
+            self.features = np.vstack([self.features, np.zeros((new_rows, self.features.shape[1]))])
+            self.vectors = np.vstack([self.vectors, np.zeros((new_rows, self.vectors.shape[1]))])
+        self.features[changed] = np.array(list(features.values()), dtype=np.float64)
+        self.vectors[changed] = self.normalize(self.features[changed])
+        self.changed_since_build.update(features)
+
+        # 旧近邻列表（新股票没有列表）
+        k = min(self.k, len(self.symbols) - 1)
+        old_neighbors = np.full((len(self.symbols), self.neighbors.shape[1]), -1, dtype=np.int64)
+        old_scores = np.full(old_neighbors.shape, -np.inf)
+        old_neighbors[:old_count], old_scores[:old_count] = self.neighbors, self.scores
+
+        is_changed = np.zeros(len(self.symbols), dtype=bool)
+        is_changed[changed] = True
+        others = np.flatnonzero(~is_changed)
+
+        # 其他股票与变化股票的新相似度：O(N×变化数)
+        similarities = self.vectors[others] @ self.vectors[changed].T
+        position = np.full(len(self.symbols), -1)
+        position[changed] = np.arange(len(changed))
+
+        listed = old_neighbors[others]
+        listed_position = np.where(listed >= 0, position[np.maximum(listed, 0)], -1)
+        listed_changed = listed_position >= 0
+        rows = np.arange(len(others))[:, None]
+        listed_scores = np.where(listed_changed, similarities[rows, np.maximum(listed_position, 0)], old_scores[others])
+
+        # 列表已满且变化股票的相似度降到原第k名以下时，列表外的股票可能进入前k，需重新计算
+        full = old_neighbors.shape[1] == k
+        threshold = old_scores[others, -1] if old_neighbors.shape[1] else np.full(len(others), -np.inf)
+        dirty = full & (listed_changed & (listed_scores < threshold[:, None])).any(axis=1)
+
+        # 其余行：原列表（已更新变化股票的相似度）与变化股票合并取前k
+        extra_scores = similarities.copy()
+        extra_scores[np.repeat(np.arange(len(others)), listed_changed.sum(axis=1)),
+                     listed_position[listed_changed]] = -np.inf  # 已在列表中的变化股票不重复计入
+        candidates = np.hstack([listed, np.broadcast_to(changed, (len(others), len(changed)))])
+        candidate_scores = np.hstack([np.where(listed >= 0, listed_scores, -np.inf), extra_scores])
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')[:, :k]
+
+        neighbors = np.empty((len(self.symbols), k), dtype=np.int64)
+        scores = np.empty((len(self.symbols), k))
+        neighbors[others] = np.take_along_axis(candidates, order, axis=1)
+        scores[others] = np.take_along_axis(candidate_scores, order, axis=1)
+
+        recompute = np.concatenate([changed, others[dirty]])
+        neighbors[recompute], scores[recompute] = self._top_k(recompute, k)
+        self.neighbors, self.scores = neighbors, scores
+
+    def needs_rebuild(self, changed_fraction: float = REBUILD_CHANGED_FRACTION,
+                      interval: datetime.timedelta = REBUILD_INTERVAL) -> bool:
+        """是否需要全量重建（刷新标准化参数）
+
+        Args:
+            changed_fraction: 上次重建后增量更新的股票比例阈值
+            interval: 距上次重建的时间阈值
+
+        Returns:
+            是否需要重建
+        """
+        if self.built_at is None:
+            return True
+        if len(self.changed_since_build) > changed_fraction * max(len(self.symbols), 1):
+            return True
+        return datetime.datetime.now() - datetime.datetime.fromisoformat(self.built_at) > interval
+
+    def _top_k(self, rows: np.ndarray, k: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """分块计算指定行的前k个最相似股票（不含自身）
+
+        Args:
+            rows: 行号数组
+            k: 近邻数量，为None时使用self.k
+
+        Returns:
+            (len(rows)×k行号数组, len(rows)×k相似度数组)，按相似度降序
+        """
+        k = min(self.k if k is None else k, max(len(self.symbols) - 1, 0))
+        neighbors = np.empty((len(rows), k), dtype=np.int64)
+        scores = np.empty((len(rows), k))
+        if k == 0:
+            return neighbors, scores
+
+        for start in range(0, len(rows), self.block_rows):
+            block = rows[start:start + self.block_rows]
+            similarities = self.vectors[block] @ self.vectors.T
+            similarities[np.arange(len(block)), block] = -np.inf
+            candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1, kind='stable')
+            neighbors[start:start + len(block)] = np.take_along_axis(candidates, order, axis=1)
+            scores[start:start + len(block)] = np.take_along_axis(candidate_scores, order, axis=1)
+        return neighbors, scores
+
+    def similar_to(self, symbol: str, k: int = 3) -> List[Tuple[str, float]]:
+        """查询与指定股票最相似的k只股票
+
+        Args:
+            symbol: 股票代码
+            k: 返回的股票数量，超过索引保存的数量时直接计算
+
+        Returns:
+            (股票代码, 余弦相似度)列表，按相似度降序；股票不在索引中时返回空列表
+        """
+        row = self._rows.get(symbol)
+        if row is None:
+            return []
+        if k <= self.neighbors.shape[1]:
+            neighbors, scores = self.neighbors[row, :k], self.scores[row, :k]
+        else:
+            neighbors, scores = self._top_k(np.array([row]), k)
+            neighbors, scores = neighbors[0], scores[0]
+        return [(self.symbols[i], float(score)) for i, score in zip(neighbors, scores)]
+
+    def save(self, path: str) -> None:
+        """将索引保存为单个.npz文件（原子替换）
+
+        Args:
+            path: 文件路径
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        arrays = {
+            'symbols': np.array(self.symbols, dtype=str),
+            'features': self.features,
+            'mean': self.mean,
+            'scale': self.scale,
+            'vectors': self.vectors,
+            'neighbors': self.neighbors,
+            'scores': self.scores,
+            'params': np.array([self.k, self.block_rows]),
+            'built_at': np.array(self.built_at or ''),
+            'changed_since_build': np.array(sorted(self.changed_since_build), dtype=str)
+        }
+        _atomic_write(path, lambda f: np.savez(f, **arrays))
+
+    @classmethod
+    def load(cls, path: str) -> Optional['SimilarityIndex']:
+        """从文件加载索引
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            相似度索引，文件不存在时返回None
+        """
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            k, block_rows = (int(value) for value in data['params'])
+            index = cls(k, block_rows)
+            index.symbols = data['symbols'].tolist()
+            index.features = data['features']
+            index.mean = data['mean']
+            index.scale = data['scale']
+            index.vectors = data['vectors']
+            index.neighbors = data['neighbors']
+            index.scores = data['scores']
+            index.built_at = str(data['built_at']) or None
+            index.changed_since_build = set(data['changed_since_build'].tolist())
+        index._rows = {symbol: i for i, symbol in enumerate(index.symbols)}
+        return index
+
+
+if __name__ == "__main__":
+    import time
+    import tempfile
+    from sklearn.metrics.pairwise import cosine_similarity
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(0)
+    symbols = [f"SIM{i:04d}" for i in range(5000)]
+    features = rng.normal(size=(5000, 80))
+
+    start = time.time()
+    index = SimilarityIndex().fit(features, symbols)
+    print(f"构建 {len(symbols)} 只股票的前{index.k}近邻索引耗时: {time.time() - start:.2f}秒")
+
+    # 与稠密余弦相似度矩阵对比
+    start = time.time()
+    dense = cosine_similarity(StandardScaler().fit_transform(features))
+    print(f"稠密矩阵耗时: {time.time() - start:.2f}秒，占用 {dense.nbytes / 1024 ** 2:.0f}MB")
+    np.fill_diagonal(dense, -np.inf)
+    expected = np.sort(dense, axis=1)[:, ::-1][:, :index.k]
+    print(f"前k相似度最大误差: {np.abs(index.scores - expected).max():.2e}")
+
+    # 增量更新与按相同标准化参数全量计算的结果对比
+    changed = {symbol: features[i] + rng.normal(size=80) for i, symbol in enumerate(symbols[:50])}
+    changed['NEW0000'] = rng.normal(size=80)
+    start = time.time()
+    index.update(changed)
+    print(f"增量更新 {len(changed)} 只股票耗时: {time.time() - start:.3f}秒")
+    neighbors, scores = index._top_k(np.arange(len(index)))
+    assert np.array_equal(index.neighbors, neighbors) and np.allclose(index.scores, scores)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'similarity_index.npz')
+        index.save(path)
+        loaded = SimilarityIndex.load(path)
+        assert loaded.similar_to(symbols[0], 3) == index.similar_to(symbols[0], 3)
+        assert len(loaded.similar_to(symbols[0], 20)) == 20
+        print(f"{symbols[0]} 的相似股票: {loaded.similar_to(symbols[0], 3)}")
@@ -3,11 +3,22 @@ import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import StandardScaler
 import json
 import datetime
 from typing import List, Dict, Tuple, Any, Optional
+from market_data_store import MarketDataStore, get_market_data_store
+from bulk_fetcher import BulkFetcher
+from lru_registry import LRURegistry, DEFAULT_MEMORY_BUDGET
+from indicator_engine import compute_indicators
+from win_rate_engine import compute_win_rates, compute_win_rate_surface, WinRateSurface, DEFAULT_HORIZONS, DEFAULT_TARGETS
+from result_cache import ResultCache
+from backtest_engine import walk_forward_backtest, BacktestResult
+from parallel_pipeline import run_sharded_screening, client_factory
+from similarity_index import SimilarityIndex
+from correlation_engine import CorrelationEngine, return_panel, DEFAULT_WINDOW
+from recommendation_snapshot import (publish_snapshot, load_latest, signal_flags, decode_signals,
+                                     RecommendationSnapshot, DEFAULT_SNAPSHOT_DIR)
+from stock_screener import StockScreener, encode_category, market_of, MARKETS, UNKNOWN_INDUSTRY
 
 # 添加数据API路径
 sys.path.append('/opt/.manus/.sandbox-runtime')
@@ -21,17 +32,48 @@ except ImportError:
 class StockRecommendationSystem:
     """基于历史走势的股票推荐系统"""
     
-    def __init__(self, api_client=None):
+    # 推荐流程使用的技术指标：推荐只读取最新值，相似度使用最近20根K线
+    SCREENING_INDICATORS = ['ma5', 'ma20', 'rsi', 'macd', 'macd_signal', 'volume_change']
+    SCREENING_LOOKBACK = 20
+    
+    # 持久化的相似度索引
+    SIMILARITY_INDEX_PATH = 'data/recommendations/similarity_index.npz'
+    
+    # 推荐流程发布的推荐快照（UI和API直接读取）
+    SNAPSHOT_DIR = DEFAULT_SNAPSHOT_DIR
+    
+    # 股票代码到所属行业的映射（JSON对象，可选），用于选股器的行业筛选
+    INDUSTRY_MAP_PATH = 'data/industry_map.json'
+    
+    # 推荐页面的排序方式对应的快照列（均为降序，相同时按胜率）
+    SORT_COLUMNS = {'胜率': 'win_rate', '上涨空间': 'potential_upside', '最新价格': 'latest_price', '成交量': 'volume'}
+    
+    def __init__(self, api_client=None, data_store: MarketDataStore = None):
         """初始化推荐系统
         
         Args:
             api_client: YahooFinance API客户端
+            data_store: 行情数据存储，为None时使用进程内共享的存储
         """
         self.api_client = api_client
-        self.stock_data = {}  # 存储股票历史数据
-        self.technical_indicators = {}  # 存储计算的技术指标
-        self.similarity_matrix = None  # 股票相似度矩阵
+        self.data_store = data_store or get_market_data_store()
+        # 每次获取时读取当前的api_client，替换客户端后立即生效
+        self.bulk_fetcher = BulkFetcher(self.data_store,
+                                        client_provider=lambda: self.api_client)
+        # 已获取的股票（直通模式：行情数据由共享存储的注册表统一按内存预算缓存，这里只记录键，访问时从存储读取）
+        self.stock_data = LRURegistry(0, loader=self._reload_stock_data, name='stock_data')
+        self.technical_indicators = LRURegistry(loader=self._reload_technical_indicators,
+                                                name='technical_indicators')  # 存储计算的技术指标
+        self._data_params = {}  # 各股票数据的(周期, 间隔)，用于淘汰后重新加载
+        self.similarity_index = None  # 股票相似度的前k近邻索引
         self.win_rates = {}  # 存储计算的胜率
+        self.result_cache = ResultCache(DEFAULT_MEMORY_BUDGET // 8, name='recommendation_results',
+                                        data_key=self._data_key)
+        self.win_rate_surface = None  # 最近计算的胜率曲面
+        self._win_rate_surface_fingerprint = None  # 胜率曲面对应的数据指纹
+        self.correlation_engine = None  # 日收益率的滚动相关性引擎
+        self._screeners = {}  # 按快照版本缓存的选股器（分类列索引随快照复用）
+        self._screening_latest = {}  # 并行筛选返回的(最近收盘价, 最新成交量)（发布快照时使用，避免重新加载股票数据）
         
         # 默认股票列表（可扩展）
         self.default_stocks = [
@@ -40,8 +82,11 @@ class StockRecommendationSystem:
             '600519.SS', '000858.SZ', '601318.SS', '600036.SS', '000333.SZ'
         ]
         
+        # 默认股票常驻内存
+        self.technical_indicators.pin(self.default_stocks)
+        self.data_store.pin(self.default_stocks)
+        
         # 创建数据目录
-        os.makedirs('data/stock_data', exist_ok=True)
         os.makedirs('data/recommendations', exist_ok=True)
         
     def fetch_stock_data(self, symbols: List[str] = None, period: str = '1y', interval: str = '1d') -> Dict[str, pd.DataFrame]:
@@ -58,163 +103,142 @@ class StockRecommendationSystem:
         if symbols is None:
             symbols = self.default_stocks
             
-        result = {}
-        
-        for symbol in symbols:
-            try:
-                # 检查是否有缓存数据
-                cache_file = f'data/stock_data/{symbol}_{period}_{interval}.csv'
-                if os.path.exists(cache_file):
-                    # 检查缓存是否过期（超过1天）
-                    if datetime.datetime.now().timestamp() - os.path.getmtime(cache_file) < 86400:
-                        df = pd.read_csv(cache_file, index_col=0, parse_dates=True)
-                        result[symbol] = df
-                        print(f"从缓存加载 {symbol} 数据")
-                        continue
-                
-                if HAS_API_CLIENT and self.api_client:
-                    # 使用YahooFinance API获取数据
-                    data = self.api_client.call_api('YahooFinance/get_stock_chart', 
-                                                   query={'symbol': symbol, 
-                                                         'interval': interval, 
-                                                         'range': period})
-                    
-                    if 'chart' in data and 'result' in data['chart'] and data['chart']['result']:
-                        chart_data = data['chart']['result'][0]
-                        
-                        # 提取时间戳和价格数据
-                        timestamps = chart_data.get('timestamp', [])
-                        quotes = chart_data.get('indicators', {}).get('quote', [{}])[0]
-                        
-                        if timestamps and 'close' in quotes:
-                            # 转换时间戳为日期
-                            dates = [datetime.datetime.fromtimestamp(ts).strftime('%Y-%m-%d') for ts in timestamps]
-                            
-                            # 创建DataFrame
-                            df = pd.DataFrame({
-                                'open': quotes.get('open', [None] * len(timestamps)),
-                                'high': quotes.get('high', [None] * len(timestamps)),
-                                'low': quotes.get('low', [None] * len(timestamps)),
-                                'close': quotes.get('close', [None] * len(timestamps)),
-                                'volume': quotes.get('volume', [None] * len(timestamps))
-                            }, index=dates)
-                            
-                            # 处理缺失值
-                            df = df.dropna()
-                            
-                            # 保存到缓存
-                            df.to_csv(cache_file)
-                            
-                            result[symbol] = df
-                            print(f"成功获取 {symbol} 数据")
-                        else:
-                            print(f"获取 {symbol} 数据失败：数据结构不完整")
-                    else:
-                        print(f"获取 {symbol} 数据失败：API返回错误")
-                else:
-                    # 生成模拟数据（仅用于测试）
-                    print(f"使用模拟数据代替 {symbol}")
-                    dates = pd.date_range(end=datetime.datetime.now(), periods=252, freq='B')
-                    np.random.seed(hash(symbol) % 10000)
-                    
-                    # 生成随机价格走势
-                    close = np.random.randn(len(dates)).cumsum() + 100
-                    # 确保价格为正
-                    close = np.maximum(close, 1)
-                    
-                    # 生成其他价格数据
-                    high = close * (1 + 0.02 * np.random.rand(len(dates)))
-                    low = close * (1 - 0.02 * np.random.rand(len(dates)))
-                    open_price = low + np.random.rand(len(dates)) * (high - low)
-                    volume = np.random.randint(100000, 10000000, size=len(dates))
-                    
-                    df = pd.DataFrame({
-                        'open': open_price,
-                        'high': high,
-                        'low': low,
-                        'close': close,
-                        'volume': volume
-                    }, index=dates)
-                    
-                    # 保存到缓存
-                    df.to_csv(cache_file)
-                    
-                    result[symbol] = df
-            except Exception as e:
-                print(f"获取 {symbol} 数据时出错: {str(e)}")
+        # 并发获取所有股票的数据
+        result, errors = self.bulk_fetcher.fetch_many(symbols, period, interval)
+        for symbol, error in errors.items():
+            print(f"获取 {symbol} 数据时出错: {error}")
         
         # 存储数据以供后续使用
         self.stock_data.update(result)
+        for symbol in result:
+            self._data_params[symbol] = (period, interval)
+            self._screening_latest.pop(symbol, None)
         
         return result
     
-    def calculate_technical_indicators(self, symbols: List[str] = None) -> Dict[str, Dict[str, np.ndarray]]:
-        """计算技术指标
+    def _data_key(self, symbol: str) -> Optional[str]:
+        """获取股票当前数据（按记录的周期和间隔）的版本标识，用作分析结果缓存的数据指纹
+
+        Args:
+            symbol: 股票代码
+
+        Returns:
+            版本标识，未获取过该股票时返回None
+        """
+        if symbol not in self._data_params:
+            return None
+        period, interval = self._data_params[symbol]
+        return self.data_store.data_key(symbol, interval, period)
+    
+    def _reload_stock_data(self, symbol: str, cache: bool = True) -> Optional[pd.DataFrame]:
+        """从行情数据存储读取股票数据
         
         Args:
-            symbols: 股票代码列表，如果为None则使用已加载的所有股票
+            symbol: 股票代码
+            cache: 是否把从磁盘读取的数据放入存储的注册表（批量扫描时为False）
             
         Returns:
-            技术指标字典，键为股票代码，值为包含各指标的字典
+            股票数据DataFrame，存储中不存在时返回None
+        """
+        period, interval = self._data_params.get(symbol, ('1y', '1d'))
+        df = self.data_store.load(symbol, interval, cache=cache)
+        if df is None:
+            return None
+        return self.data_store.slice_period(df, period)
+    
+    def _frames_for(self, symbols: List[str] = None, action: str = None) -> Dict[str, pd.DataFrame]:
+        """批量读取股票数据：内存中的数据直接使用，其余从存储流式读取，不放回注册表
+        
+        Args:
+            symbols: 股票代码列表，如果为None则使用已获取的所有股票
+            action: 缺少数据时提示跳过的操作，为None时不提示
+            
+        Returns:
+            股票数据字典
         """
         if symbols is None:
             symbols = list(self.stock_data.keys())
             
-        result = {}
+        frames = {}
+        for symbol in symbols:
+            df = self._reload_stock_data(symbol, cache=False) if symbol in self.stock_data else None
+            if df is None:
+                if action:
+                    print(f"未找到 {symbol} 的数据，跳过{action}")
+                continue
+            frames[symbol] = df
+        return frames
+    
+    def _indicators_for(self, symbols: List[str], names: List[str] = None,
+                        lookback: int = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """批量读取已计算过的技术指标：内存中的直接使用，已淘汰的一次性重新计算，不放回注册表
         
+        Args:
+            symbols: 股票代码列表（只返回计算过指标的股票）
+            names: 重新计算时需要的指标名称，为None时计算全部指标
+            lookback: 重新计算时需要的K线数
+            
+        Returns:
+            技术指标字典
+        """
+        result = {}
+        missing = []
         for symbol in symbols:
-            if symbol not in self.stock_data:
-                print(f"未找到 {symbol} 的数据，跳过计算技术指标")
+            if symbol not in self.technical_indicators:
                 continue
-                
-            df = self.stock_data[symbol]
+            indicators = self.technical_indicators.peek(symbol)
+            if indicators is None:
+                missing.append(symbol)
+            else:
+                result[symbol] = indicators
+        
+        frames = self._frames_for(missing)
+        if frames:
+            result.update(compute_indicators(frames, names, lookback).to_dict())
+        return result
+    
+    def _reload_technical_indicators(self, symbol: str) -> Optional[Dict[str, np.ndarray]]:
+        """重新计算被淘汰的技术指标
+        
+        Args:
+            symbol: 股票代码
             
-            # 计算移动平均线
-            ma5 = df['close'].rolling(window=5).mean().values
-            ma10 = df['close'].rolling(window=10).mean().values
-            ma20 = df['close'].rolling(window=20).mean().values
-            ma60 = df['close'].rolling(window=60).mean().values
-            
-            # 计算MACD
-            ema12 = df['close'].ewm(span=12, adjust=False).mean()
-            ema26 = df['close'].ewm(span=26, adjust=False).mean()
-            macd = ema12 - ema26
-            signal = macd.ewm(span=9, adjust=False).mean()
-            histogram = macd - signal
-            
-            # 计算RSI
-            delta = df['close'].diff()
-            gain = delta.where(delta > 0, 0)
-            loss = -delta.where(delta < 0, 0)
-            avg_gain = gain.rolling(window=14).mean()
-            avg_loss = loss.rolling(window=14).mean()
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-            
-            # 计算布林带
-            ma20 = df['close'].rolling(window=20).mean()
-            std20 = df['close'].rolling(window=20).std()
-            upper_band = ma20 + 2 * std20
-            lower_band = ma20 - 2 * std20
-            
-            # 计算成交量变化
-            volume_ma5 = df['volume'].rolling(window=5).mean()
-            volume_change = df['volume'] / volume_ma5
-            
-            # 存储计算结果
-            result[symbol] = {
-                'ma5': ma5,
-                'ma10': ma10,
-                'ma20': ma20,
-                'ma60': ma60,
-                'macd': macd.values,
-                'macd_signal': signal.values,
-                'macd_histogram': histogram.values,
-                'rsi': rsi.values,
-                'upper_band': upper_band.values,
-                'lower_band': lower_band.values,
-                'volume_change': volume_change.values
-            }
+        Returns:
+            技术指标字典，没有股票数据时返回None
+        """
+        return self.calculate_technical_indicators([symbol]).get(symbol)
+    
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """获取内存中数据的占用和淘汰统计
+        
+        Returns:
+            各注册表的统计信息
+        """
+        return {
+            'stock_data': self.stock_data.stats(),
+            'technical_indicators': self.technical_indicators.stats(),
+            'market_data': self.data_store.memory_stats(),
+            'result_cache': self.result_cache.stats()
+        }
+    
+    def calculate_technical_indicators(self, symbols: List[str] = None, names: List[str] = None,
+                                       lookback: int = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """计算技术指标
+        
+        Args:
+            symbols: 股票代码列表，如果为None则使用已加载的所有股票
+            names: 需要的指标名称列表，如果为None则计算全部指标
+            lookback: 需要的K线数（如1表示只需最新值），如果为None则计算完整历史
+            
+        Returns:
+            技术指标字典，键为股票代码，值为包含各指标的字典
+        """
+        frames = self._frames_for(symbols, '计算技术指标')
+        if not frames:
+            return {}
+        
+        # 对齐为面板后一次性计算所有股票的指标
+        result = compute_indicators(frames, names, lookback).to_dict()
             
         # 存储指标以供后续使用
         self.technical_indicators.update(result)
@@ -232,96 +256,199 @@ class StockRecommendationSystem:
         Returns:
             胜率字典，键为股票代码，值为胜率（0-1之间）
         """
-        if symbols is None:
-            symbols = list(self.stock_data.keys())
-            
-        result = {}
+        frames = self._frames_for(symbols, '计算胜率')
         
-        for symbol in symbols:
-            if symbol not in self.stock_data:
-                print(f"未找到 {symbol} 的数据，跳过计算胜率")
-                continue
-                
-            df = self.stock_data[symbol]
-            prices = df['close'].values
-            
-            total_samples = len(prices) - n_days
-            if total_samples <= 0:
-                result[symbol] = 0
-                continue
-            
-            win_count = 0
-            for i in range(total_samples):
-                start_price = prices[i]
-                end_prices = prices[i+1:i+n_days+1]
-                max_return = max([(p - start_price) / start_price for p in end_prices])
-                if max_return >= target_return:
-                    win_count += 1
-            
-            win_rate = win_count / total_samples
-            result[symbol] = win_rate
+        # 最近的胜率曲面对应当前数据且包含该参数组合时直接读取，否则全部股票对齐为面板后一次性计算
+        surface = self.win_rate_surface
+        if surface is not None and surface.covers(n_days, target_return) and \
+           self._win_rate_surface_fingerprint == self.result_cache.panel_fingerprint(frames):
+            result = surface.win_rates(n_days, target_return)
+        else:
+            result = compute_win_rates(frames, n_days, target_return)
             
         # 存储胜率以供后续使用
         self.win_rates.update(result)
         
         return result
     
-    def calculate_stock_similarity(self, symbols: List[str] = None) -> np.ndarray:
+    def calculate_win_rate_surface(self, symbols: List[str] = None, horizons: Tuple[int, ...] = DEFAULT_HORIZONS,
+                                   targets: Tuple[float, ...] = DEFAULT_TARGETS) -> WinRateSurface:
+        """计算持有天数和目标收益率网格上的胜率曲面
+        
+        结果按数据指纹缓存，数据不变时再次请求直接返回；之后调用calculate_win_rate时，
+        网格内的参数组合直接从曲面读取，调整参数后无需重新计算即可重新排序推荐。
+        
+        Args:
+            symbols: 股票代码列表，如果为None则使用已加载的所有股票
+            horizons: 持有天数网格
+            targets: 目标收益率网格
+            
+        Returns:
+            胜率曲面
+        """
+        frames = self._frames_for(symbols)
+        fingerprint = self.result_cache.panel_fingerprint(frames)
+        params = (tuple(horizons), tuple(targets))
+        surface = self.result_cache.get_or_compute('win_rate_surface', '*', fingerprint, params,
+                                                   lambda: compute_win_rate_surface(frames, horizons, targets))
+        
+        self.win_rate_surface = surface
+        self._win_rate_surface_fingerprint = fingerprint
+        return surface
+    
+    def backtest_recommendations(self, symbols: List[str] = None, top_n: int = 5, min_win_rate: float = 0.5,
+                                 n_days: int = 5, target_return: float = 0.03, **kwargs) -> BacktestResult:
+        """对推荐逻辑进行走步回测，检验历史上推荐的股票的实际表现
+        
+        Args:
+            symbols: 股票代码列表，如果为None则使用已加载的所有股票
+            top_n: 推荐的股票数量
+            min_win_rate: 最低胜率
+            n_days: 预测天数
+            target_return: 目标收益率
+            **kwargs: 传给walk_forward_backtest的其他参数（调仓间隔、训练窗口、交易成本等）
+            
+        Returns:
+            回测结果（净值、回撤、换手率等）
+        """
+        frames = self._frames_for(symbols)
+        return walk_forward_backtest(frames, top_n=top_n, min_win_rate=min_win_rate, n_days=n_days,
+                                     target_return=target_return, **kwargs)
+    
+    def calculate_return_correlation(self, symbols: List[str] = None, window: int = DEFAULT_WINDOW,
+                                     halflife: float = None, shrinkage=0.0) -> CorrelationEngine:
+        """构建股票日收益率的滚动相关性引擎（用于分散度检查、板块轮动等），可按日期查询相关系数矩阵
+        
+        Args:
+            symbols: 股票代码列表，如果为None则使用已加载的所有股票
+            window: 滚动窗口（交易日）
+            halflife: 指数加权的半衰期，为None时使用滚动窗口
+            shrinkage: 收缩强度(0-1)或'ledoit_wolf'
+            
+        Returns:
+            相关性引擎
+        """
+        frames = self._frames_for(symbols)
+        self.correlation_engine = CorrelationEngine(return_panel(frames), window=window, halflife=halflife,
+                                                    shrinkage=shrinkage)
+        return self.correlation_engine
+    
+    def calculate_stock_similarity(self, symbols: List[str] = None) -> SimilarityIndex:
         """计算股票之间的相似度
         
         Args:
             symbols: 股票代码列表，如果为None则使用已加载的所有股票
             
         Returns:
-            相似度矩阵
+            相似度索引（每只股票的前k个最相似股票）
         """
         if symbols is None:
             symbols = list(self.stock_data.keys())
             
-        # 提取每只股票的特征
+        # 提取每只股票的特征（已淘汰的指标一次性重新计算）
         features = []
         valid_symbols = []
+        indicators = self._indicators_for([symbol for symbol in symbols if symbol in self.stock_data],
+                                          self.SCREENING_INDICATORS, self.SCREENING_LOOKBACK)
         
         for symbol in symbols:
-            if symbol not in self.stock_data or symbol not in self.technical_indicators:
+            df = self._reload_stock_data(symbol, cache=False) if symbol in indicators else None
+            if df is None:
                 continue
                 
             # 提取价格走势特征
-            df = self.stock_data[symbol]
             returns = df['close'].pct_change().dropna().values
             
-            # 提取技术指标特征
-            indicators = self.technical_indicators[symbol]
-            
-            # 组合特征
-            feature_vector = np.concatenate([
-                returns[-20:],  # 最近20天的收益率
-                indicators['rsi'][-20:],  # 最近20天的RSI
-                indicators['macd'][-20:],  # 最近20天的MACD
-                indicators['volume_change'][-20:]  # 最近20天的成交量变化
-            ])
+            features.append(self._similarity_features(returns, indicators[symbol]))
+            valid_symbols.append(symbol)
             
-            # 处理缺失值
-            feature_vector = np.nan_to_num(feature_vector, nan=0)
+        return self._fit_similarity(features, valid_symbols)
+    
+    @staticmethod
+    def _similarity_features(returns: np.ndarray, indicators: Dict[str, np.ndarray]) -> np.ndarray:
+        """组合计算相似度使用的特征向量
+        
+        Args:
+            returns: 收益率序列
+            indicators: 技术指标字典
             
-            features.append(feature_vector)
-            valid_symbols.append(symbol)
+        Returns:
+            特征向量
+        """
+        feature_vector = np.concatenate([
+            returns[-20:],  # 最近20天的收益率
+            indicators['rsi'][-20:],  # 最近20天的RSI
+            indicators['macd'][-20:],  # 最近20天的MACD
+            indicators['volume_change'][-20:]  # 最近20天的成交量变化
+        ])
+        
+        # 处理缺失值
+        return np.nan_to_num(feature_vector, nan=0)
+    
+    def _fit_similarity(self, features: List[np.ndarray], valid_symbols: List[str]) -> SimilarityIndex:
+        """由特征向量构建、存储并持久化相似度索引
+        
+        Args:
+            features: 各股票的特征向量
+            valid_symbols: 与特征向量对应的股票代码
             
-        if not features:
-            return np.array([])
+        Returns:
+            相似度索引
+        """
+        self.similarity_index = SimilarityIndex().fit(np.array(features), valid_symbols)
+        self.valid_symbols = valid_symbols
+        self.similarity_index.save(self.SIMILARITY_INDEX_PATH)
+        
+        return self.similarity_index
+    
+    def update_stock_similarity(self, symbols: List[str]) -> SimilarityIndex:
+        """增量更新部分股票的相似度（如盘中刷新数据后）
+        
+        只重新计算这些股票的特征及受影响的近邻列表；索引不存在、增量更新过的股票过多或距上次
+        全量构建超过REBUILD_INTERVAL时全量重建。
+        
+        Args:
+            symbols: 数据发生变化的股票代码列表
             
-        # 标准化特征
-        scaler = StandardScaler()
-        scaled_features = scaler.fit_transform(features)
+        Returns:
+            相似度索引
+        """
+        if self.similarity_index is None:
+            self.similarity_index = SimilarityIndex.load(self.SIMILARITY_INDEX_PATH)
+        if self.similarity_index is None or self.similarity_index.needs_rebuild():
+            self.calculate_technical_indicators(names=self.SCREENING_INDICATORS, lookback=self.SCREENING_LOOKBACK)
+            return self.calculate_stock_similarity()
+            
+        symbols = [symbol for symbol in symbols if symbol in self.stock_data]
+        indicators = self.calculate_technical_indicators(symbols, names=self.SCREENING_INDICATORS,
+                                                         lookback=self.SCREENING_LOOKBACK)
+        features = {}
+        for symbol, df in self._frames_for(symbols).items():
+            returns = df['close'].pct_change().dropna().values
+            features[symbol] = self._similarity_features(returns, indicators[symbol])
         
-        # 计算余弦相似度
-        similarity_matrix = cosine_similarity(scaled_features)
+        self.similarity_index.update(features)
+        self.valid_symbols = self.similarity_index.symbols
+        self.similarity_index.save(self.SIMILARITY_INDEX_PATH)
         
-        # 存储相似度矩阵和有效股票列表
-        self.similarity_matrix = similarity_matrix
-        self.valid_symbols = valid_symbols
+        return self.similarity_index
+    
+    def similar_to(self, symbol: str, k: int = 3) -> List[Tuple[str, float]]:
+        """查询与指定股票最相似的股票
         
-        return similarity_matrix
+        Args:
+            symbol: 股票代码
+            k: 返回的股票数量
+            
+        Returns:
+            (股票代码, 余弦相似度)列表，按相似度降序
+        """
+        if self.similarity_index is None:
+            # 使用上次持久化的索引
+            self.similarity_index = SimilarityIndex.load(self.SIMILARITY_INDEX_PATH)
+            if self.similarity_index is None:
+                return []
+        return self.similarity_index.similar_to(symbol, k)
     
     def recommend_stocks(self, top_n: int = 5, min_win_rate: float = 0.5) -> List[Dict[str, Any]]:
         """推荐股票
@@ -360,43 +487,13 @@ class StockRecommendationSystem:
             
             # 获取最新价格和技术指标
             latest_price = df['close'].iloc[-1]
-            latest_ma5 = indicators['ma5'][-1]
-            latest_ma20 = indicators['ma20'][-1]
-            latest_rsi = indicators['rsi'][-1]
-            latest_macd = indicators['macd'][-1]
-            latest_signal = indicators['macd_signal'][-1]
-            
-            # 生成技术信号
-            signals = []
-            
-            # MA信号
-            if latest_ma5 > latest_ma20:
-                signals.append("MA5上穿MA20，短期趋势向上")
-            elif latest_ma5 < latest_ma20:
-                signals.append("MA5下穿MA20，短期趋势向下")
-                
-            # RSI信号
-            if latest_rsi < 30:
-                signals.append("RSI低于30，可能超卖")
-            elif latest_rsi > 70:
-                signals.append("RSI高于70，可能超买")
-                
-            # MACD信号
-            if latest_macd > latest_signal:
-                signals.append("MACD金叉，买入信号")
-            elif latest_macd < latest_signal:
-                signals.append("MACD死叉，卖出信号")
+            
+            # 生成技术信号（MA、RSI、MACD）
+            signals = decode_signals(signal_flags(indicators['ma5'][-1], indicators['ma20'][-1], indicators['rsi'][-1],
+                                                  indicators['macd'][-1], indicators['macd_signal'][-1]))
                 
             # 查找相似股票
-            similar_stocks = []
-            if hasattr(self, 'similarity_matrix') and self.similarity_matrix is not None and hasattr(self, 'valid_symbols'):
-                try:
-                    idx = self.valid_symbols.index(symbol)
-                    similarities = self.similarity_matrix[idx]
-                    similar_indices = similarities.argsort()[-4:-1][::-1]  # 排除自身，取前3个最相似的
-                    similar_stocks = [self.valid_symbols[i] for i in similar_indices]
-                except (ValueError, IndexError):
-                    pass
+            similar_stocks = [similar for similar, _ in self.similar_to(symbol, 3)]
             
             # 创建推荐信息
             recommendation = {
@@ -415,6 +512,145 @@ class StockRecommendationSystem:
             
         return recommendations
     
+    def publish_recommendation_snapshot(self, n_days: int = 5, target_return: float = 0.03,
+                                        n_similar: int = 3, industries: Dict[str, str] = None) -> Optional[str]:
+        """将全部已计算胜率的股票按胜率排名，连同最新价格、技术信号和相似股票发布为不可变的推荐快照
+        
+        快照同时是选股器的列式表：附加市场、行业、成交量、上涨空间（距最近SCREENING_LOOKBACK根K线
+        最高收盘价的涨幅）和最新技术指标列。
+        
+        Args:
+            n_days: 胜率使用的预测天数（记录在快照元信息中）
+            target_return: 胜率使用的目标收益率（记录在快照元信息中）
+            n_similar: 每只股票保存的相似股票数量
+            industries: 股票代码到所属行业的字典，为None时从INDUSTRY_MAP_PATH读取（不存在时行业为“未知”）
+            
+        Returns:
+            快照版本号，没有可发布的股票时返回None
+        """
+        symbols = [symbol for symbol in sorted(self.win_rates, key=self.win_rates.get, reverse=True)
+                   if symbol in self.technical_indicators]
+        if not symbols:
+            print("未计算胜率，无法发布推荐快照")
+            return None
+        
+        if industries is None:
+            industries = self._load_industry_map()
+        
+        n = len(symbols)
+        latest = {name: np.full(n, np.nan) for name in self.SCREENING_INDICATORS}
+        prices = np.full((n, 2), np.nan)
+        highs = np.full(n, np.nan)
+        volumes = np.full(n, np.nan)
+        neighbors = np.full((n, n_similar), '', dtype=object)
+        all_indicators = self._indicators_for(symbols, self.SCREENING_INDICATORS, 1)
+        for i, symbol in enumerate(symbols):
+            indicators = all_indicators[symbol]
+            for name, values in latest.items():
+                if name in indicators:
+                    values[i] = indicators[name][-1]
+            if symbol in self._screening_latest:
+                closes, volumes[i] = self._screening_latest[symbol]
+            else:
+                df = self._reload_stock_data(symbol, cache=False)
+                closes, volumes[i] = df['close'].values[-(self.SCREENING_LOOKBACK + 1):], df['volume'].iloc[-1]
+            prices[i, 2 - min(len(closes), 2):] = closes[-2:]
+            highs[i] = np.max(closes)
+            for j, (similar, _) in enumerate(self.similar_to(symbol, n_similar)):
+                neighbors[i, j] = similar
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            change_percent = (prices[:, 1] / prices[:, 0] - 1) * 100
+            potential_upside = (highs / prices[:, 1] - 1) * 100
+        market, market_categories = encode_category([market_of(symbol) for symbol in symbols], MARKETS)
+        industry_names = [industries.get(symbol, UNKNOWN_INDUSTRY) for symbol in symbols]
+        industry, industry_categories = encode_category(industry_names, sorted(set(industry_names) | {UNKNOWN_INDUSTRY}))
+        table = {
+            'symbols': np.array(symbols, dtype=str),
+            'win_rate': np.array([self.win_rates[symbol] for symbol in symbols], dtype=np.float64),
+            'latest_price': prices[:, 1],
+            'change_percent': np.nan_to_num(change_percent),
+            'signals': signal_flags(latest['ma5'], latest['ma20'], latest['rsi'], latest['macd'], latest['macd_signal']),
+            'neighbors': neighbors.astype(str),
+            'market': market,
+            'industry': industry,
+            'volume': volumes,
+            'potential_upside': np.nan_to_num(potential_upside),
+            **latest
+        }
+        version = publish_snapshot(table, {'n_days': n_days, 'target_return': target_return}, self.SNAPSHOT_DIR,
+                                   categories={'market': market_categories, 'industry': industry_categories})
+        print(f"推荐快照已发布: {version}（{n} 只股票）")
+        return version
+    
+    def _load_industry_map(self) -> Dict[str, str]:
+        """读取股票代码到所属行业的映射文件
+        
+        Returns:
+            行业字典，文件不存在时返回空字典
+        """
+        if not os.path.exists(self.INDUSTRY_MAP_PATH):
+            return {}
+        with open(self.INDUSTRY_MAP_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def latest_snapshot(self) -> Optional[RecommendationSnapshot]:
+        """获取最新发布的推荐快照（版本未变化时复用已打开的快照）
+        
+        Returns:
+            推荐快照，尚未发布时返回None
+        """
+        return load_latest(self.SNAPSHOT_DIR)
+    
+    def screen_stocks(self, market: str = None, industry: str = None, min_win_rate: float = 0.0,
+                      min_price: float = None, max_price: float = None, sort_by: str = '胜率',
+                      top_n: int = 20, win_rates: Dict[str, float] = None) -> List[Dict[str, Any]]:
+        """在最新的推荐快照上筛选、排序股票（不重新计算胜率和指标）
+        
+        Args:
+            market: 市场（A股/港股/美股），为None时不限
+            industry: 行业，为None时不限
+            min_win_rate: 最小胜率（0-1）
+            min_price: 最低价格
+            max_price: 最高价格
+            sort_by: 排序方式（胜率/上涨空间/最新价格/成交量）
+            top_n: 返回的股票数量
+            win_rates: 按其他持有天数和目标收益率计算的胜率（如从胜率曲面读取），为None时使用快照中的胜率；
+                给出时胜率筛选、排序和返回结果都使用该胜率，不在其中的股票胜率视为未知
+            
+        Returns:
+            推荐股票列表，尚未发布快照时返回空列表
+        """
+        snapshot = self.latest_snapshot()
+        if snapshot is None:
+            return []
+        
+        screener = self._screeners.get(snapshot.version)
+        if screener is None:
+            self._screeners = {snapshot.version: StockScreener.from_snapshot(snapshot)}
+            screener = self._screeners[snapshot.version]
+        
+        win_rate = None
+        if win_rates is not None:
+            win_rate = np.array([win_rates.get(str(symbol), np.nan) for symbol in snapshot.columns['symbols']],
+                                dtype=np.float64)
+            screener = screener.with_columns({'win_rate': win_rate})
+        
+        predicates = [
+            ('market', '==', market),
+            ('industry', '==', industry),
+            ('win_rate', '>=', min_win_rate),
+            ('latest_price', '>=', min_price),
+            ('latest_price', '<=', max_price)
+        ]
+        sort_by = [(self.SORT_COLUMNS[sort_by], False)] + ([('win_rate', False)] if sort_by != '胜率' else [])
+        rows = screener.screen(predicates, sort_by, top_n)
+        records = snapshot.records(rows)
+        if win_rate is not None:
+            for row, record in zip(rows, records):
+                record['win_rate'] = float(win_rate[row])
+        return records
+    
     def _save_recommendations(self, recommendations: List[Dict[str, Any]]) -> None:
         """保存推荐结果
         
@@ -464,6 +700,9 @@ class StockRecommendationSystem:
         
         if with_indicators and symbol in self.technical_indicators:
             indicators = self.technical_indicators[symbol]
+            # 筛选时只计算了部分指标和最近的K线，绘图需要完整的指标序列
+            if 'upper_band' not in indicators or len(indicators['ma5']) != len(df):
+                indicators = self.calculate_technical_indicators([symbol])[symbol]
             
             # 绘制移动平均线
             axes[0].plot(df.index, indicators['ma5'], label='MA5', alpha=0.7)
@@ -500,8 +739,55 @@ class StockRecommendationSystem:
         
         return chart_file
     
+    def run_parallel_screening(self, symbols: List[str] = None, n_days: int = 5, target_return: float = 0.03,
+                               processes: int = None, period: str = '1y', interval: str = '1d') -> Dict[str, float]:
+        """在进程池中分片获取数据、计算技术指标和胜率，在本进程中计算相似度
+        
+        工作进程把数据写入共享的行情数据存储，结果经共享内存返回；股票数据只登记为可按需加载，
+        生成推荐和绘图时再从存储读取。
+        
+        Args:
+            symbols: 股票代码列表，如果为None则使用默认列表
+            n_days: 预测天数
+            target_return: 目标收益率
+            processes: 进程数，为None时使用全部CPU核心
+            period: 数据周期
+            interval: 数据间隔
+            
+        Returns:
+            胜率字典
+        """
+        if symbols is None:
+            symbols = self.default_stocks
+            
+        result = run_sharded_screening(symbols, self.SCREENING_INDICATORS, self.SCREENING_LOOKBACK, n_days,
+                                       target_return, period, interval, processes,
+                                       root_dir=self.data_store.root_dir,
+                                       api_client_factory=client_factory(self.api_client))
+        for symbol, error in result['errors'].items():
+            print(f"获取 {symbol} 数据时出错: {error}")
+        
+        fetched = result['symbols']
+        for symbol in fetched:
+            self._data_params[symbol] = (period, interval)
+        self.stock_data.mark_loadable(fetched)
+        self.technical_indicators.update(result['indicators'])
+        self.win_rates.update(result['win_rates'])
+        self._screening_latest.update((symbol, (result['closes'][symbol], result['volumes'][symbol]))
+                                      for symbol in fetched)
+        
+        # 相似度使用各股票最近的收盘价和指标，在本进程中一次计算
+        features = []
+        for symbol in fetched:
+            closes = result['closes'][symbol]
+            features.append(self._similarity_features(closes[1:] / closes[:-1] - 1, result['indicators'][symbol]))
+        self._fit_similarity(features, fetched)
+        
+        return result['win_rates']
+    
     def run_recommendation_pipeline(self, symbols: List[str] = None, top_n: int = 5, 
-                                   n_days: int = 5, target_return: float = 0.03) -> Tuple[List[Dict[str, Any]], List[str]]:
+                                   n_days: int = 5, target_return: float = 0.03,
+                                   processes: int = 1) -> Tuple[List[Dict[str, Any]], List[str]]:
         """运行完整的推荐流程
         
         Args:
@@ -509,26 +795,34 @@ class StockRecommendationSystem:
             top_n: 推荐的股票数量
             n_days: 预测天数
             target_return: 目标收益率
+            processes: 进程数，大于1时在进程池中分片执行步骤1-4，为None时使用全部CPU核心
             
         Returns:
             推荐股票列表和生成的图表文件路径列表
         """
-        # 1. 获取股票数据
-        self.fetch_stock_data(symbols)
-        
-        # 2. 计算技术指标
-        self.calculate_technical_indicators()
-        
-        # 3. 计算胜率
-        self.calculate_win_rate(n_days=n_days, target_return=target_return)
-        
-        # 4. 计算股票相似度
-        self.calculate_stock_similarity()
+        if processes is None or processes > 1:
+            # 1-4. 分片并行获取数据、计算技术指标和胜率，汇总后计算相似度
+            self.run_parallel_screening(symbols, n_days, target_return, processes)
+        else:
+            # 1. 获取股票数据
+            self.fetch_stock_data(symbols)
+            
+            # 2. 计算技术指标（只计算筛选需要的指标和最近的K线，绘图时再按需计算完整指标）
+            self.calculate_technical_indicators(names=self.SCREENING_INDICATORS, lookback=self.SCREENING_LOOKBACK)
+            
+            # 3. 计算胜率
+            self.calculate_win_rate(n_days=n_days, target_return=target_return)
+            
+            # 4. 计算股票相似度
+            self.calculate_stock_similarity()
         
         # 5. 生成推荐
         recommendations = self.recommend_stocks(top_n=top_n)
         
-        # 6. 绘制推荐股票的图表
+        # 6. 发布推荐快照供UI和API读取
+        self.publish_recommendation_snapshot(n_days, target_return)
+        
+        # 7. 绘制推荐股票的图表
         chart_files = []
         for rec in recommendations:
             chart_file = self.plot_stock_chart(rec['symbol'])
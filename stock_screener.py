@@ -0,0 +1,279 @@
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Tuple, Any, Optional, Union
+from trading_calendar import exchange_for_symbol
+
+# 交易所对应的市场名称（推荐页面的市场筛选）
+MARKET_NAMES = {'SSE': 'A股', 'HKEX': '港股', 'NYSE': '美股'}
+MARKETS = ['A股', '港股', '美股']
+
+# 没有行业信息的股票归入的行业
+UNKNOWN_INDUSTRY = '未知'
+
+# 支持的比较运算
+_OPERATORS = {
+    '==': np.equal, '!=': np.not_equal,
+    '<': np.less, '<=': np.less_equal,
+    '>': np.greater, '>=': np.greater_equal
+}
+
+
+def market_of(symbol: str) -> str:
+    """根据股票代码判断所属市场（A股/港股/美股）
+
+    Args:
+        symbol: 股票代码
+
+    Returns:
+        市场名称
+    """
+    return MARKET_NAMES[exchange_for_symbol(symbol)]
+
+
+def encode_category(values: List[str], categories: List[str] = None) -> Tuple[np.ndarray, List[str]]:
+    """将字符串列编码为整数代码（分类列）
+
+    Args:
+        values: 字符串列表
+        categories: 固定的类别列表，为None时使用出现过的值（排序后）
+
+    Returns:
+        (int16代码数组, 类别列表)
+    """
+    if categories is None:
+        categories = sorted(set(values))
+    lookup = {category: code for code, category in enumerate(categories)}
+    return np.array([lookup[value] for value in values], dtype=np.int16), list(categories)
+
+
+class StockScreener:
+    """列式表上的向量化选股器
+
+    筛选条件下推到列上执行：分类列（市场、行业）的等值条件通过预先建立的“类别→行号”索引直接得到候选行，
+    其余条件只在候选行上取出对应列比较，逐个条件缩小候选集；未被引用的列不会被读取（内存映射的列不产生I/O）。
+    多列排序和前k选择在候选行上向量化完成：先按第一排序键用argpartition选出可能进入前k的行，再对其多列排序。
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], categories: Dict[str, List[str]] = None):
+        """初始化选股器
+
+        Args:
+            columns: 列名到等长数组的字典（可以是内存映射数组）
+            categories: 分类列的列名到类别列表的字典，分类列中保存的是类别代码
+        """
+        self.columns = columns
+        self.categories = categories or {}
+        self.size = len(next(iter(columns.values()))) if columns else 0
+        self._category_index = {}
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> 'StockScreener':
+        """由推荐快照构建选股器（直接使用快照的内存映射列）
+
+        Args:
+            snapshot: RecommendationSnapshot
+
+        Returns:
+            选股器
+        """
+        return cls(snapshot.columns, snapshot.meta.get('categories', {}))
+
+    def with_columns(self, columns: Dict[str, np.ndarray]) -> 'StockScreener':
+        """替换或追加部分列，返回新的选股器（未替换的分类列共享已建立的类别索引）
+
+        Args:
+            columns: 列名到等长数组的字典（如按当前参数重新计算的胜率）
+
+        Returns:
+            选股器
+        """
+        screener = StockScreener({**self.columns, **columns}, self.categories)
+        screener._category_index = {name: index for name, index in self._category_index.items()
+                                    if name not in columns}
+        return screener
+
+    def _rows_for_category(self, column: str, codes: List[int]) -> np.ndarray:
+        """通过类别索引获取分类列取指定代码的行号（升序）"""
+        index = self._category_index.get(column)
+        if index is None:
+            values = np.asarray(self.columns[column])
+            order = np.argsort(values, kind='stable')
+            bounds = np.searchsorted(values[order], np.arange(len(self.categories[column]) + 1))
+            index = self._category_index[column] = (order, bounds)
+        order, bounds = index
+        parts = [order[bounds[code]:bounds[code + 1]] for code in codes if 0 <= code < len(bounds) - 1]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+    def _codes(self, column: str, value) -> List[int]:
+        """将分类列的类别名称转换为代码（未知类别被忽略）"""
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        lookup = {category: code for code, category in enumerate(self.categories[column])}
+        return [lookup[v] for v in values if v in lookup]
+
+    def filter(self, predicates: List[Tuple[str, str, Any]] = None) -> np.ndarray:
+        """按条件筛选
+
+        Args:
+            predicates: 条件列表，每个条件为(列名, 运算, 值)，运算为'=='、'!='、'<'、'<='、'>'、'>='、
+                'in'（值为列表）或'between'（值为(下限, 上限)，含边界）；分类列的值使用类别名称，
+                值为None的条件被忽略
+
+        Returns:
+            满足全部条件的行号（升序）
+        """
+        predicates = [p for p in (predicates or []) if p[2] is not None]
+        for column, op, _ in predicates:
+            if column not in self.columns:
+                raise KeyError(f"未知的列: {column}")
+            if op not in _OPERATORS and op not in ('in', 'between'):
+                raise ValueError(f"不支持的运算: {op}")
+
+        # 分类列的等值条件先通过类别索引得到候选行
+        rows = None
+        remaining = []
+        for column, op, value in predicates:
+            if column in self.categories and op in ('==', 'in'):
+                candidates = self._rows_for_category(column, self._codes(column, value))
+                rows = candidates if rows is None else np.intersect1d(rows, candidates, assume_unique=True)
+            else:
+                remaining.append((column, op, value))
+        if rows is None:
+            rows = np.arange(self.size)
+
+        # 其余条件只在候选行上比较
+        for column, op, value in remaining:
+            if len(rows) == 0:
+                break
+            values = np.asarray(self.columns[column])[rows]
+            if column in self.categories:
+                codes = self._codes(column, value)
+                value = codes if op == 'in' else (codes[0] if codes else -1)
+            if op == 'in':
+                mask = np.isin(values, list(value))
+            elif op == 'between':
+                low, high = value
+                mask = (values >= low) & (values <= high)
+            else:
+                mask = _OPERATORS[op](values, value)
+            rows = rows[mask]
+        return rows
+
+    def _sort_key(self, rows: np.ndarray, column: str, ascending: bool) -> np.ndarray:
+        """排序键：统一为升序比较，NaN排在最后"""
+        values = np.asarray(self.columns[column])[rows].astype(np.float64)
+        if not ascending:
+            values = -values
+        values[np.isnan(values)] = np.inf
+        return values
+
+    def sort(self, rows: np.ndarray, sort_by: List[Tuple[str, bool]], top_k: int = None) -> np.ndarray:
+        """多列排序并选出前k行
+
+        Args:
+            rows: 候选行号
+            sort_by: 排序键列表，每个为(列名, 是否升序)，前面的键优先；相同时按行号（即原表顺序）
+            top_k: 保留的行数，为None时保留全部
+
+        Returns:
+            排序后的行号
+        """
+        if not sort_by or len(rows) == 0:
+            return rows[:top_k] if top_k is not None else rows
+
+        primary = self._sort_key(rows, *sort_by[0])
+        if top_k is not None and top_k < len(rows):
+            # 只保留第一排序键不劣于第k名的行（含并列），再对这些行做完整的多列排序
+            kth = np.partition(primary, top_k - 1)[top_k - 1]
+            candidates = np.flatnonzero(primary <= kth)
+            rows, primary = rows[candidates], primary[candidates]
+
+        # lexsort以最后一个键为主键
+        keys = [rows] + [self._sort_key(rows, column, ascending) for column, ascending in reversed(sort_by[1:])]
+        order = np.lexsort(keys + [primary])
+        rows = rows[order]
+        return rows[:top_k] if top_k is not None else rows
+
+    def screen(self, predicates: List[Tuple[str, str, Any]] = None, sort_by: List[Tuple[str, bool]] = None,
+               top_k: int = None) -> np.ndarray:
+        """筛选、排序并选出前k行
+
+        Args:
+            predicates: 条件列表，见filter
+            sort_by: 排序键列表，见sort
+            top_k: 保留的行数
+
+        Returns:
+            行号
+        """
+        return self.sort(self.filter(predicates), sort_by or [], top_k)
+
+    def to_frame(self, rows: np.ndarray, columns: List[str] = None) -> pd.DataFrame:
+        """取出指定行的数据，分类列转换为类别名称
+
+        Args:
+            rows: 行号
+            columns: 列名列表，为None时使用全部列
+
+        Returns:
+            DataFrame
+        """
+        data = {}
+        for column in columns or list(self.columns):
+            values = np.asarray(self.columns[column])[rows]
+            if column in self.categories:
+                values = np.asarray(self.categories[column], dtype=object)[values]
+            data[column] = values
+        return pd.DataFrame(data)
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    n = 20000
+    industries = ["科技", "金融", "医药", "消费", "能源", "工业", "原材料"]
+    market, market_categories = encode_category(rng.choice(MARKETS, n).tolist(), MARKETS)
+    industry, industry_categories = encode_category(rng.choice(industries, n).tolist())
+    columns = {
+        'win_rate': rng.random(n),
+        'latest_price': rng.uniform(1, 500, n),
+        'change_percent': rng.normal(0, 2, n),
+        'volume': rng.integers(1000, 10 ** 8, n).astype(np.float64),
+        'potential_upside': rng.uniform(0, 30, n),
+        'rsi': rng.uniform(0, 100, n),
+        'market': market,
+        'industry': industry
+    }
+    screener = StockScreener(columns, {'market': market_categories, 'industry': industry_categories})
+    frame = screener.to_frame(np.arange(n))
+
+    cases = [
+        ([('market', '==', 'A股'), ('industry', '==', '科技'), ('win_rate', '>=', 0.6)],
+         [('win_rate', False), ('volume', False)]),
+        ([('market', 'in', ['港股', '美股']), ('latest_price', 'between', (10, 100))],
+         [('potential_upside', False), ('latest_price', True)]),
+        ([('rsi', '<', 30), ('industry', '!=', '金融')], [('volume', False)]),
+        ([], [('latest_price', True)])
+    ]
+    for predicates, sort_by in cases:
+        start = time.time()
+        for _ in range(100):
+            rows = screener.screen(predicates, sort_by, top_k=20)
+        elapsed = (time.time() - start) * 10
+
+        # 与pandas直接筛选排序的结果对比
+        mask = np.ones(n, dtype=bool)
+        for column, op, value in predicates:
+            if op == 'in':
+                mask &= frame[column].isin(value)
+            elif op == 'between':
+                mask &= frame[column].between(*value)
+            else:
+                mask &= _OPERATORS[op](frame[column], value)
+        expected = frame[mask].sort_values([c for c, _ in sort_by], ascending=[a for _, a in sort_by],
+                                           kind='stable').index[:20]
+        assert list(rows) == list(expected), predicates
+        print(f"{predicates} 排序 {sort_by}: {elapsed:.3f}毫秒")
+    print(f"{n} 只股票的筛选结果与pandas一致")
@@ -0,0 +1,433 @@
+import math
+import threading
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Tuple, Any, Optional
+from indicator_engine import ewm_mean
+
+# 指标状态快照在分区目录中的文件名
+STATE_SIDECAR = 'indicator_state'
+
+# 快照格式版本，状态结构变化时递增
+STATE_VERSION = 2
+
+
+class RollingWindow:
+    """固定长度的滚动窗口，以环形缓冲区维护窗口内的和与平方和
+
+    每次推入新值为O(1)；缓冲区每写满一轮按窗口内的值重新求和，避免浮点误差累积。
+    平方和相对基准值计算，降低方差计算中大数相减的精度损失。
+    """
+
+    def __init__(self, window: int, reference: float = 0.0):
+        """初始化滚动窗口
+
+        Args:
+            window: 窗口长度
+            reference: 计算平方和时的基准值
+        """
+        self.window = window
+        self.reference = reference
+        self.buffer = [0.0] * window
+        self.position = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def peek(self, value: float) -> Tuple[float, float, int]:
+        """计算推入value后的窗口和、平方和与有效个数，不修改状态
+
+        Args:
+            value: 新值
+
+        Returns:
+            (和, 相对基准值的平方和, 窗口内的值个数)
+        """
+        leaving = self.buffer[self.position] if self.count >= self.window else None
+        total = self.total + value
+        centered = value - self.reference
+        total_sq = self.total_sq + centered * centered
+        count = self.count + 1
+        if leaving is not None:
+            total -= leaving
+            total_sq -= (leaving - self.reference) ** 2
+            count -= 1
+        return total, total_sq, count
+
+    def push(self, value: float) -> None:
+        """推入新值
+
+        Args:
+            value: 新值
+        """
+        self.total, self.total_sq, self.count = self.peek(value)
+        self.buffer[self.position] = value
+        self.position = (self.position + 1) % self.window
+
+        if self.position == 0:
+            values = self.buffer[:self.count]
+            self.total = math.fsum(values)
+            self.total_sq = math.fsum((v - self.reference) ** 2 for v in values)
+
+    def mean(self, total: float, count: int) -> float:
+        """由peek的结果计算均值，窗口未填满时为NaN"""
+        return total / self.window if count >= self.window else math.nan
+
+    def std(self, total: float, total_sq: float, count: int) -> float:
+        """由peek的结果计算样本标准差（ddof=1），窗口未填满时为NaN"""
+        if count < self.window:
+            return math.nan
+        centered_total = total - self.reference * self.window
+        variance = (total_sq - centered_total * centered_total / self.window) / (self.window - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def state_dict(self) -> Dict[str, Any]:
+        """导出状态"""
+        return {
+            'window': self.window, 'reference': self.reference, 'buffer': list(self.buffer),
+            'position': self.position, 'count': self.count, 'total': self.total, 'total_sq': self.total_sq
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'RollingWindow':
+        """由导出的状态恢复"""
+        rolling = cls(state['window'], state['reference'])
+        rolling.buffer = [float(v) for v in state['buffer']]
+        rolling.position = state['position']
+        rolling.count = state['count']
+        rolling.total = state['total']
+        rolling.total_sq = state['total_sq']
+        return rolling
+
+
+class StreamingIndicators:
+    """单只股票的增量技术指标
+
+    维护均线和布林带的滚动窗口和/平方和、MACD的EMA值以及RSI的涨跌滚动和，
+    每根新K线以O(1)更新，结果与indicator_engine对完整历史的计算一致。
+    盘中K线尚未完结时用preview()按当前价格计算指标而不修改状态，K线完结后再调用update()。
+    """
+
+    MA_WINDOWS = (5, 10, 20, 60)
+    MACD_SPANS = (12, 26, 9)
+    RSI_WINDOW = 14
+    BAND_WINDOW = 20
+    VOLUME_WINDOW = 5
+
+    def __init__(self, reference: float = 0.0):
+        """初始化空状态
+
+        Args:
+            reference: 价格基准值（通常为首个收盘价），用于布林带方差计算
+        """
+        self.ma = {window: RollingWindow(window, reference) for window in self.MA_WINDOWS}
+        self.gains = RollingWindow(self.RSI_WINDOW)
+        self.losses = RollingWindow(self.RSI_WINDOW)
+        self.volumes = RollingWindow(self.VOLUME_WINDOW)
+        self.ema_fast = None
+        self.ema_slow = None
+        self.ema_signal = None
+        self.prev_close = None
+        self.last_bar = None  # 最后一根已完结K线的时间（纳秒）
+        self.data_version = None  # 状态对应的行情数据分区版本
+        self.bars = 0
+        self.values = {}  # 最后一根已完结K线的指标值
+
+    def preview(self, close: float, volume: float) -> Dict[str, float]:
+        """按一根新K线计算最新指标值，不修改状态
+
+        Args:
+            close: 收盘价（盘中为最新价）
+            volume: 成交量
+
+        Returns:
+            指标名称到最新值的字典
+        """
+        return self._step(close, volume)[0]
+
+    def update(self, close: float, volume: float, timestamp: pd.Timestamp = None) -> Dict[str, float]:
+        """推入一根已完结的K线并返回最新指标值
+
+        Args:
+            close: 收盘价
+            volume: 成交量
+            timestamp: K线时间
+
+        Returns:
+            指标名称到最新值的字典
+        """
+        values, state = self._step(close, volume)
+        for window in self.MA_WINDOWS:
+            self.ma[window].push(close)
+        self.gains.push(state['gain'])
+        self.losses.push(state['loss'])
+        self.volumes.push(volume)
+        self.ema_fast, self.ema_slow, self.ema_signal = state['ema_fast'], state['ema_slow'], state['ema_signal']
+        self.prev_close = close
+        self.bars += 1
+        self.values = values
+        if timestamp is not None:
+            self.last_bar = pd.Timestamp(timestamp).value
+        return values
+
+    def _step(self, close: float, volume: float) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """计算推入一根K线后的指标值和新的递推状态"""
+        values = {}
+        for window in self.MA_WINDOWS:
+            total, _, count = self.ma[window].peek(close)
+            values[f'ma{window}'] = self.ma[window].mean(total, count)
+
+        # MACD：首根K线的EMA即为收盘价
+        fast_span, slow_span, signal_span = self.MACD_SPANS
+        ema_fast = close if self.ema_fast is None else _ema_step(self.ema_fast, close, fast_span)
+        ema_slow = close if self.ema_slow is None else _ema_step(self.ema_slow, close, slow_span)
+        macd = ema_fast - ema_slow
+        ema_signal = macd if self.ema_signal is None else _ema_step(self.ema_signal, macd, signal_span)
+        values['macd'] = macd
+        values['macd_signal'] = ema_signal
+        values['macd_histogram'] = macd - ema_signal
+
+        # RSI：首根K线的涨跌记为0
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        gain_total, _, count = self.gains.peek(gain)
+        loss_total, _, _ = self.losses.peek(loss)
+        if count < self.RSI_WINDOW or (gain_total == 0 and loss_total == 0):
+            values['rsi'] = math.nan
+        elif loss_total == 0:
+            values['rsi'] = 100.0
+        else:
+            values['rsi'] = 100 - 100 / (1 + gain_total / loss_total)
+
+        # 布林带
+        band = self.ma[self.BAND_WINDOW]
+        total, total_sq, count = band.peek(close)
+        mid, std = band.mean(total, count), band.std(total, total_sq, count)
+        values['upper_band'] = mid + 2 * std
+        values['lower_band'] = mid - 2 * std
+
+        # 成交量变化
+        volume_total, _, count = self.volumes.peek(volume)
+        volume_mean = self.volumes.mean(volume_total, count)
+        if volume_mean:
+            values['volume_change'] = volume / volume_mean
+        else:
+            values['volume_change'] = math.inf if volume_mean == 0 and volume > 0 else math.nan
+
+        state = {'ema_fast': ema_fast, 'ema_slow': ema_slow, 'ema_signal': ema_signal, 'gain': gain, 'loss': loss}
+        return values, state
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame) -> 'StreamingIndicators':
+        """由历史K线初始化状态
+
+        EMA由向量化的ewm一次求出最终值，滚动窗口只需推入最后一个窗口长度的数据，
+        初始化耗时与历史长度基本无关。
+
+        Args:
+            df: 以DatetimeIndex为索引的OHLCV数据
+
+        Returns:
+            增量指标对象
+        """
+        close = df['close'].to_numpy(dtype=np.float64)
+        volume = df['volume'].to_numpy(dtype=np.float64)
+        indicators = cls(reference=float(close[0]) if len(close) else 0.0)
+        if not len(close):
+            return indicators
+
+        # 除最后一根K线外的EMA终值，最后一根K线通过update推入
+        fast_span, slow_span, signal_span = cls.MACD_SPANS
+        history = close[None, :-1]
+        if history.shape[1]:
+            ema_fast = ewm_mean(history, fast_span)
+            ema_slow = ewm_mean(history, slow_span)
+            indicators.ema_fast = float(ema_fast[0, -1])
+            indicators.ema_slow = float(ema_slow[0, -1])
+            indicators.ema_signal = float(ewm_mean(ema_fast - ema_slow, signal_span)[0, -1])
+            indicators.prev_close = float(close[-2])
+
+        # 滚动窗口只需要最后window个值（RSI需要最后window个涨跌）
+        deltas = np.diff(close, prepend=close[0])
+        tail = len(close) - 1
+        for window in cls.MA_WINDOWS:
+            for value in close[max(0, tail - window + 1):tail]:
+                indicators.ma[window].push(float(value))
+        for value in deltas[max(0, tail - cls.RSI_WINDOW + 1):tail]:
+            indicators.gains.push(max(float(value), 0.0))
+            indicators.losses.push(max(-float(value), 0.0))
+        for value in volume[max(0, tail - cls.VOLUME_WINDOW + 1):tail]:
+            indicators.volumes.push(float(value))
+        indicators.bars = tail
+
+        indicators.update(float(close[-1]), float(volume[-1]), df.index[-1])
+        return indicators
+
+    def state_dict(self) -> Dict[str, Any]:
+        """导出可JSON序列化的状态快照
+
+        Returns:
+            状态字典
+        """
+        return {
+            'version': STATE_VERSION,
+            'ma': {str(window): rolling.state_dict() for window, rolling in self.ma.items()},
+            'gains': self.gains.state_dict(),
+            'losses': self.losses.state_dict(),
+            'volumes': self.volumes.state_dict(),
+            'ema': [self.ema_fast, self.ema_slow, self.ema_signal],
+            'prev_close': self.prev_close,
+            'last_bar': self.last_bar,
+            'data_version': self.data_version,
+            'bars': self.bars,
+            'values': self.values
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'StreamingIndicators':
+        """由状态快照恢复
+
+        Args:
+            state: state_dict()导出的状态
+
+        Returns:
+            增量指标对象
+        """
+        indicators = cls()
+        indicators.ma = {int(window): RollingWindow.from_state(rolling) for window, rolling in state['ma'].items()}
+        indicators.gains = RollingWindow.from_state(state['gains'])
+        indicators.losses = RollingWindow.from_state(state['losses'])
+        indicators.volumes = RollingWindow.from_state(state['volumes'])
+        indicators.ema_fast, indicators.ema_slow, indicators.ema_signal = state['ema']
+        indicators.prev_close = state['prev_close']
+        indicators.last_bar = state['last_bar']
+        indicators.data_version = state['data_version']
+        indicators.bars = state['bars']
+        indicators.values = state['values']
+        return indicators
+
+
+def _ema_step(previous: float, value: float, span: int) -> float:
+    """EMA递推一步（adjust=False）"""
+    alpha = 2.0 / (span + 1)
+    return previous + alpha * (value - previous)
+
+
+class StreamingIndicatorStore:
+    """按(股票代码, 数据间隔)管理增量指标，并将状态快照保存在行情数据分区目录中
+
+    快照记录对应的最后一根K线时间和行情数据分区版本：分区只比快照新一个版本、且该版本的改写起点在
+    快照的最后一根K线之后时，只推入新K线；改写了快照已包含的K线（包括更早的历史K线）、跨越多个版本
+    或快照不存在时，由历史数据重新初始化。
+    """
+
+    def __init__(self, data_store):
+        """初始化
+
+        Args:
+            data_store: 行情数据存储（MarketDataStore）
+        """
+        self.data_store = data_store
+        self._indicators = {}
+        self._lock = threading.Lock()
+
+    def latest(self, symbol: str, interval: str = '1d') -> Optional[Dict[str, float]]:
+        """将指标状态同步到已存储的最新K线，并返回最新指标值
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+
+        Returns:
+            指标名称到最新值的字典，没有行情数据时返回None
+        """
+        # 先读取元数据再读取数据：两次读取之间发生更新时，记录的版本偏旧，下次同步会重新初始化
+        meta = self.data_store.get_meta(symbol, interval)
+        df = self.data_store.load(symbol, interval)
+        if df is None or df.empty:
+            return None
+
+        key = (symbol, interval)
+        with self._lock:
+            indicators = self._indicators.get(key)
+        if indicators is None:
+            indicators = self._restore(symbol, interval)
+
+        if indicators is None or not self._sync(indicators, df, meta, symbol, interval):
+            indicators = StreamingIndicators.from_history(df)
+            indicators.data_version = meta.get('version')
+            self._save(symbol, interval, indicators)
+
+        with self._lock:
+            self._indicators[key] = indicators
+        return dict(indicators.values)
+
+    def preview(self, symbol: str, close: float, volume: float, interval: str = '1d') -> Optional[Dict[str, float]]:
+        """按盘中最新价格和成交量计算指标（不修改状态），用于盘中刷新
+
+        Args:
+            symbol: 股票代码
+            close: 最新价格
+            volume: 当前K线的累计成交量
+            interval: 数据间隔
+
+        Returns:
+            指标名称到值的字典，没有行情数据时返回None
+        """
+        if self.latest(symbol, interval) is None:
+            return None
+        with self._lock:
+            return self._indicators[(symbol, interval)].preview(close, volume)
+
+    def _restore(self, symbol: str, interval: str) -> Optional[StreamingIndicators]:
+        """读取状态快照"""
+        state = self.data_store.read_sidecar(symbol, interval, STATE_SIDECAR)
+        if not state or state.get('version') != STATE_VERSION:
+            return None
+        return StreamingIndicators.from_state(state)
+
+    def _save(self, symbol: str, interval: str, indicators: StreamingIndicators) -> None:
+        """保存状态快照"""
+        self.data_store.write_sidecar(symbol, interval, STATE_SIDECAR, indicators.state_dict())
+
+    def _sync(self, indicators: StreamingIndicators, df: pd.DataFrame, meta: Dict[str, Any],
+              symbol: str, interval: str) -> bool:
+        """推入快照之后的新K线
+
+        Args:
+            indicators: 增量指标对象
+            df: 已存储的完整行情数据
+            meta: 行情数据分区的元数据（版本号和改写起点）
+            symbol: 股票代码
+            interval: 数据间隔
+
+        Returns:
+            是否同步成功；快照已包含的K线可能被改写时返回False
+        """
+        if indicators.last_bar is None or indicators.data_version is None:
+            return False
+
+        version = meta.get('version')
+        if version == indicators.data_version:
+            return True
+
+        # 只能确认相邻版本的改写范围：跨越多个版本或改写起点不晚于快照的最后一根K线时重新初始化
+        rewritten_from = meta.get('rewritten_from')
+        if version != indicators.data_version + 1 or rewritten_from is None \
+                or rewritten_from <= indicators.last_bar:
+            return False
+
+        index = df.index.asi8
+        position = int(np.searchsorted(index, indicators.last_bar, side='right'))
+        if position == 0 or index[position - 1] != indicators.last_bar \
+                or df['close'].iat[position - 1] != indicators.prev_close:
+            return False
+
+        if position < len(df):
+            closes = df['close'].to_numpy(dtype=np.float64)
+            volumes = df['volume'].to_numpy(dtype=np.float64)
+            for i in range(position, len(df)):
+                indicators.update(float(closes[i]), float(volumes[i]), df.index[i])
+        indicators.data_version = version
+        self._save(symbol, interval, indicators)
+        return True
@@ -0,0 +1,48 @@
+import pandas as pd
+from chart_decoder import decode_chart_payload
+
+
+def _payload(times, meta, close=None):
+    """构造get_stock_chart格式的返回结果"""
+    timestamps = [int(pd.Timestamp(t).timestamp()) for t in times]
+    close = close or [100.0 + i for i in range(len(times))]
+    quote = {'open': close, 'high': close, 'low': close, 'close': close, 'volume': [1000] * len(times)}
+    return {'chart': {'result': [{'meta': meta, 'timestamp': timestamps, 'indicators': {'quote': [quote]}}]}}
+
+
+def test_intraday_bars_across_dst_change():
+    # 纽约2025-03-09开始夏令时：开盘时间在切换前为14:30 UTC，切换后为13:30 UTC
+    times = ['2025-03-07 14:30Z', '2025-03-07 20:55Z', '2025-03-10 13:30Z', '2025-03-10 19:55Z']
+    meta = {'symbol': 'AAPL', 'exchangeTimezoneName': 'America/New_York', 'gmtoffset': -14400}
+    df = decode_chart_payload(_payload(times, meta), interval='5m')
+    assert list(df.index) == [pd.Timestamp('2025-03-07 09:30'), pd.Timestamp('2025-03-07 15:55'),
+                              pd.Timestamp('2025-03-10 09:30'), pd.Timestamp('2025-03-10 15:55')]
+
+
+def test_winter_bar_with_current_summer_offset():
+    times = ['2025-01-15 14:30Z', '2025-07-15 13:30Z']
+    meta = {'symbol': 'AAPL', 'exchangeTimezoneName': 'America/New_York', 'gmtoffset': -14400}
+    df = decode_chart_payload(_payload(times, meta), interval='1h')
+    assert list(df.index) == [pd.Timestamp('2025-01-15 09:30'), pd.Timestamp('2025-07-15 09:30')]
+
+
+def test_daily_bars_take_local_date_across_dst_change():
+    # 日线时间戳为当地0点，切换前后分别对应05:00 UTC和04:00 UTC
+    times = ['2025-11-01 04:00Z', '2025-11-03 05:00Z']
+    meta = {'symbol': 'AAPL', 'exchangeTimezoneName': 'America/New_York'}
+    df = decode_chart_payload(_payload(times, meta), interval='1d')
+    assert list(df.index) == [pd.Timestamp('2025-11-01'), pd.Timestamp('2025-11-03')]
+
+
+def test_falls_back_to_gmtoffset_without_zone_name():
+    meta = {'symbol': '600519.SS', 'gmtoffset': 28800}
+    df = decode_chart_payload(_payload(['2025-01-15 01:30Z'], meta), interval='1h')
+    assert list(df.index) == [pd.Timestamp('2025-01-15 09:30')]
+
+
+def test_drops_bars_with_missing_prices():
+    payload = _payload(['2025-01-15 14:30Z', '2025-01-16 14:30Z'], {'exchangeTimezoneName': 'America/New_York'})
+    payload['chart']['result'][0]['indicators']['quote'][0]['close'] = [None, 101.0]
+    df = decode_chart_payload(payload, interval='1d')
+    assert list(df.index) == [pd.Timestamp('2025-01-16')]
+    assert df['close'].tolist() == [101.0]
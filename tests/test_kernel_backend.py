@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+import kernel_backend
+from kernel_backend import (forward_max, local_extrema, recursive_smooth, set_backend, get_backend,
+                            _reference_forward_max, _reference_local_extrema)
+
+requires_numba = pytest.mark.skipif(not kernel_backend.HAS_NUMBA, reason="未安装numba")
+
+
+@pytest.fixture
+def backend():
+    """测试结束后恢复原来的计算后端"""
+    previous = get_backend()
+    yield set_backend
+    set_backend(previous)
+
+
+def _series(rng):
+    """随机价格序列及边界情况（全部相等、短于窗口、含NaN）"""
+    series = [np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.02, 500))), 2) for _ in range(20)]
+    series.append(np.full(60, 10.0))
+    series.append(np.arange(5, dtype=np.float64))
+    with_nan = series[0].copy()
+    with_nan[[50, 51, 300]] = np.nan
+    series.append(with_nan)
+    return series
+
+
+def _run_kernels(name, rng):
+    """用指定后端计算各内核的结果"""
+    set_backend(name)
+    results = []
+    for prices in _series(rng):
+        for n_days in (1, 5, 20):
+            if len(prices) > n_days:
+                results.append(forward_max(prices, n_days))
+        for window in (3, 20):
+            results.extend(local_extrema(prices, window))
+    panel = rng.normal(size=(30, 200)).cumsum(axis=1) + 100
+    results.append(forward_max(panel, 5))
+    results.append(recursive_smooth(panel, 1 / 14, panel[:, 0]))
+    return results
+
+
+def test_numpy_matches_reference(backend):
+    backend('numpy')
+    rng = np.random.default_rng(0)
+    for prices in _series(rng)[:-1]:
+        for n_days in (1, 5, 20):
+            if len(prices) > n_days:
+                assert np.array_equal(forward_max(prices, n_days), _reference_forward_max(prices, n_days))
+        for window in (3, 20):
+            for actual, expected in zip(local_extrema(prices, window), _reference_local_extrema(prices, window)):
+                assert np.array_equal(actual, expected)
+
+
+def test_recursive_smooth_matches_loop(backend):
+    backend('numpy')
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=(100, 300))
+    initial = values[:, 0].copy()
+    expected = np.empty_like(values)
+    state = initial.copy()
+    for j in range(values.shape[1]):
+        state = (1 - 0.1) * state + 0.1 * values[:, j]
+        expected[:, j] = state
+    np.testing.assert_allclose(recursive_smooth(values, 0.1, initial), expected, rtol=0, atol=1e-12)
+
+
+@requires_numba
+def test_numba_matches_numpy(backend):
+    expected = _run_kernels('numpy', np.random.default_rng(2))
+    actual = _run_kernels('numba', np.random.default_rng(2))
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        assert a.shape == e.shape
+        if a.dtype.kind == 'f':
+            np.testing.assert_allclose(a, e, rtol=1e-12, atol=1e-12, equal_nan=True)
+        else:
+            assert np.array_equal(a, e)
+
+
+def test_numba_backend_unavailable_without_numba(backend):
+    if kernel_backend.HAS_NUMBA:
+        pytest.skip("已安装numba")
+    with pytest.raises(ValueError):
+        backend('numba')
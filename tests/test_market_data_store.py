@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from market_data_store import MarketDataStore, PERIOD_DAYS
+
+
+class ChartClient:
+    """按请求周期从固定的日线序列截取尾部、返回get_stock_chart格式数据的客户端"""
+
+    def __init__(self, bars, fail_ranges=()):
+        self.bars = bars
+        self.fail_ranges = set(fail_ranges)
+        self.ranges = []
+
+    def call_api(self, api_name, query=None):
+        period = query['range']
+        self.ranges.append(period)
+        if period in self.fail_ranges:
+            return {}
+        start = self.bars.index[-1] - pd.Timedelta(days=PERIOD_DAYS[period])
+        bars = self.bars[self.bars.index >= start]
+        # 纽约时间收盘后的UTC时间戳，按交易所时区解码为当地日期
+        timestamps = (bars.index + pd.Timedelta(hours=21)).as_unit('s').asi8.tolist()
+        quote = {column: bars[column].tolist() for column in ['open', 'high', 'low', 'close', 'volume']}
+        return {'chart': {'result': [{'meta': {'symbol': 'AAPL', 'exchangeTimezoneName': 'America/New_York'},
+                                      'timestamp': timestamps, 'indicators': {'quote': [quote]}}]}}
+
+
+def _bars(n):
+    """截至今天的n个交易日的日线"""
+    index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=n).as_unit('ns')
+    close = 100 + np.arange(len(index), dtype=np.float64) * 0.1
+    return pd.DataFrame({'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+                         'volume': np.full(len(index), 1000.0)}, index=index)
+
+
+def _stale_store(tmp_path, stored):
+    store = MarketDataStore(str(tmp_path))
+    store.save('AAPL', '1d', stored, '5y')
+    store.is_fresh = lambda *args: False
+    return store
+
+
+def test_short_request_after_long_gap_keeps_history(tmp_path):
+    truth = _bars(1400)
+    store = _stale_store(tmp_path, truth.iloc[:-70])
+    client = ChartClient(truth)
+
+    df = store.fetch('AAPL', '1mo', '1d', client)
+    # 只请求补齐缺失尾部所需的周期，而不是按请求周期完整获取
+    assert client.ranges == ['6mo']
+    assert df.index[0] >= truth.index[-1] - pd.Timedelta(days=PERIOD_DAYS['1mo'])
+    assert store.get_meta('AAPL')['period'] == '5y'
+    pd.testing.assert_frame_equal(store.load('AAPL'), truth, check_freq=False)
+
+
+def test_full_refetch_merges_into_longer_history(tmp_path):
+    truth = _bars(1400)
+    store = _stale_store(tmp_path, truth.iloc[:-2])
+    client = ChartClient(truth, fail_ranges={'5d'})
+
+    store.fetch('AAPL', '1mo', '1d', client)
+    # 增量请求失败后按请求周期完整获取，合并到已存储的序列，保留较长的周期
+    assert client.ranges == ['5d', '1mo']
+    assert store.get_meta('AAPL')['period'] == '5y'
+    pd.testing.assert_frame_equal(store.load('AAPL'), truth, check_freq=False)
+
+
+def test_longer_request_replaces_shorter_history(tmp_path):
+    truth = _bars(1400)
+    store = MarketDataStore(str(tmp_path))
+    store.save('AAPL', '1d', truth.iloc[-200:], '6mo')
+    store.is_fresh = lambda *args: False
+    client = ChartClient(truth)
+
+    store.fetch('AAPL', '2y', '1d', client)
+    assert client.ranges == ['2y']
+    assert store.get_meta('AAPL')['period'] == '2y'
+    assert store.load('AAPL').index[0] == truth.index[truth.index >= truth.index[-1] - pd.Timedelta(days=731)][0]
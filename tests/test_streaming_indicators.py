@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+from market_data_store import MarketDataStore
+from streaming_indicators import StreamingIndicatorStore, StreamingIndicators
+
+
+def _bars(n, seed=0):
+    """生成n个交易日的模拟日线"""
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, n).cumsum()
+    return pd.DataFrame({'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+                         'volume': rng.integers(1000, 5000, n).astype(float)},
+                        index=pd.bdate_range('2024-01-01', periods=n))
+
+
+def _assert_matches_history(values, df):
+    expected = StreamingIndicators.from_history(df).values
+    assert values.keys() == expected.keys()
+    for name, value in expected.items():
+        assert values[name] == pytest.approx(value, rel=1e-9, abs=1e-9, nan_ok=True), name
+
+
+@pytest.fixture
+def rebuilds(monkeypatch):
+    """统计由历史数据重新初始化的次数"""
+    calls = []
+    from_history = StreamingIndicators.from_history.__func__
+
+    def counting(cls, df):
+        calls.append(len(df))
+        return from_history(cls, df)
+    monkeypatch.setattr(StreamingIndicators, 'from_history', classmethod(counting))
+    return calls
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_overlapping_merge_updates_incrementally(tmp_path, rebuilds, compact):
+    bars = _bars(260)
+    store = MarketDataStore(str(tmp_path), compact=compact)
+    indicators = StreamingIndicatorStore(store)
+    store.save('AAPL', '1d', bars.iloc[:250], '1y')
+    indicators.latest('AAPL')
+    assert len(rebuilds) == 1
+
+    # 增量获取与已存储数据重叠一天（delta_range多请求一天）
+    version = store.get_meta('AAPL')['version']
+    store.merge('AAPL', '1d', bars.iloc[249:])
+    meta = store.get_meta('AAPL')
+    assert meta['version'] == version + 1
+    assert meta['rewritten_from'] == bars.index[250].value
+
+    values = indicators.latest('AAPL')
+    assert len(rebuilds) == 1
+    _assert_matches_history(values, store.load('AAPL'))
+
+
+def test_unchanged_refresh_keeps_version(tmp_path, rebuilds):
+    bars = _bars(260)
+    store = MarketDataStore(str(tmp_path))
+    indicators = StreamingIndicatorStore(store)
+    store.save('AAPL', '1d', bars, '1y')
+    indicators.latest('AAPL')
+    meta = store.get_meta('AAPL')
+
+    store.merge('AAPL', '1d', bars.iloc[-1:])
+    refreshed = store.get_meta('AAPL')
+    assert refreshed['version'] == meta['version']
+    assert refreshed['fetched_at'] >= meta['fetched_at']
+    indicators.latest('AAPL')
+    assert len(rebuilds) == 1
+
+
+def test_revised_overlap_rebuilds(tmp_path, rebuilds):
+    bars = _bars(260)
+    store = MarketDataStore(str(tmp_path))
+    indicators = StreamingIndicatorStore(store)
+    store.save('AAPL', '1d', bars.iloc[:250], '1y')
+    indicators.latest('AAPL')
+
+    # 重叠的最后一根K线被修正（如盘中获取的K线收盘后更新）
+    tail = bars.iloc[249:].copy()
+    tail.iloc[0, tail.columns.get_loc('close')] += 2.0
+    store.merge('AAPL', '1d', tail)
+    assert store.get_meta('AAPL')['rewritten_from'] == bars.index[249].value
+
+    values = indicators.latest('AAPL')
+    assert len(rebuilds) == 2
+    _assert_matches_history(values, store.load('AAPL'))
+
+
+def test_earlier_bar_revision_rebuilds(tmp_path, rebuilds):
+    bars = _bars(260)
+    store = MarketDataStore(str(tmp_path))
+    indicators = StreamingIndicatorStore(store)
+    store.save('AAPL', '1d', bars, '1y')
+    indicators.latest('AAPL')
+
+    # 改写较早的K线，最后一根K线不变
+    revised = bars.copy()
+    revised.iloc[240, revised.columns.get_loc('close')] += 5.0
+    store.save('AAPL', '1d', revised, '1y', rewritten_from=revised.index[240])
+
+    values = indicators.latest('AAPL')
+    assert len(rebuilds) == 2
+    _assert_matches_history(values, store.load('AAPL'))
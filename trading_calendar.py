@@ -0,0 +1,277 @@
+import datetime
+from zoneinfo import ZoneInfo
+from typing import List, Dict, Tuple, Any, Optional
+
+# 本地内置的交易所休市日（仅列出工作日休市），需每年根据交易所公告更新（目前覆盖2024-2026年）。
+# 表中没有的年份按_rule_holidays的固定规则近似（不含春节、清明、端午、中秋等农历假日），并打印警告
+EXCHANGE_HOLIDAYS = {
+    # 上海/深圳证券交易所
+    'SSE': [
+        '2024-01-01', '2024-02-09', '2024-02-12', '2024-02-13', '2024-02-14', '2024-02-15', '2024-02-16',
+        '2024-04-04', '2024-04-05', '2024-05-01', '2024-05-02', '2024-05-03', '2024-06-10',
+        '2024-09-16', '2024-09-17', '2024-10-01', '2024-10-02', '2024-10-03', '2024-10-04', '2024-10-07',
+        '2025-01-01', '2025-01-28', '2025-01-29', '2025-01-30', '2025-01-31', '2025-02-03', '2025-02-04',
+        '2025-04-04', '2025-05-01', '2025-05-02', '2025-05-05', '2025-06-02',
+        '2025-10-01', '2025-10-02', '2025-10-03', '2025-10-06', '2025-10-07', '2025-10-08',
+        '2026-01-01', '2026-01-02', '2026-02-16', '2026-02-17', '2026-02-18', '2026-02-19', '2026-02-20',
+        '2026-02-23', '2026-04-06', '2026-05-01', '2026-05-04', '2026-05-05', '2026-06-19', '2026-09-25',
+        '2026-10-01', '2026-10-02', '2026-10-05', '2026-10-06', '2026-10-07'
+    ],
+    # 香港交易所
+    'HKEX': [
+        '2024-01-01', '2024-02-12', '2024-02-13', '2024-03-29', '2024-04-01', '2024-04-04', '2024-05-01',
+        '2024-05-15', '2024-06-10', '2024-07-01', '2024-09-18', '2024-10-01', '2024-10-11',
+        '2024-12-25', '2024-12-26',
+        '2025-01-01', '2025-01-29', '2025-01-30', '2025-01-31', '2025-04-04', '2025-04-18', '2025-04-21',
+        '2025-05-01', '2025-05-05', '2025-07-01', '2025-10-01', '2025-10-07', '2025-10-29',
+        '2025-12-25', '2025-12-26',
+        '2026-01-01', '2026-02-17', '2026-02-18', '2026-02-19', '2026-04-03', '2026-04-06', '2026-04-07',
+        '2026-05-01', '2026-05-25', '2026-06-19', '2026-07-01', '2026-10-01', '2026-10-19', '2026-12-25'
+    ],
+    # 纽约证券交易所/纳斯达克
+    'NYSE': [
+        '2024-01-01', '2024-01-15', '2024-02-19', '2024-03-29', '2024-05-27', '2024-06-19', '2024-07-04',
+        '2024-09-02', '2024-11-28', '2024-12-25',
+        '2025-01-01', '2025-01-09', '2025-01-20', '2025-02-17', '2025-04-18', '2025-05-26', '2025-06-19',
+        '2025-07-04', '2025-09-01', '2025-11-27', '2025-12-25',
+        '2026-01-01', '2026-01-19', '2026-02-16', '2026-04-03', '2026-05-25', '2026-06-19', '2026-07-03',
+        '2026-09-07', '2026-11-26', '2026-12-25'
+    ]
+}
+
+# 各交易所的时区和交易时段（含午间休市）
+EXCHANGE_SESSIONS = {
+    'SSE': ('Asia/Shanghai', [('09:30', '11:30'), ('13:00', '15:00')]),
+    'HKEX': ('Asia/Hong_Kong', [('09:30', '12:00'), ('13:00', '16:00')]),
+    'NYSE': ('America/New_York', [('09:30', '16:00')])
+}
+
+# 日内数据间隔对应的秒数
+INTRADAY_INTERVALS = {
+    '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800,
+    '60m': 3600, '90m': 5400, '1h': 3600
+}
+
+
+def _easter(year: int) -> datetime.date:
+    """计算复活节日期（格里高利历，匿名算法）"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    return datetime.date(year, month, (h + l - 7 * m + 33 * month + 19) % 32)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> datetime.date:
+    """某月第n个星期几（n为-1时为最后一个）"""
+    if n > 0:
+        first = datetime.date(year, month, 1)
+        return first + datetime.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+    return last - datetime.timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _rule_holidays(exchange: str, year: int) -> set:
+    """按固定规则近似计算某年的休市日（用于休市日表未覆盖的年份）
+
+    纽约证券交易所的休市规则可完整计算；上海/深圳和香港交易所只包含公历固定日期和复活节相关假日，
+    农历假日及调休无法按规则计算。
+
+    Args:
+        exchange: 交易所代码
+        year: 年份
+
+    Returns:
+        休市日集合
+    """
+    date = datetime.date
+    easter = _easter(year)
+    if exchange == 'NYSE':
+        def observed(day):
+            # 周六顺延到周五（元旦除外，不提前到上一年），周日顺延到周一
+            if day.weekday() == 5:
+                return None if day.month == 1 and day.day == 1 else day - datetime.timedelta(days=1)
+            return day + datetime.timedelta(days=1) if day.weekday() == 6 else day
+        days = [observed(date(year, 1, 1)), _nth_weekday(year, 1, 0, 3), _nth_weekday(year, 2, 0, 3),
+                easter - datetime.timedelta(days=2), _nth_weekday(year, 5, 0, -1), observed(date(year, 6, 19)),
+                observed(date(year, 7, 4)), _nth_weekday(year, 9, 0, 1), _nth_weekday(year, 11, 3, 4),
+                observed(date(year, 12, 25))]
+        return {day for day in days if day is not None}
+
+    if exchange == 'HKEX':
+        fixed = [date(year, 1, 1), date(year, 5, 1), date(year, 7, 1), date(year, 10, 1),
+                 date(year, 12, 25), date(year, 12, 26)]
+        days = {easter - datetime.timedelta(days=2), easter + datetime.timedelta(days=1)}
+    else:
+        fixed = [date(year, 1, 1), date(year, 5, 1), date(year, 10, 1), date(year, 10, 2), date(year, 10, 3)]
+        days = set()
+    for day in fixed:
+        # 周日的假日顺延到下一个工作日
+        while day in days or day.weekday() == 6:
+            day += datetime.timedelta(days=1)
+        days.add(day)
+    return days
+
+
+class TradingCalendar:
+    """交易所交易日历"""
+
+    # 已打印过休市日表未覆盖警告的(交易所, 年份)
+    _warned = set()
+
+    def __init__(self, exchange: str):
+        """初始化交易日历
+
+        Args:
+            exchange: 交易所代码，如'SSE'、'HKEX'、'NYSE'
+        """
+        tz_name, sessions = EXCHANGE_SESSIONS[exchange]
+        self.exchange = exchange
+        self.tz = ZoneInfo(tz_name)
+        self.sessions = [(datetime.time.fromisoformat(start), datetime.time.fromisoformat(end))
+                         for start, end in sessions]
+        self.holidays = {datetime.date.fromisoformat(day) for day in EXCHANGE_HOLIDAYS[exchange]}
+        self.covered_years = {day.year for day in self.holidays}
+        self._rule_years = {}  # 表中没有的年份按规则计算的休市日
+
+    def holidays_for(self, year: int) -> set:
+        """获取某年的休市日
+
+        休市日表没有覆盖该年份时按固定规则近似，并打印一次警告提示更新EXCHANGE_HOLIDAYS。
+
+        Args:
+            year: 年份
+
+        Returns:
+            休市日集合
+        """
+        if year in self.covered_years:
+            return self.holidays
+        if year not in self._rule_years:
+            if (self.exchange, year) not in TradingCalendar._warned:
+                TradingCalendar._warned.add((self.exchange, year))
+                print(f"警告: {self.exchange} 的休市日表未覆盖 {year} 年，按固定规则近似（可能遗漏农历假日），"
+                      f"请更新 trading_calendar.EXCHANGE_HOLIDAYS")
+            self._rule_years[year] = _rule_holidays(self.exchange, year)
+        return self._rule_years[year]
+
+    def is_trading_day(self, day: datetime.date) -> bool:
+        """判断是否为交易日
+
+        Args:
+            day: 日期（交易所当地日期）
+
+        Returns:
+            是否为交易日
+        """
+        return day.weekday() < 5 and day not in self.holidays_for(day.year)
+
+    def is_open(self, moment: datetime.datetime) -> bool:
+        """判断某一时刻是否处于交易时段
+
+        Args:
+            moment: 带时区的时间
+
+        Returns:
+            是否处于交易时段
+        """
+        local = moment.astimezone(self.tz)
+        if not self.is_trading_day(local.date()):
+            return False
+        return any(start <= local.time() < end for start, end in self.sessions)
+
+    def previous_close(self, moment: datetime.datetime) -> datetime.datetime:
+        """获取某一时刻之前（含）最近一次收盘的时间
+
+        Args:
+            moment: 带时区的时间
+
+        Returns:
+            最近一次收盘时间（交易所时区）
+        """
+        local = moment.astimezone(self.tz)
+        day = local.date()
+        close_time = self.sessions[-1][1]
+
+        if not (self.is_trading_day(day) and local.time() >= close_time):
+            day -= datetime.timedelta(days=1)
+            while not self.is_trading_day(day):
+                day -= datetime.timedelta(days=1)
+
+        return datetime.datetime.combine(day, close_time, tzinfo=self.tz)
+
+
+def exchange_for_symbol(symbol: str) -> str:
+    """根据股票代码判断所属交易所
+
+    Args:
+        symbol: 股票代码，如'600519.SS'、'^HSI'、'AAPL'
+
+    Returns:
+        交易所代码
+    """
+    symbol = symbol.upper()
+    if symbol.endswith('.SS') or symbol.endswith('.SZ'):
+        return 'SSE'
+    if symbol.endswith('.HK') or symbol == '^HSI':
+        return 'HKEX'
+    return 'NYSE'
+
+
+class FreshnessPolicy:
+    """基于交易日历的缓存新鲜度策略
+
+    日线及以上周期：自上次获取以来没有新的收盘，则数据仍然新鲜，周末和节假日不会重复获取；
+    收盘后超过发布延迟即视为过期，不必等待固定的24小时。
+    日内周期：交易时段内超过一个K线间隔即过期，非交易时段按收盘判断。
+    """
+
+    def __init__(self, publish_delay: int = 900):
+        """初始化新鲜度策略
+
+        Args:
+            publish_delay: 收盘后数据源发布最终K线的延迟（秒）
+        """
+        self.publish_delay = datetime.timedelta(seconds=publish_delay)
+        self._calendars = {}
+
+    def calendar_for(self, symbol: str) -> TradingCalendar:
+        """获取股票所属交易所的交易日历
+
+        Args:
+            symbol: 股票代码
+
+        Returns:
+            交易日历
+        """
+        exchange = exchange_for_symbol(symbol)
+        if exchange not in self._calendars:
+            self._calendars[exchange] = TradingCalendar(exchange)
+        return self._calendars[exchange]
+
+    def is_fresh(self, symbol: str, interval: str, fetched_at: float, now: datetime.datetime = None) -> bool:
+        """判断已获取的数据是否仍然新鲜
+
+        Args:
+            symbol: 股票代码
+            interval: 数据间隔
+            fetched_at: 数据获取时间（Unix时间戳）
+            now: 当前时间，默认为系统时间
+
+        Returns:
+            是否无需重新获取
+        """
+        calendar = self.calendar_for(symbol)
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        fetched = datetime.datetime.fromtimestamp(fetched_at, datetime.timezone.utc)
+
+        if interval in INTRADAY_INTERVALS and calendar.is_open(now):
+            return (now - fetched).total_seconds() < INTRADAY_INTERVALS[interval]
+
+        # 最近一次收盘后的最终K线发布之后获取的数据才是最新的
+        last_close = calendar.previous_close(now - self.publish_delay)
+        return fetched >= last_close + self.publish_delay
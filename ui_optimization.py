@@ -22,6 +22,7 @@ try:
     from chart_analysis_system import ChartAnalysisSystem
     from news_and_market_review_system import NewsAndMarketReviewSystem
     from enhanced_multi_model_service import EnhancedMultiModelService
+    from bar_resampler import TIME_FRAME_INTERVALS
 except ImportError as e:
     print(f"导入自定义模块时出错: {str(e)}")
 
@@ -602,8 +603,11 @@ class UIOptimization:
         # 推荐股票
         st.subheader("今日推荐股票")
         
-        # 获取推荐股票
-        recommended_stocks = self.stock_recommendation.recommend_stocks(top_n=5)
+        # 读取推荐流程发布的推荐快照（不在页面中重新计算）
+        snapshot = self.stock_recommendation.latest_snapshot()
+        recommended_stocks = snapshot.top(5, min_win_rate=0.5) if snapshot is not None else []
+        if snapshot is None:
+            st.info("推荐结果尚未生成，请先运行推荐流程")
         
         # 显示推荐股票
         for stock in recommended_stocks:
@@ -613,12 +617,12 @@ class UIOptimization:
             st.markdown(f"""
             <div class="stock-card">
                 <div class="stock-info">
-                    <div class="stock-name">{stock['name']} ({stock['symbol']})</div>
-                    <div>推荐理由: {stock['recommendation_reason']}</div>
-                    <div>胜率: {stock['win_rate']:.2f}%</div>
+                    <div class="stock-name">{stock['symbol']}</div>
+                    <div>推荐理由: {'；'.join(stock['signals']) or '胜率较高'}</div>
+                    <div>胜率: {stock['win_rate'] * 100:.2f}%</div>
                 </div>
                 <div>
-                    <div class="stock-price">{stock['current_price']:.2f}</div>
+                    <div class="stock-price">{stock['latest_price']:.2f}</div>
                     <div class="{direction_class}">{change_sign}{stock['change_percent']:.2f}%</div>
                 </div>
             </div>
@@ -649,12 +653,15 @@ class UIOptimization:
         </div>
         """, unsafe_allow_html=True)
         
-        # 筛选选项
+        snapshot = self.stock_recommendation.latest_snapshot()
+        
+        # 筛选选项（行业选项来自快照中实际出现的行业）
+        industries = snapshot.meta.get('categories', {}).get('industry', []) if snapshot is not None else []
         col1, col2, col3 = st.columns(3)
         with col1:
             market = st.selectbox("选择市场", ["全部", "A股", "港股", "美股"])
         with col2:
-            industry = st.selectbox("选择行业", ["全部", "科技", "金融", "医药", "消费", "能源", "工业", "原材料"])
+            industry = st.selectbox("选择行业", ["全部"] + list(industries))
         with col3:
             sort_by = st.selectbox("排序方式", ["胜率", "上涨空间", "最新价格", "成交量"])
         
@@ -665,29 +672,45 @@ class UIOptimization:
                 min_win_rate = st.slider("最低胜率", 0, 100, 60)
                 min_price = st.number_input("最低价格", 0.0, 10000.0, 0.0)
             with col2:
-                time_frame = st.selectbox("时间周期", ["日线", "周线", "月线"])
                 max_price = st.number_input("最高价格", 0.0, 10000.0, 10000.0)
-        
-        # 获取推荐股票
-        recommended_stocks = self.stock_recommendation.recommend_stocks(
+
+        # 胜率参数：整个参数网格的胜率曲面只计算一次，调整滑块时直接从曲面读取，并按所选参数的胜率筛选和排序
+        with st.expander("胜率参数"):
+            surface = self.stock_recommendation.calculate_win_rate_surface()
+            col1, col2 = st.columns(2)
+            with col1:
+                n_days = st.select_slider("持有天数", options=list(surface.horizons), value=5)
+            with col2:
+                target_return = st.select_slider("目标收益率", options=list(surface.targets), value=0.03,
+                                                 format_func=lambda x: f"{x:.0%}")
+            win_rates = self.stock_recommendation.calculate_win_rate(n_days=n_days, target_return=target_return)
+
+            heatmap = surface.to_frame() * 100
+            fig = px.imshow(heatmap.values, x=[f"{t:.0%}" for t in heatmap.columns], y=[str(h) for h in heatmap.index],
+                            labels={'x': '目标收益率', 'y': '持有天数', 'color': '平均胜率(%)'},
+                            text_auto='.1f', color_continuous_scale='Blues', aspect='auto')
+            st.plotly_chart(fig, use_container_width=True)
+
+        # 在推荐快照上筛选和排序（条件下推到列式表，不重新计算）
+        screened = self.stock_recommendation.screen_stocks(
             market=market if market != "全部" else None,
             industry=industry if industry != "全部" else None,
-            min_win_rate=min_win_rate,
+            min_win_rate=min_win_rate / 100,
             min_price=min_price,
             max_price=max_price,
-            time_frame=time_frame,
-            top_n=20
+            sort_by=sort_by,
+            top_n=20,
+            win_rates=win_rates
         )
+        if snapshot is None:
+            st.info("推荐结果尚未生成，请先运行推荐流程")
         
-        # 排序
-        if sort_by == "胜率":
-            recommended_stocks.sort(key=lambda x: x['win_rate'], reverse=True)
-        elif sort_by == "上涨空间":
-            recommended_stocks.sort(key=lambda x: x['potential_upside'], reverse=True)
-        elif sort_by == "最新价格":
-            recommended_stocks.sort(key=lambda x: x['current_price'], reverse=True)
-        elif sort_by == "成交量":
-            recommended_stocks.sort(key=lambda x: x['volume'], reverse=True)
+        # 转换为页面展示的字段
+        recommended_stocks = [dict(stock, name=stock['symbol'], current_price=stock['latest_price'],
+                                   win_rate=stock['win_rate'] * 100,
+                                   recommendation_reason='；'.join(stock['signals']) or '胜率较高',
+                                   related_stocks=[{'name': s, 'symbol': s} for s in stock['similar_stocks']])
+                              for stock in screened]
         
         # 显示推荐股票
         st.subheader(f"推荐股票列表 (共 {len(recommended_stocks)} 只)")
@@ -813,6 +836,9 @@ class UIOptimization:
         analyze_button = st.button("分析图表")
         
         if analyze_button or stock_input:
+            # 按所选时间周期加载数据（周线/月线由已存储的日线在本地合成，无需额外请求）
+            self.chart_analysis.fetch_stock_data(stock_input, interval=TIME_FRAME_INTERVALS[time_frame])
+            
             # 获取股票数据
             stock_data = self.chart_analysis.get_stock_data(stock_input)
             
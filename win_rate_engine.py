@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Tuple, Any, Optional
+from indicator_engine import build_panel
+from kernel_backend import forward_max
+
+# 胜率曲面默认的持有天数和目标收益率网格
+DEFAULT_HORIZONS = (1, 3, 5, 10, 20)
+DEFAULT_TARGETS = (0.01, 0.02, 0.03, 0.05, 0.08, 0.1)
+
+
+def forward_max_returns(close: np.ndarray, n_days: int) -> np.ndarray:
+    """计算面板中每个起点之后n_days根K线内的最高收益率
+
+    价格为正时先取最高价再换算收益率，与逐个价格换算收益率后取最大值的结果完全相同。
+
+    Args:
+        close: N×M收盘价面板（右对齐，左侧以NaN填充）
+        n_days: 向前查看的K线数
+
+    Returns:
+        N×(M-n_days)最高收益率数组，第j列对应以第j根K线为起点，无效起点为NaN
+    """
+    n, m = close.shape
+    if m <= n_days:
+        return np.empty((n, 0))
+    start_prices = close[:, :m - n_days]
+    return (forward_max(close, n_days) - start_prices) / start_prices
+
+
+def compute_win_rates(frames: Dict[str, pd.DataFrame], n_days: int = 5,
+                      target_return: float = 0.03) -> Dict[str, float]:
+    """一次性计算多只股票在n天内达到目标收益率的胜率
+
+    Args:
+        frames: 股票代码到行情数据DataFrame的字典
+        n_days: 预测天数
+        target_return: 目标收益率
+
+    Returns:
+        胜率字典，键为股票代码，值为胜率（0-1之间）；样本不足的股票胜率为0
+    """
+    panel, lengths = build_panel(frames, ('close',))
+    with np.errstate(invalid='ignore'):
+        wins = np.count_nonzero(forward_max_returns(panel['close'], n_days) >= target_return, axis=1)
+    totals = lengths - n_days
+
+    return {
+        symbol: (int(wins[i]) / int(totals[i]) if totals[i] > 0 else 0)
+        for i, symbol in enumerate(frames.keys())
+    }
+
+
+class WinRateSurface:
+    """多只股票在(持有天数, 目标收益率)网格上的胜率曲面"""
+
+    def __init__(self, symbols: List[str], horizons: Tuple[int, ...], targets: Tuple[float, ...], rates: np.ndarray):
+        """初始化胜率曲面
+
+        Args:
+            symbols: 股票代码列表
+            horizons: 持有天数网格
+            targets: 目标收益率网格
+            rates: N×H×T胜率数组
+        """
+        self.symbols = list(symbols)
+        self.horizons = tuple(horizons)
+        self.targets = tuple(targets)
+        self.rates = rates
+
+    @property
+    def nbytes(self) -> int:
+        return self.rates.nbytes
+
+    def covers(self, n_days: int, target_return: float) -> bool:
+        """网格是否包含指定的参数组合"""
+        return n_days in self.horizons and target_return in self.targets
+
+    def win_rates(self, n_days: int, target_return: float) -> Dict[str, float]:
+        """获取指定参数组合下各股票的胜率
+
+        Args:
+            n_days: 持有天数（须在网格中）
+            target_return: 目标收益率（须在网格中）
+
+        Returns:
+            胜率字典，与compute_win_rates的结果一致
+        """
+        if not self.covers(n_days, target_return):
+            raise KeyError(f"胜率曲面不包含参数组合: n_days={n_days}, target_return={target_return}")
+        column = self.rates[:, self.horizons.index(n_days), self.targets.index(target_return)]
+        return {symbol: float(column[i]) for i, symbol in enumerate(self.symbols)}
+
+    def to_frame(self, symbol: str = None) -> pd.DataFrame:
+        """获取胜率曲面表格（行为持有天数，列为目标收益率），用于热力图
+
+        Args:
+            symbol: 股票代码，为None时返回全部股票的平均胜率
+
+        Returns:
+            胜率DataFrame
+        """
+        if symbol is None:
+            values = self.rates.mean(axis=0) if self.symbols else np.zeros((len(self.horizons), len(self.targets)))
+        else:
+            values = self.rates[self.symbols.index(symbol)]
+        return pd.DataFrame(values, index=pd.Index(self.horizons, name='n_days'),
+                            columns=pd.Index(self.targets, name='target_return'))
+
+
+def compute_win_rate_surface(frames: Dict[str, pd.DataFrame], horizons: Tuple[int, ...] = DEFAULT_HORIZONS,
+                             targets: Tuple[float, ...] = DEFAULT_TARGETS) -> WinRateSurface:
+    """一次遍历价格数据，计算多只股票在整个参数网格上的胜率
+
+    持有天数从1递增到最大值，前向最高价逐步取累计最大值得到，较短持有期的结果在计算较长持有期时复用；
+    每个网格点的胜率与compute_win_rates的结果完全相同。
+
+    Args:
+        frames: 股票代码到行情数据DataFrame的字典
+        horizons: 持有天数网格
+        targets: 目标收益率网格
+
+    Returns:
+        胜率曲面
+    """
+    horizons = tuple(sorted(set(int(h) for h in horizons)))
+    targets = tuple(sorted(set(float(t) for t in targets)))
+    if not horizons or horizons[0] < 1:
+        raise ValueError("持有天数须为正整数")
+
+    panel, lengths = build_panel(frames, ('close',))
+    close = panel['close']
+    n, m = close.shape
+    rates = np.zeros((n, len(horizons), len(targets)))
+
+    # highest[:, i] 为第i根K线之后h根K线内的最高价
+    highest = close[:, 1:].copy()
+    for h in range(1, horizons[-1] + 1):
+        if h > 1:
+            # np.maximum传播NaN：窗口内有左侧填充时结果为NaN，与逐点计算一致
+            highest = np.maximum(highest[:, :-1], close[:, h:])
+        if h not in horizons or m <= h:
+            continue
+        totals = lengths - h
+        start_prices = close[:, :m - h]
+        with np.errstate(invalid='ignore'):
+            returns = (highest - start_prices) / start_prices
+            for k, target in enumerate(targets):
+                wins = np.count_nonzero(returns >= target, axis=1)
+                rates[:, horizons.index(h), k] = np.where(totals > 0, wins / np.maximum(totals, 1), 0)
+
+    return WinRateSurface(list(frames.keys()), horizons, targets, rates)
+
+
+if __name__ == "__main__":
+    import time
+    from market_simulator import MarketSimulator, make_symbols
+
+    symbols = make_symbols(5000)
+    frames = MarketSimulator().generate(symbols, 1260)
+
+    start = time.time()
+    win_rates = compute_win_rates(frames, n_days=5, target_return=0.03)
+    print(f"计算 {len(symbols)} 只股票 × 1260 根K线的胜率耗时: {time.time() - start:.2f}秒")
+
+    # 与逐个起点循环的实现对比
+    start = time.time()
+    for symbol in symbols[:50]:
+        prices = frames[symbol]['close'].values
+        total_samples = len(prices) - 5
+        win_count = sum(
+            max([(p - prices[i]) / prices[i] for p in prices[i + 1:i + 6]]) >= 0.03
+            for i in range(total_samples)
+        )
+        assert win_rates[symbol] == win_count / total_samples
+    loop_time = (time.time() - start) * len(symbols) / 50
+    print(f"逐个起点循环预计耗时: {loop_time:.2f}秒，结果完全一致")
+
+    start = time.time()
+    surface = compute_win_rate_surface(frames)
+    print(f"计算 {len(surface.horizons)}×{len(surface.targets)} 参数网格的胜率曲面耗时: {time.time() - start:.2f}秒")
+    assert surface.win_rates(5, 0.03) == win_rates
+    print(surface.to_frame().round(3))